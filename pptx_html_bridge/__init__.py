@@ -8,13 +8,46 @@ from .converter import (
     PPTXToHTMLConverter,
     convert_pptx_to_html,
     convert_pptx_directory,
+    render_slide,
+    iter_convert,
     main
 )
+from .extract import open_deck, extract_deck
+from .ir import save_deck, load_deck
+from .backends import render_json, render_text
+from .scan import scan, PPTXLimitError
+from .outline import read_outline, render_outline_html, render_outline_json
+from .watchdog import ConversionTimeout
+from .sinks import OutputSink, LocalSink, MemorySink, S3Sink, WriteBehindSink
+from .presentation_cache import PresentationCache
+from .html_to_pptx import HTMLToPPTXConverter, parse_slide_html
 
 __version__ = "0.1.0"
 __all__ = [
     "PPTXToHTMLConverter",
     "convert_pptx_to_html",
     "convert_pptx_directory",
-    "main"
+    "render_slide",
+    "iter_convert",
+    "main",
+    "open_deck",
+    "extract_deck",
+    "save_deck",
+    "load_deck",
+    "render_json",
+    "render_text",
+    "read_outline",
+    "render_outline_html",
+    "render_outline_json",
+    "scan",
+    "PPTXLimitError",
+    "ConversionTimeout",
+    "OutputSink",
+    "LocalSink",
+    "MemorySink",
+    "S3Sink",
+    "WriteBehindSink",
+    "PresentationCache",
+    "HTMLToPPTXConverter",
+    "parse_slide_html"
 ]
\ No newline at end of file
@@ -0,0 +1,64 @@
+import base64
+import hashlib
+import json
+import os
+import posixpath
+from .sinks import LocalSink
+
+MANIFEST_NAME = "asset-manifest.json"
+HASH_LENGTH = 10
+
+
+def hashed_name(logical, digest):
+    """Insert a content hash before the extension: media/a.png -> media/a.<hash>.png."""
+    root, ext = posixpath.splitext(logical)
+    return f"{root}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def sri_digest(data):
+    """Subresource Integrity value of data (sha384)."""
+    return "sha384-" + base64.b64encode(hashlib.sha384(data).digest()).decode('ascii')
+
+
+class AssetManifest:
+    """Publish assets under content-hashed file names and record them for asset-manifest.json.
+
+    Logical names are paths relative to the output directory (e.g. media/slide1_img0.png);
+    published files never change content under the same name, so they can be cached as immutable.
+    Files are stored through output, an OutputSink (default: the local filesystem)."""
+
+    def __init__(self, output_dir, output=None):
+        self.output_dir = output_dir
+        self.output = output if output is not None else LocalSink()
+        self.assets = {}
+
+    def get(self, logical):
+        """Return the published name of a logical asset, or None if it was not published yet."""
+        entry = self.assets.get(logical)
+        return entry["file"] if entry is not None else None
+
+    def publish(self, logical, data, hashed=True):
+        """Write data under its hashed name (unless that file exists) and return the published name.
+        With hashed=False the logical name is kept, for files whose name already carries a hash."""
+        file_name = hashed_name(logical, hashlib.sha256(data).hexdigest()) if hashed else logical
+        path = os.path.join(self.output_dir, *file_name.split('/'))
+        if not self.output.exists(path):
+            self.output.write(path, data)
+        self.assets[logical] = {"file": file_name, "size": len(data), "integrity": sri_digest(data)}
+        return file_name
+
+    def write(self):
+        """Merge the recorded assets into asset-manifest.json in the output directory and return its path.
+        Entries of earlier conversions into the same directory are kept unless overwritten."""
+        path = os.path.join(self.output_dir, MANIFEST_NAME)
+        assets = {}
+        existing = self.output.read(path)
+        if existing is not None:
+            try:
+                assets = json.loads(existing.decode('utf-8')).get("assets", {})
+            except Exception:
+                assets = {}
+        assets.update(self.assets)
+        data = json.dumps({"assets": dict(sorted(assets.items()))}, ensure_ascii=False, indent=2)
+        self.output.write(path, data.encode('utf-8'))
+        return path
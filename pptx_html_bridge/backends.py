@@ -0,0 +1,79 @@
+"""
+Non-HTML renderers of the deck IR.
+
+The HTML backend lives in html_generators; these produce plain text and a JSON
+document from the same DeckIR, so they never touch python-pptx.
+"""
+
+import json
+
+
+def _shape_data(shape):
+    data = {"kind": shape.kind, "left": shape.left, "top": shape.top, "width": shape.width, "height": shape.height}
+    if shape.rotation:
+        data["rotation"] = shape.rotation
+    if shape.media is not None:
+        data["media"] = f"media/{shape.media.filename}"
+    if shape.poster is not None:
+        data["poster"] = f"media/{shape.poster.filename}"
+    if shape.paragraphs:
+        data["paragraphs"] = [
+            {"text": p.text, "align": p.align, "level": p.level} for p in shape.paragraphs
+        ]
+    if shape.table is not None:
+        data["table"] = [
+            [{"text": cell.text, "colspan": cell.colspan, "rowspan": cell.rowspan} for cell in cells]
+            for _, cells in shape.table.rows
+        ]
+    if shape.chart is not None:
+        chart = shape.chart
+        data["chart"] = {
+            "type": chart.kind,
+            "title": chart.title,
+            "categories": chart.categories,
+            "series": [{"name": s.name, "values": s.values, "color": s.color} for s in chart.series],
+        }
+    if shape.fill_color:
+        data["fill"] = shape.fill_color
+    if shape.stroke_color:
+        data["stroke"] = shape.stroke_color
+    return data
+
+
+def deck_to_json(deck):
+    """Return a JSON-compatible outline of a deck: slide geometry, text, tables and media references."""
+    return {
+        "name": deck.name,
+        "width": deck.width,
+        "height": deck.height,
+        "slides_count": deck.num_slides,
+        "slides": [
+            {
+                "number": slide.number,
+                "shapes": [_shape_data(shape) for shape in slide.shapes],
+                "notes": slide.notes,
+            }
+            for slide in deck.slides
+        ],
+    }
+
+
+def render_json(deck, indent=None):
+    """Render a deck IR as a JSON string."""
+    return json.dumps(deck_to_json(deck), ensure_ascii=False, indent=indent)
+
+
+def render_text(deck):
+    """Render a deck IR as plain text, one block per slide followed by its notes."""
+    blocks = []
+    for slide in deck.slides:
+        lines = [f"--- Slide {slide.number} ---"]
+        for shape in slide.shapes:
+            text = shape.text.strip()
+            if text:
+                lines.append(text)
+        if slide.notes:
+            lines.append("[Notes]")
+            lines.append(slide.notes.strip())
+        blocks.append('\n'.join(lines))
+    return '\n\n'.join(blocks) + '\n'
@@ -0,0 +1,331 @@
+import hashlib
+import math
+import threading
+from html import escape
+from .tables import _color_of
+from .themes import get_scheme_color
+from .ir import ChartIR, SeriesIR
+
+C_NS = 'http://schemas.openxmlformats.org/drawingml/2006/chart'
+_C = '{%s}' % C_NS
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+_A = '{%s}' % A_NS
+
+CHART_KINDS = {_C + 'barChart': 'bar', _C + 'bar3DChart': 'bar', _C + 'lineChart': 'line',
+               _C + 'line3DChart': 'line', _C + 'pieChart': 'pie', _C + 'pie3DChart': 'pie',
+               _C + 'doughnutChart': 'pie'}
+# Office default accent colors, used when the theme does not define them
+DEFAULT_PALETTE = ['#4472c4', '#ed7d31', '#a5a5a5', '#ffc000', '#5b9bd5', '#70ad47']
+SVG_CACHE_SIZE = 256
+
+_svg_cache = {}
+_svg_lock = threading.Lock()
+
+
+def _palette(prs, scheme_cache):
+    palette = []
+    for k, fallback in enumerate(DEFAULT_PALETTE, 1):
+        name = f"accent{k}"
+        if prs is not None and name not in scheme_cache:
+            scheme_cache[name] = get_scheme_color(prs, name)
+        color = scheme_cache.get(name)
+        palette.append(f"#{color.lower()}" if color else fallback)
+    return palette
+
+
+def _sp_pr_color(parent, line, prs, scheme_cache):
+    """Series/point color from c:spPr: the fill, or the outline for line charts."""
+    sp_pr = parent.find(_C + 'spPr')
+    if sp_pr is None:
+        return None
+    if line:
+        return _color_of(sp_pr.find(_A + 'ln'), prs, scheme_cache)
+    return _color_of(sp_pr, prs, scheme_cache)
+
+
+def _cached_points(ref_parent):
+    """Return {idx: text} of the cached points under c:cat / c:val / c:tx."""
+    points = {}
+    if ref_parent is None:
+        return points
+    for pt in ref_parent.iter(_C + 'pt'):
+        v = pt.find(_C + 'v')
+        if v is not None and v.text is not None:
+            points[int(pt.get('idx', len(points)))] = v.text
+    return points
+
+
+def _number(text):
+    try:
+        value = float(text)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _rich_text(element):
+    return ''.join(t.text or '' for t in element.iter(_A + 't'))
+
+
+def extract_chart(chart_part, prs=None, scheme_cache=None):
+    """Read a chart part's first plot and its cached series data into a ChartIR.
+    Returns None for chart types that have no renderer."""
+    scheme_cache = scheme_cache if scheme_cache is not None else {}
+    chart_space = chart_part._element
+    chart = chart_space.find(_C + 'chart')
+    plot_area = chart.find(_C + 'plotArea') if chart is not None else None
+    if plot_area is None:
+        return None
+    plot = None
+    for child in plot_area:
+        if child.tag in CHART_KINDS:
+            plot = child
+            break
+    if plot is None:
+        return None
+    kind = CHART_KINDS[plot.tag]
+    chart_ir = ChartIR(kind)
+    bar_dir = plot.find(_C + 'barDir')
+    chart_ir.horizontal = bar_dir is not None and bar_dir.get('val') == 'bar'
+    grouping = plot.find(_C + 'grouping')
+    if grouping is not None and grouping.get('val') in ('stacked', 'percentStacked'):
+        chart_ir.grouping = grouping.get('val')
+    palette = _palette(prs, scheme_cache)
+    categories = {}
+    for k, ser in enumerate(plot.findall(_C + 'ser')):
+        series = SeriesIR()
+        tx = ser.find(_C + 'tx')
+        if tx is not None:
+            names = _cached_points(tx)
+            series.name = names.get(0) or _rich_text(tx) or None
+        values = _cached_points(ser.find(_C + 'val'))
+        count = max(values) + 1 if values else 0
+        series.values = [_number(values.get(idx)) for idx in range(count)]
+        if not categories:
+            categories = _cached_points(ser.find(_C + 'cat'))
+        series.color = _sp_pr_color(ser, kind == 'line', prs, scheme_cache) or palette[k % len(palette)]
+        for dpt in ser.findall(_C + 'dPt'):
+            idx = dpt.find(_C + 'idx')
+            color = _sp_pr_color(dpt, False, prs, scheme_cache)
+            if idx is not None and color:
+                series.point_colors[int(idx.get('val'))] = color
+        chart_ir.series.append(series)
+    count = max([len(s.values) for s in chart_ir.series] + [max(categories) + 1 if categories else 0])
+    chart_ir.categories = [categories.get(idx, str(idx + 1)) for idx in range(count)]
+    if kind == 'pie' and chart_ir.series:
+        first = chart_ir.series[0]
+        for idx in range(count):
+            if idx not in first.point_colors:
+                first.point_colors[idx] = palette[idx % len(palette)]
+    title = chart.find(_C + 'title')
+    auto_deleted = chart.find(_C + 'autoTitleDeleted')
+    auto_title = auto_deleted is None or auto_deleted.get('val') in ('0', 'false')
+    if title is not None and _rich_text(title):
+        chart_ir.title = _rich_text(title)
+    elif (title is not None or auto_title) and len(chart_ir.series) == 1:
+        # single-series charts are titled with the series name by default
+        chart_ir.title = chart_ir.series[0].name
+    chart_ir.legend = chart.find(_C + 'legend') is not None
+    # colors come from the theme, so they are part of the key
+    h = hashlib.sha1(chart_part.blob)
+    h.update(','.join(palette).encode('ascii'))
+    chart_ir.key = h.hexdigest()
+    return chart_ir
+
+
+def _fmt(value):
+    if abs(value - round(value)) < 1e-9:
+        return str(int(round(value)))
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+
+def _c(value):
+    """Compact svg coordinate."""
+    return _fmt(round(value, 1))
+
+
+def _nice_range(lo, hi, ticks=5):
+    """Return (lo, hi, step) widened to round tick values."""
+    if hi <= lo:
+        hi = lo + 1
+    raw = (hi - lo) / ticks
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = magnitude * next(m for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw)
+    return math.floor(lo / step) * step, math.ceil(hi / step) * step, step
+
+
+def _legend(out, entries, width, y):
+    """Lay legend entries out in one centered row."""
+    widths = [14 + 6.5 * len(label) + 10 for label, _ in entries]
+    x = max(4, (width - sum(widths)) / 2)
+    for (label, color), w in zip(entries, widths):
+        out.append(f'<rect x="{_c(x)}" y="{_c(y - 8)}" width="9" height="9" fill="{color}"/>')
+        out.append(f'<text x="{_c(x + 13)}" y="{_c(y)}">{escape(label)}</text>')
+        x += w
+
+
+def _render_pie(chart, out, width, top, bottom):
+    series = chart.series[0]
+    values = [v if v and v > 0 else 0 for v in series.values]
+    total = sum(values)
+    cx = width / 2
+    cy = (top + bottom) / 2
+    r = max(1, min(width, bottom - top) / 2 - 4)
+    if total <= 0:
+        return
+    angle = -math.pi / 2
+    for idx, value in enumerate(values):
+        if not value:
+            continue
+        color = series.point_colors.get(idx, series.color)
+        if value >= total:
+            out.append(f'<circle cx="{_c(cx)}" cy="{_c(cy)}" r="{_c(r)}" fill="{color}"/>')
+            break
+        end = angle + 2 * math.pi * value / total
+        large = 1 if end - angle > math.pi else 0
+        x1, y1 = cx + r * math.cos(angle), cy + r * math.sin(angle)
+        x2, y2 = cx + r * math.cos(end), cy + r * math.sin(end)
+        out.append(f'<path d="M{_c(cx)} {_c(cy)}L{_c(x1)} {_c(y1)}A{_c(r)} {_c(r)} 0 {large} 1 {_c(x2)} {_c(y2)}Z" '
+                   f'fill="{color}" stroke="#fff"/>')
+        angle = end
+
+
+def _render_axes_chart(chart, out, width, top, bottom):
+    count = len(chart.categories)
+    if not count:
+        return
+    stacked = chart.grouping in ('stacked', 'percentStacked') and chart.kind == 'bar'
+    percent = chart.grouping == 'percentStacked' and chart.kind == 'bar'
+    rows = [[(s.values[idx] if idx < len(s.values) else None) for idx in range(count)] for s in chart.series]
+    if percent:
+        for idx in range(count):
+            total = sum(abs(row[idx]) for row in rows if row[idx]) or 1
+            for row in rows:
+                if row[idx] is not None:
+                    row[idx] = row[idx] * 100 / total
+    if stacked:
+        highs = [sum(row[idx] for row in rows if row[idx] and row[idx] > 0) for idx in range(count)]
+        lows = [sum(row[idx] for row in rows if row[idx] and row[idx] < 0) for idx in range(count)]
+    else:
+        present = [v for row in rows for v in row if v is not None]
+        highs = present or [0]
+        lows = present or [0]
+    vmin, vmax, step = _nice_range(min(0, min(lows)), max(0, max(highs)))
+    label_width = 6.5 * max(len(_fmt(vmin)), len(_fmt(vmax))) + 8
+    horizontal = chart.horizontal and chart.kind == 'bar'
+    if horizontal:
+        cat_width = min(width / 3, 6.5 * max(len(str(c)) for c in chart.categories) + 8)
+        px0, px1, py0, py1 = cat_width, width - 8, top, bottom - 16
+    else:
+        px0, px1, py0, py1 = label_width, width - 8, top, bottom - 16
+    if px1 <= px0 or py1 <= py0:
+        return
+    span = vmax - vmin
+
+    def valpos(v):
+        if horizontal:
+            return px0 + (v - vmin) / span * (px1 - px0)
+        return py1 - (v - vmin) / span * (py1 - py0)
+
+    def catpos(t):
+        if horizontal:
+            # the first category is drawn at the bottom, as in PowerPoint
+            return py1 - t * (py1 - py0)
+        return px0 + t * (px1 - px0)
+
+    # value gridlines and labels
+    steps = int(round(span / step))
+    for k in range(steps + 1):
+        v = vmin + k * step
+        p = valpos(v)
+        label = _fmt(v) + ('%' if percent else '')
+        if horizontal:
+            out.append(f'<line x1="{_c(p)}" y1="{_c(py0)}" x2="{_c(p)}" y2="{_c(py1)}" stroke="#d9d9d9"/>')
+            out.append(f'<text x="{_c(p)}" y="{_c(py1 + 12)}" text-anchor="middle">{label}</text>')
+        else:
+            out.append(f'<line x1="{_c(px0)}" y1="{_c(p)}" x2="{_c(px1)}" y2="{_c(p)}" stroke="#d9d9d9"/>')
+            out.append(f'<text x="{_c(px0 - 4)}" y="{_c(p + 4)}" text-anchor="end">{label}</text>')
+    # category labels
+    for idx, category in enumerate(chart.categories):
+        p = catpos((idx + 0.5) / count)
+        if horizontal:
+            out.append(f'<text x="{_c(px0 - 4)}" y="{_c(p + 4)}" text-anchor="end">{escape(str(category))}</text>')
+        else:
+            out.append(f'<text x="{_c(p)}" y="{_c(py1 + 12)}" text-anchor="middle">{escape(str(category))}</text>')
+
+    if chart.kind == 'line':
+        for series, row in zip(chart.series, rows):
+            points = ' '.join(f"{_c(catpos((idx + 0.5) / count))},{_c(valpos(v))}" for idx, v in enumerate(row) if v is not None)
+            if points:
+                out.append(f'<polyline points="{points}" fill="none" stroke="{series.color}" stroke-width="2"/>')
+    else:
+        groups = len(chart.series) if not stacked else 1
+        band = 1 / count
+        bar = band * 0.7 / max(groups, 1)
+        pos_base = [0] * count
+        neg_base = [0] * count
+        for k, (series, row) in enumerate(zip(chart.series, rows)):
+            for idx, v in enumerate(row):
+                if v is None:
+                    continue
+                if stacked:
+                    base = pos_base if v >= 0 else neg_base
+                    v0, v1 = base[idx], base[idx] + v
+                    base[idx] = v1
+                    c0 = idx * band + band * 0.15
+                else:
+                    v0, v1 = 0, v
+                    c0 = idx * band + band * 0.15 + k * bar
+                a, b = catpos(c0), catpos(c0 + bar)
+                p, q = valpos(v0), valpos(v1)
+                if horizontal:
+                    x, w, y, h = min(p, q), abs(p - q), min(a, b), abs(a - b)
+                else:
+                    x, w, y, h = min(a, b), abs(a - b), min(p, q), abs(p - q)
+                color = series.point_colors.get(idx, series.color)
+                out.append(f'<rect x="{_c(x)}" y="{_c(y)}" width="{_c(w)}" height="{_c(h)}" fill="{color}"/>')
+    # axis line at zero
+    zero = valpos(0 if vmin <= 0 <= vmax else vmin)
+    if horizontal:
+        out.append(f'<line x1="{_c(zero)}" y1="{_c(py0)}" x2="{_c(zero)}" y2="{_c(py1)}" stroke="#808080"/>')
+    else:
+        out.append(f'<line x1="{_c(px0)}" y1="{_c(zero)}" x2="{_c(px1)}" y2="{_c(zero)}" stroke="#808080"/>')
+
+
+def render_chart_svg(chart, width, height):
+    """Render a ChartIR as inline svg of width x height px.
+    Results are cached by (chart key, size), so repeated charts render once."""
+    key = (chart.key, width, height) if chart.key else None
+    if key is not None:
+        with _svg_lock:
+            svg = _svg_cache.get(key)
+        if svg is not None:
+            return svg
+    out = []
+    top = 4
+    bottom = height - 4
+    if chart.title:
+        out.append(f'<text x="{_c(width / 2)}" y="16" text-anchor="middle" font-size="14">{escape(chart.title)}</text>')
+        top = 24
+    if chart.legend:
+        if chart.kind == 'pie':
+            first = chart.series[0] if chart.series else None
+            entries = [(str(c), first.point_colors.get(idx, first.color)) for idx, c in enumerate(chart.categories)] if first else []
+        else:
+            entries = [(s.name or f"Series {k + 1}", s.color) for k, s in enumerate(chart.series)]
+        if entries:
+            _legend(out, entries, width, height - 6)
+            bottom = height - 20
+    if chart.series:
+        if chart.kind == 'pie':
+            _render_pie(chart, out, width, top, bottom)
+        else:
+            _render_axes_chart(chart, out, width, top, bottom)
+    svg = (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}" '
+           f'font-size="11" fill="#404040">{"".join(out)}</svg>')
+    if key is not None:
+        with _svg_lock:
+            if len(_svg_cache) >= SVG_CACHE_SIZE:
+                _svg_cache.pop(next(iter(_svg_cache)))
+            _svg_cache[key] = svg
+    return svg
@@ -4,9 +4,12 @@ PPTX to HTML Converter
 This module provides functionality to convert PowerPoint (.pptx) files to HTML format.
 """
 
+import hashlib
+import io
 import os
 import sys
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, Iterator
 
 from pptx import Presentation
 from .utils import *
@@ -15,7 +18,20 @@ from .utils import *
 class PPTXToHTMLConverter:
     """Main converter class for PPTX to HTML conversion."""
 
-    def __init__(self, source_dir: str = None, html_dir: str = None, compact: bool = False):
+    def __init__(self, source_dir: str = None, html_dir: str = None, compact: bool = False, cull: bool = True,
+                 font_dir: Optional[str] = None, font_cache_dir: Optional[str] = None,
+                 search_index: bool = False, ir_cache_dir: Optional[str] = None, hashed_assets: bool = False,
+                 precompress: Optional[str] = None, precompress_ratio: float = DEFAULT_MAX_RATIO,
+                 template_cache: bool = False, template_cache_dir: Optional[str] = None,
+                 limits: Optional[Dict[str, Any]] = None, svg_shapes: bool = False,
+                 slide_cache_dir: Optional[str] = None, slide_cache_size: int = DEFAULT_SLIDE_CACHE_SIZE,
+                 output_sink: Optional[OutputSink] = None, write_workers: int = 0,
+                 sprites: bool = False, sprite_max_size: int = SPRITE_MAX_SIZE,
+                 deck_timeout: Optional[float] = None, deck_cpu_timeout: Optional[float] = None,
+                 mode: str = "html", text_format: str = "html", presentation_cache: bool = False,
+                 presentation_cache_entries: int = DEFAULT_PRESENTATION_CACHE_ENTRIES,
+                 presentation_cache_size: int = DEFAULT_PRESENTATION_CACHE_BYTES,
+                 prefetch: bool = True, keyboard_nav: bool = False):
         """
         Initialize the converter.
 
@@ -23,121 +39,533 @@ class PPTXToHTMLConverter:
             source_dir: Directory containing PPTX files (optional)
             html_dir: Directory to output HTML files (optional)
             compact: Whether to generate compact HTML without line breaks
+            cull: Whether to skip off-slide, zero-size and fully covered shapes
+            font_dir: Directory of font files to subset into WOFF2 web fonts (requires fontTools)
+            font_cache_dir: Directory caching font subsets between runs (optional)
+            search_index: Whether to write a full-text search index and its lookup script
+            ir_cache_dir: Directory caching the extracted deck IR, keyed by file path, mtime and size (optional)
+            hashed_assets: Whether to give media and css content-hashed file names and write asset-manifest.json
+            precompress: Encodings ("gzip,br") of .gz/.br siblings written for html, css and json outputs
+            precompress_ratio: Keep a compressed variant only if it is at most this fraction of the original size
+            template_cache: Whether to share resolved layouts, masters and their media between decks with the same template
+            template_cache_dir: Directory persisting the template cache between runs (implies template_cache)
+            limits: Pre-flight limits checked with scan() before a file is opened, e.g.
+                {"max_uncompressed_size": ..., "max_ratio": ..., "max_parts": ...} (optional)
+            svg_shapes: Whether to draw lines and auto shapes as inline svg, with layout shapes in one shared svg file
+            slide_cache_dir: Directory caching extracted and rendered slides across decks, keyed by slide content
+                (implies template_cache; slide media are named by content) (optional)
+            slide_cache_size: Size cap of the slide cache in bytes; least recently used entries are evicted
+            output_sink: OutputSink storing the output files (default: atomic writes to the local filesystem);
+                output directories of the form s3://bucket/prefix are uploaded with an S3Sink (requires boto3)
+            write_workers: Threads writing output files behind rendering (default: write synchronously)
+            sprites: Whether to pack small decoration images and pictures into one atlas png per deck,
+                drawn through css classes and described by [name]_atlas.json (requires Pillow)
+            sprite_max_size: Largest width/height in pixels of an image packed into the atlas
+            deck_timeout: Wall-clock seconds one deck may take; checked between stages, slides, shapes and
+                table rows, raising ConversionTimeout with the stage and slide reached (optional)
+            deck_cpu_timeout: CPU seconds one deck may take, checked like deck_timeout (optional)
+            mode: "html" for one html page per slide, or "text" for one semantic document per deck
+                holding only titles, paragraphs with levels, tables and notes (no media, layouts or styles)
+            text_format: Format of text mode documents, "html" or "json"
+            presentation_cache: Whether to keep opened presentations in memory, keyed by path, mtime and size,
+                so converting the same file again (e.g. other slides) skips parsing the package and
+                resolving its layouts; the whole file is opened once even when converting some slides
+            presentation_cache_entries: Number of presentations the process-wide presentation cache holds
+            presentation_cache_size: Estimated memory cap of the presentation cache in bytes; least
+                recently used presentations are dropped first
+            prefetch: Whether slides hint the browser to fetch the next slide's html and largest media ahead
+            keyboard_nav: Whether arrow and page keys swap in the neighbouring slide without a page load
         """
+        if mode not in ("html", "text"):
+            raise ValueError(f"Unknown conversion mode: {mode} (use html, text)")
+        if text_format not in ("html", "json"):
+            raise ValueError(f"Unknown text format: {text_format} (use html, json)")
         self.source_dir = source_dir
         self.html_dir = html_dir
         self.compact = compact
-
-    def convert_file(self, pptx_path: str, output_dir: Optional[str] = None) -> Dict[str, Any]:
+        self.cull = cull
+        self.font_dir = font_dir
+        self.font_cache_dir = font_cache_dir
+        self.search_index = search_index
+        self.ir_cache_dir = ir_cache_dir
+        self.hashed_assets = hashed_assets
+        self.precompress = parse_encodings(precompress)
+        self.precompress_ratio = precompress_ratio
+        self.template_cache = template_cache or bool(template_cache_dir) or bool(slide_cache_dir)
+        self.template_cache_dir = template_cache_dir
+        self.limits = limits
+        self.svg_shapes = svg_shapes
+        self.slide_cache_dir = slide_cache_dir
+        self.slide_cache_size = slide_cache_size
+        self.output_sink = output_sink
+        self.write_workers = write_workers
+        self.sprites = sprites
+        self.sprite_max_size = sprite_max_size
+        self.deck_timeout = deck_timeout
+        self.deck_cpu_timeout = deck_cpu_timeout
+        self.mode = mode
+        self.text_format = text_format
+        self.presentation_cache = presentation_cache
+        self.presentation_cache_entries = presentation_cache_entries
+        self.presentation_cache_size = presentation_cache_size
+        self.prefetch = prefetch
+        self.keyboard_nav = keyboard_nav
+        self._sinks = {}
+
+    def convert_file(self, pptx_path: str, output_dir: Optional[str] = None, slides=None) -> Dict[str, Any]:
         """
         Convert a single PPTX file to HTML.
 
         Args:
             pptx_path: Path to the PPTX file
-            output_dir: Output directory (overrides self.html_dir if provided)
+            output_dir: Output directory or s3://bucket/prefix location (overrides self.html_dir if provided)
+            slides: Only convert these slides, as 1-based numbers or a range string like "3-7,12".
+                Only their parts, layouts and masters are read and the index page is not rewritten.
 
         Returns:
             Dict containing conversion results and metadata
+
+        Raises:
+            ConversionTimeout: The deck ran past deck_timeout or deck_cpu_timeout
         """
+        with time_limits(self.deck_timeout, self.deck_cpu_timeout):
+            return self._convert_file(pptx_path, output_dir, slides)
+
+    def _convert_file(self, pptx_path, output_dir, slides):
         if not os.path.exists(pptx_path):
             raise FileNotFoundError(f"PPTX file not found: {pptx_path}")
+        checkpoint('scan')
+        if self.limits is not None:
+            # Reject oversized or pathological packages before python-pptx inflates them
+            scan(pptx_path, strict=True, **self.limits)
 
-        html_dir = output_dir or self.html_dir
-        if not html_dir:
-            html_dir = os.path.splitext(pptx_path)[0] + "_html"
-
-        os.makedirs(html_dir, exist_ok=True)
-
-        # Load the presentation
-        prs = Presentation(pptx_path)
-
-        # Determine theme fonts
-        try:
-            theme_major_font, theme_minor_font = get_theme_fonts(prs)
-        except Exception:
-            theme_major_font, theme_minor_font = None, None
+        location = output_dir or self.html_dir
+        if not location:
+            location = os.path.splitext(pptx_path)[0] + "_html"
+        output, html_dir = self._output(location)
+        output.makedirs(html_dir)
 
         filename_base = os.path.splitext(os.path.basename(pptx_path))[0]
-        num_slides = len(prs.slides)
-        slide_width_px = emu_to_px(prs.slide_width)
-        slide_height_px = emu_to_px(prs.slide_height)
-
-        # Map layouts to index for unique naming
-        layout_index_map = {id(layout): idx for idx, layout in enumerate(prs.slide_layouts, start=1)}
+        # Text artifacts are compressed in the background as soon as each one is written
+        precompressor = self._precompressor(output)
+        target = PrecompressingSink(precompressor) if precompressor is not None else output
+        try:
+            if self.mode == "text":
+                result = self._convert_outline(pptx_path, html_dir, filename_base, slides, target)
+            else:
+                slide_keys = {} if self.slide_cache_dir else None
+                leases = [] if self.presentation_cache else None
+                checkpoint('open')
+                deck, slide_irs = self._deck_ir(pptx_path, filename_base, slides, slide_keys, leases)
+
+                # Create structured output directories
+                output.makedirs(os.path.join(html_dir, "slides"))
+                output.makedirs(os.path.join(html_dir, "media"))
+                result = self._convert_deck(pptx_path, html_dir, filename_base, deck, slide_irs, target,
+                                            write_index=slides is None, slide_keys=slide_keys)
+                # a presentation goes back to the cache only after a conversion that finished
+                for entry in leases or ():
+                    self._presentations().checkin(entry)
+        finally:
+            compressed = precompressor.close() if precompressor is not None else []
+            output.flush()
+        if html_dir != location:
+            result["output_dir"] = location
+        result["generated_files"].extend(os.path.relpath(path, html_dir).replace(os.sep, '/') for path in compressed)
+        return result
+
+    def iter_convert(self, pptx_path: str, output_dir: Optional[str] = None, ordered: bool = True,
+                     workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Convert a PPTX file progressively, yielding each result as soon as it is written.
 
-        # Extract layout placeholder defaults per layout
-        layout_placeholder_defaults = {}
-        for layout in prs.slide_layouts:
-            try:
-                layout_placeholder_defaults[id(layout)] = get_layout_placeholder_defaults(layout, prs)
-            except Exception:
-                layout_placeholder_defaults[id(layout)] = {}
+        The index comes first, then slide 1; only slide 1's parts are read before both are out.
+        The remaining slides follow as they are rendered. Web fonts, search indexes, hashed
+        assets and precompression need the whole deck and are not produced in this mode.
 
-        # Create structured output directories
+        Args:
+            pptx_path: Path to the PPTX file
+            output_dir: Output directory (overrides self.html_dir if provided)
+            ordered: Whether slides are yielded in slide order; with workers, False yields
+                them as soon as any worker finishes
+            workers: Number of worker processes rendering slides 2..n (default: in-process)
+
+        Yields:
+            {"type": "index", "path", "slides_count", "seconds"}, then one
+            {"type": "slide", "number", "path", "html", "media", "culled_shapes", "seconds"}
+            per slide, then {"type": "done", "slides_count", "culled_shapes", "seconds"}
+        """
+        if not os.path.exists(pptx_path):
+            raise FileNotFoundError(f"PPTX file not found: {pptx_path}")
+        started = time.perf_counter()
+        html_dir = output_dir or self.html_dir or os.path.splitext(pptx_path)[0] + "_html"
+        if parse_output_url(html_dir) is not None:
+            raise ValueError("iter_convert writes to a local directory; use convert_file for s3:// outputs")
+        if self.mode == "text":
+            raise ValueError("iter_convert renders slide pages; use convert_file in text mode")
         slides_dir = os.path.join(html_dir, "slides")
-        media_dir = os.path.join(html_dir, "media")
         os.makedirs(slides_dir, exist_ok=True)
-        os.makedirs(media_dir, exist_ok=True)
-
-        # Generate index.html
-        generate_index_html(filename_base, num_slides, html_dir, self.compact)
+        os.makedirs(os.path.join(html_dir, "media"), exist_ok=True)
+        filename_base = os.path.splitext(os.path.basename(pptx_path))[0]
+        templates = TemplateCache.shared(self.template_cache_dir) if self.template_cache else None
+
+        # Opening only slide 1 also gives the slide count the index needs
+        prs, numbers, total = open_presentation(pptx_path, [1])
+        generate_index_html(filename_base, total, html_dir, self.compact)
+        yield {"type": "index", "path": os.path.join(html_dir, f"{filename_base}_index.html"),
+               "slides_count": total, "seconds": time.perf_counter() - started}
+        culled_shapes = 0
+        if numbers:
+            extractor = DeckExtractor(prs, filename_base, source=pptx_path, templates=templates)
+            extractor.deck.num_slides = total
+            first = render_slide_result(extractor.deck, extractor.extract_slide(1, prs.slides[0]),
+                                        slides_dir, self.compact, self.cull, svg_shapes=self.svg_shapes)
+            culled_shapes += first["culled_shapes"]
+            yield first
+
+        rest = list(range(2, total + 1))
+        if rest and (not workers or workers <= 1):
+            for event in iter_slide_results(pptx_path, rest, slides_dir, self.compact, self.cull, templates,
+                                            svg_shapes=self.svg_shapes):
+                culled_shapes += event["culled_shapes"]
+                yield event
+        elif rest:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            # small chunks keep every worker busy; each chunk reads only its own slides
+            size = max(1, -(-len(rest) // (workers * 4)))
+            chunks = [rest[k:k + size] for k in range(0, len(rest), size)]
+            pending = {}
+            next_number = 2
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(render_slide_chunk, pptx_path, chunk, slides_dir, self.compact, self.cull,
+                                       self.svg_shapes)
+                           for chunk in chunks]
+                for future in as_completed(futures):
+                    for event in future.result():
+                        culled_shapes += event["culled_shapes"]
+                        if not ordered:
+                            yield event
+                        else:
+                            pending[event["number"]] = event
+                    while next_number in pending:
+                        yield pending.pop(next_number)
+                        next_number += 1
+        yield {"type": "done", "slides_count": total, "culled_shapes": culled_shapes,
+               "seconds": time.perf_counter() - started}
+
+    def _precompressor(self, output):
+        if not self.precompress:
+            return None
+        return Precompressor(self.precompress, max_ratio=self.precompress_ratio, sink=output)
+
+    def _output(self, location):
+        """Return (sink, html_dir) for an output location.
+        s3://bucket/prefix locations get an S3Sink and html_dir becomes the key prefix; with
+        write_workers the sink is wrapped in a WriteBehindSink. Sinks are reused between conversions."""
+        s3 = parse_output_url(location)
+        key = s3[0] if s3 is not None else None
+        sink = self._sinks.get(key)
+        if sink is None:
+            if s3 is not None:
+                sink = S3Sink(s3[0])
+            else:
+                sink = self.output_sink if self.output_sink is not None else LocalSink()
+            if self.write_workers:
+                sink = WriteBehindSink(sink, workers=self.write_workers)
+            self._sinks[key] = sink
+        if s3 is not None:
+            return sink, s3[1] or "."
+        return sink, location
+
+    def _convert_deck(self, pptx_path, html_dir, filename_base, deck, slide_irs, output, write_index=True,
+                      slide_keys=None):
+        """Render a deck IR into html_dir through output (an OutputSink) and return the conversion result.
+        Slides with a content key in slide_keys go through the slide cache."""
+        num_slides = deck.num_slides
+        slides_dir = os.path.join(html_dir, "slides")
+        media_dir = os.path.join(html_dir, "media")
 
         # Process each slide
         generated_files = []
-        for i, slide in enumerate(prs.slides, 1):
-            # Get background style
-            bg_info = get_background_style(slide, prs)
-            if bg_info.startswith("picture:"):
-                # Handle picture background
-                parts = bg_info.split(':')
-                bg_img_bytes = eval(parts[1].split(',')[0])
-                bg_ext = parts[1].split(',')[1]
-                bg_filename = f"slide{i}_bg.{bg_ext}"
-                with open(os.path.join(media_dir, bg_filename), 'wb') as f:
-                    f.write(bg_img_bytes)
-                background_style = f"background-image: url('media/{bg_filename}'); background-size: cover; background-repeat: no-repeat; background-position: center;"
-                generated_files.append(f"media/{bg_filename}")
+        culled_shapes = 0
+        converted_slides = []
+        layer_svgs = set()
+        assets = AssetManifest(html_dir, output=output) if self.hashed_assets else None
+        font_css = None
+        if self.font_dir:
+            # Fonts are subset before rendering so slides can link the final stylesheet name
+            checkpoint('fonts')
+            slide_irs = list(slide_irs)
+            glyphs = GlyphCollector()
+            body_families = default_font_stack(deck.theme_minor_font)[:-1]
+            for slide_ir in slide_irs:
+                glyphs.add_slide(slide_ir, body_families)
+            # Ship only the glyphs this deck uses for each locally available font
+            css, font_files = build_font_faces(glyphs, self.font_dir, media_dir, self.font_cache_dir, output=output)
+            if assets is not None:
+                for fname in font_files:
+                    # subset file names already carry their content hash
+                    assets.publish(f"media/{fname}", output.read(os.path.join(media_dir, fname)), hashed=False)
+                font_css = "../" + assets.publish("media/fonts.css", css.encode('utf-8'))
             else:
-                background_style = bg_info
-
-            # Collect layout images and master images
-            layout_images_filtered, layout_shapes, background_style = collect_layout_elements(
-                slide.slide_layout, layout_index_map, media_dir, slide_width_px, slide_height_px, background_style
-            )
-
-            # Update layout image paths to include media/ prefix
-            layout_images_filtered = [(f"../media/{fname}", left, top, w, h) for fname, left, top, w, h in layout_images_filtered]
-
-            # Update background style to use media/ prefix if it contains a picture
-            if "url('" in background_style and not background_style.startswith("background-image: url('media/"):
-                # Replace url('filename') with url('media/filename')
-                import re
-                background_style = re.sub(r"url\('([^']+)'\)", r"url('../media/\1')", background_style)
+                output.write(os.path.join(media_dir, "fonts.css"), css.encode('utf-8'))
+                generated_files.extend(f"media/{fname}" for fname in font_files)
+                generated_files.append("media/fonts.css")
+                font_css = "../media/fonts.css"
+        atlas = None
+        if self.sprites:
+            # Packing needs every image the deck shows, so slides are extracted before rendering
+            slide_irs = list(slide_irs)
+            checkpoint('sprites')
+            atlas = build_sprite_atlas(deck, slide_irs, filename_base, self.sprite_max_size)
+            if atlas is not None:
+                generated_files.extend(self._write_atlas(atlas, media_dir, filename_base, assets, output))
+        slide_cache = None
+        if slide_keys is not None:
+            slide_cache = SlideCache.shared(self.slide_cache_dir, self.slide_cache_size)
+            cache_hits, cache_misses = slide_cache.hits, slide_cache.misses
+        search = None
+        if self.search_index:
+            search = SearchIndexBuilder()
+            deck_id = search.add_deck(filename_base, f"{filename_base}_index.html", "slides/slide{n}.html")
+        if self.keyboard_nav:
+            write_nav_js(slides_dir, output=output)
+            generated_files.append("slides/nav.js")
+        # Slides are extracted one ahead of rendering, so each can hint at the next one's media
+        slide_irs = iter(slide_irs)
+        upcoming = next(slide_irs, None)
+        while upcoming is not None:
+            slide_ir, upcoming = upcoming, next(slide_irs, None)
+            i = slide_ir.number
+            checkpoint('render', i)
+            if slide_ir.background_media is not None and assets is None:
+                generated_files.append(f"media/{slide_ir.background_media.filename}")
 
             # Create navigation (relative paths within slides directory)
-            prev_link = f'<a href="slide{i-1}.html">上一页</a>' if i > 1 else ''
-            next_link = f'<a href="slide{i+1}.html">下一页</a>' if i < num_slides else ''
-            nav = f'<div class="nav">{prev_link} {next_link}</div>'
+            nav = slide_nav(i, num_slides)
+            prefetch_names = []
+            if self.prefetch and upcoming is not None and upcoming.number == i + 1:
+                # hashed names are published now; the next slide finds them in the manifest
+                prefetch_names = [write_media(deck, ref, None, assets=assets, output=output)
+                                  for ref in next_slide_media(deck, slide_ir, upcoming, atlas)]
+            head = slide_hints(i, num_slides, prefetch_names, prefetch=self.prefetch, keyboard_nav=self.keyboard_nav)
 
             # Generate slide HTML in slides directory
-            generate_slide_html(
-                i, num_slides, theme_minor_font, slide_width_px, slide_height_px,
-                background_style, nav, layout_images_filtered, layout_shapes,
-                slide, prs, layout_placeholder_defaults, slides_dir, self.compact
-            )
+            layer = deck.layers.get(slide_ir.layer)
+            if slide_keys and i in slide_keys:
+                culled_shapes += self._render_cached(slide_cache, slide_keys[i], deck, slide_ir, nav, slides_dir,
+                                                     media_dir, font_css, assets, output, atlas, head)
+            else:
+                culled_shapes += generate_slide_html(
+                    deck, slide_ir, nav, slides_dir, self.compact, cull=self.cull, font_css=font_css, assets=assets,
+                    svg_shapes=self.svg_shapes, output=output, sprites=atlas, head=head
+                )
+            if self.svg_shapes and assets is None and layer is not None and layer.shapes:
+                layer_svg = layer_svg_name(layer)
+                if layer_svg not in layer_svgs:
+                    layer_svgs.add(layer_svg)
+                    generated_files.append(f"media/{layer_svg}")
             generated_files.append(f"slides/slide{i}.html")
+            converted_slides.append(i)
+            if search is not None:
+                search.add_slide(deck_id, slide_ir)
+
+        if assets is not None:
+            generated_files.extend(entry["file"] for entry in assets.assets.values())
+            manifest_path = assets.write()
+            generated_files.append(MANIFEST_NAME)
 
         # Generate index file in root
         index_file = f"{filename_base}_index.html"
-        generated_files.append(index_file)
 
-        return {
+        result = {
             "pptx_file": pptx_path,
             "output_dir": html_dir,
             "slides_count": num_slides,
             "generated_files": generated_files,
-            "index_file": os.path.join(html_dir, index_file)
+            "index_file": os.path.join(html_dir, index_file),
+            "culled_shapes": culled_shapes
         }
+        if not write_index:
+            result["converted_slides"] = converted_slides
+
+        if slide_cache is not None:
+            result["slide_cache"] = {"hits": slide_cache.hits - cache_hits, "misses": slide_cache.misses - cache_misses}
+
+        if assets is not None:
+            result["asset_manifest"] = manifest_path
+
+        if search is not None:
+            checkpoint('search')
+            search_file = f"{filename_base}_search.json"
+            search.write(os.path.join(html_dir, search_file), output=output)
+            write_search_js(html_dir, output=output)
+            generated_files.extend([search_file, "search.js"])
+            result["search_index"] = os.path.join(html_dir, search_file)
+
+        if atlas is not None:
+            result["sprites"] = len(atlas)
+
+        if write_index:
+            # The index goes last, once everything it links to is stored, so a reader
+            # entering through it never sees a partially written deck
+            checkpoint('write')
+            output.flush()
+            checkpoint('index')
+            generate_index_html(filename_base, num_slides, html_dir, self.compact, output=output)
+            generated_files.append(index_file)
+
+        return result
+
+    @staticmethod
+    def _write_atlas(atlas, media_dir, name, assets, output):
+        """Write a sprite atlas (png, css and the JSON atlas map), set its css_href and return
+        the written files not recorded in the asset manifest."""
+        image_file, css_file, map_file = f"{name}_atlas.png", f"{name}_atlas.css", f"{name}_atlas.json"
+        if assets is not None:
+            image_file = assets.publish(f"media/{image_file}", atlas.png)[len("media/"):]
+            css_file = assets.publish(f"media/{css_file}", atlas.css(image_file).encode('utf-8'))[len("media/"):]
+            written = []
+        else:
+            output.write(os.path.join(media_dir, image_file), atlas.png)
+            output.write(os.path.join(media_dir, css_file), atlas.css(image_file).encode('utf-8'))
+            written = [f"media/{image_file}", f"media/{css_file}"]
+        output.write(os.path.join(media_dir, map_file), atlas.map_json(image_file).encode('utf-8'))
+        atlas.css_href = f"../media/{css_file}"
+        return written + [f"media/{map_file}"]
+
+    def _convert_outline(self, pptx_path, html_dir, filename_base, slides, output):
+        """Text mode: write a deck's titles, paragraphs, tables and notes as one html or JSON
+        document through output and return the conversion result. Only the slide and notes
+        XML is read, never media, layouts, masters or themes."""
+        checkpoint('open')
+        outline = read_outline(pptx_path, filename_base, slides)
+        checkpoint('write')
+        text_file = f"{filename_base}.{self.text_format}"
+        path = os.path.join(html_dir, text_file)
+        if self.text_format == "json":
+            data = render_outline_json(outline, indent=None if self.compact else 2)
+            output.write(path, data.encode('utf-8'))
+        else:
+            write_html(path, lambda f: render_outline_html(outline, f, self.compact), output)
+        result = {
+            "pptx_file": pptx_path,
+            "output_dir": html_dir,
+            "slides_count": outline["slides_count"],
+            "generated_files": [text_file],
+            "text_file": path,
+            "culled_shapes": 0
+        }
+        if slides is not None:
+            result["converted_slides"] = [slide["number"] for slide in outline["slides"]]
+        if self.search_index:
+            checkpoint('search')
+            search = SearchIndexBuilder()
+            deck_id = search.add_deck(filename_base, text_file, f"{text_file}#slide-{{n}}")
+            for slide in outline["slides"]:
+                search.add(deck_id, slide["number"], outline_text(slide))
+            search_file = f"{filename_base}_search.json"
+            search.write(os.path.join(html_dir, search_file), output=output)
+            write_search_js(html_dir, output=output)
+            result["generated_files"].extend([search_file, "search.js"])
+            result["search_index"] = os.path.join(html_dir, search_file)
+        return result
+
+    def _render_cached(self, slide_cache, key, deck, slide_ir, nav, slides_dir, media_dir, font_css, assets, output,
+                       atlas=None, head=None):
+        """Write a slide's html from the slide cache, rendering it on a miss; returns the culled count.
+        A hit only fills in the slide number, navigation and stylesheet hrefs, then writes the media
+        the html references.
+        The head lines depend on the neighbouring slides, so they are added after the cache."""
+        def render(nav):
+            buf = io.StringIO()
+            media = []
+            culled = generate_slide_html(deck, slide_ir, nav, None, self.compact, sink=buf, cull=self.cull,
+                                         font_css=font_css, assets=assets, media_dir=media_dir,
+                                         svg_shapes=self.svg_shapes, media_log=media, output=output, sprites=atlas)
+            return buf.getvalue(), culled, media
+
+        # the hrefs differ per deck, so the key only records whether they are linked
+        sprite_css = atlas.css_href if atlas is not None else None
+        options = {"compact": self.compact, "cull": self.cull, "svg_shapes": self.svg_shapes,
+                   "font_css": bool(font_css), "hashed_assets": assets is not None, "sprites": bool(sprite_css)}
+        html, culled, media = slide_cache.render(key, options, deck, slide_ir, nav, render, font_css=font_css,
+                                                 sprite_css=sprite_css)
+        html = insert_head_lines(html, head, self.compact)
+        for ref in media:
+            # media are named by content, so an existing file already holds the right bytes
+            write_media(deck, ref, media_dir, overwrite=False, assets=assets, output=output)
+        layer = deck.layers.get(slide_ir.layer)
+        if self.svg_shapes and layer is not None and layer.shapes:
+            write_layer_svg(deck, layer, media_dir, cull=self.cull, assets=assets, output=output)
+        output.write(os.path.join(slides_dir, f"slide{slide_ir.number}.html"), html.encode('utf-8'))
+        return culled
+
+    def _presentations(self):
+        return PresentationCache.shared(self.presentation_cache_entries, self.presentation_cache_size)
+
+    def _deck_ir(self, pptx_path: str, name: str, slides=None, slide_keys=None, leases=None):
+        """
+        Return the deck IR and an iterable of its slide IRs, limited to slides if given.
+
+        Without an IR cache, slides are extracted lazily while they are rendered. With
+        one, a cached IR is reused when the file is unchanged, otherwise it is built and saved.
+        Partial conversions only read the cache, since they do not extract the whole deck.
+        With slide_keys (a dict), slides go through the slide cache and their content keys are recorded there.
+        With leases (a list), the presentation comes from the presentation cache and the
+        checked out entry is appended, for the caller to check in once the slides are rendered.
+        """
+        cache_path = None
+        if self.ir_cache_dir:
+            st = os.stat(pptx_path)
+            key = hashlib.sha1(
+                f"{os.path.abspath(pptx_path)}|{st.st_mtime_ns}|{st.st_size}|{IR_VERSION}".encode('utf-8')
+            ).hexdigest()
+            cache_path = os.path.join(self.ir_cache_dir, f"{name}-{key[:16]}.ir.json.gz")
+            if os.path.exists(cache_path):
+                try:
+                    deck = load_deck(cache_path)
+                    deck.source = pptx_path
+                    if slides is not None:
+                        wanted = set(parse_slide_ranges(slides, deck.num_slides))
+                        return deck, [slide_ir for slide_ir in deck.slides if slide_ir.number in wanted]
+                    return deck, deck.slides
+                except Exception:
+                    pass
+
+        templates = TemplateCache.shared(self.template_cache_dir) if self.template_cache else None
+        if leases is not None:
+            entry = self._presentations().checkout(pptx_path, name, templates)
+            leases.append(entry)
+            extractor, prs = entry.extractor, entry.prs
+            total = len(prs.slides)
+            numbers = parse_slide_ranges(slides, total) if slides is not None else list(range(1, total + 1))
+            deck_slides = [prs.slides[number - 1] for number in numbers]
+        else:
+            prs, numbers, total = open_presentation(pptx_path, slides)
+            extractor = DeckExtractor(prs, name, source=pptx_path, templates=templates)
+            deck_slides = prs.slides
+        extractor.deck.num_slides = total
+        if slide_keys is not None:
+            slide_cache = SlideCache.shared(self.slide_cache_dir, self.slide_cache_size)
+            slide_irs = self._cached_slide_irs(slide_cache, extractor, numbers, deck_slides, slide_keys)
+        else:
+            slide_irs = (extractor.extract_slide(i, slide) for i, slide in zip(numbers, deck_slides))
+        if cache_path is None or slides is not None:
+            return extractor.deck, slide_irs
+        deck = extractor.deck
+        deck.slides = list(slide_irs)
+        os.makedirs(self.ir_cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        save_deck(deck, tmp_path)
+        os.replace(tmp_path, cache_path)
+        return deck, deck.slides
+
+    @staticmethod
+    def _cached_slide_irs(slide_cache, extractor, numbers, slides, slide_keys):
+        for number, slide in zip(numbers, slides):
+            slide_ir, slide_keys[number] = slide_cache.extract_slide(extractor, number, slide)
+            yield slide_ir
 
     def convert_directory(self, source_dir: Optional[str] = None, output_dir: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -145,7 +573,7 @@ class PPTXToHTMLConverter:
 
         Args:
             source_dir: Source directory (overrides self.source_dir if provided)
-            output_dir: Output directory (overrides self.html_dir if provided)
+            output_dir: Output directory or s3://bucket/prefix location (overrides self.html_dir if provided)
 
         Returns:
             Dict containing conversion results for all files
@@ -157,11 +585,11 @@ class PPTXToHTMLConverter:
         if not os.path.exists(src_dir):
             raise FileNotFoundError(f"Source directory not found: {src_dir}")
 
-        html_dir = output_dir or self.html_dir
-        if not html_dir:
-            html_dir = os.path.join(src_dir, "html_output")
-
-        os.makedirs(html_dir, exist_ok=True)
+        location = output_dir or self.html_dir
+        if not location:
+            location = os.path.join(src_dir, "html_output")
+        output, html_dir = self._output(location)
+        output.makedirs(html_dir)
 
         results = []
         pptx_files = [f for f in os.listdir(src_dir) if f.endswith('.pptx')]
@@ -169,9 +597,18 @@ class PPTXToHTMLConverter:
         for filename in pptx_files:
             pptx_path = os.path.join(src_dir, filename)
             try:
-                result = self.convert_file(pptx_path, html_dir)
+                result = self.convert_file(pptx_path, location)
                 results.append(result)
                 print(f"Converted {filename} to HTML")
+            except ConversionTimeout as e:
+                # a deck over its time limit is abandoned and the batch moves on
+                print(f"Timed out converting {filename}: {e}")
+                results.append({
+                    "pptx_file": pptx_path,
+                    "error": str(e),
+                    "stage": e.stage,
+                    "slide": e.slide
+                })
             except Exception as e:
                 print(f"Failed to convert {filename}: {e}")
                 results.append({
@@ -179,19 +616,38 @@ class PPTXToHTMLConverter:
                     "error": str(e)
                 })
 
-        # Generate main index if multiple files
-        if len(results) > 1:
-            generate_main_html(src_dir, html_dir, self.compact)
-            main_index = os.path.join(html_dir, "main.html")
-            print(f"Generated main index: {main_index}")
-
-        return {
-            "source_dir": src_dir,
-            "output_dir": html_dir,
-            "converted_files": len([r for r in results if "error" not in r]),
-            "failed_files": len([r for r in results if "error" in r]),
-            "results": results
-        }
+        precompressor = self._precompressor(output)
+        target = PrecompressingSink(precompressor) if precompressor is not None else output
+        try:
+            # Generate main index if multiple files
+            # text mode writes no per-deck index pages for main.html to link
+            if len(results) > 1 and self.mode != "text":
+                generate_main_html(src_dir, html_dir, self.compact, output=target)
+                main_index = os.path.join(html_dir, "main.html")
+                print(f"Generated main index: {main_index}")
+
+            summary = {
+                "source_dir": src_dir,
+                "output_dir": location,
+                "converted_files": len([r for r in results if "error" not in r]),
+                "failed_files": len([r for r in results if "error" in r]),
+                "results": results
+            }
+
+            if self.search_index:
+                # Merge the per-deck indexes into one batch index
+                batch_index = SearchIndexBuilder()
+                for r in results:
+                    if r.get("search_index"):
+                        batch_index.merge(SearchIndexBuilder.load(r["search_index"], output=output))
+                batch_index.write(os.path.join(html_dir, "search-index.json"), output=target)
+                summary["search_index"] = os.path.join(html_dir, "search-index.json")
+        finally:
+            if precompressor is not None:
+                precompressor.close()
+            output.flush()
+
+        return summary
 
 
 def convert_pptx_to_html(pptx_path: str, output_dir: Optional[str] = None, compact: bool = False) -> Dict[str, Any]:
@@ -226,26 +682,205 @@ def convert_pptx_directory(source_dir: str, output_dir: Optional[str] = None, co
     return converter.convert_directory(source_dir, output_dir)
 
 
+def iter_convert(pptx_path: str, output_dir: Optional[str] = None, ordered: bool = True,
+                 workers: Optional[int] = None, compact: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Convenience generator converting a PPTX file progressively (see PPTXToHTMLConverter.iter_convert).
+
+    Args:
+        pptx_path: Path to the PPTX file
+        output_dir: Output directory (optional)
+        ordered: Whether slides are yielded in slide order
+        workers: Number of worker processes (optional)
+        compact: Whether to generate compact HTML
+
+    Yields:
+        Index, slide and done events
+    """
+    converter = PPTXToHTMLConverter(compact=compact)
+    return converter.iter_convert(pptx_path, output_dir, ordered=ordered, workers=workers)
+
+
+def render_slide(prs_or_path, index: int, output_dir: Optional[str] = None, compact: bool = False,
+                 cull: bool = True, svg_shapes: bool = False, cache: Optional[PresentationCache] = None) -> str:
+    """
+    Render one slide to HTML, for previews.
+
+    When given a path, only that slide's parts, its layout and its master are read, so the
+    cost does not grow with the size of the deck.
+
+    Args:
+        prs_or_path: Path to a PPTX file, or an opened python-pptx Presentation
+        index: 1-based slide number
+        output_dir: Conversion output directory whose media/ folder receives the slide's media (optional)
+        compact: Whether to generate compact HTML
+        cull: Whether to skip off-slide, zero-size and fully covered shapes
+        svg_shapes: Whether to draw lines and auto shapes as svg (the layout layer's svg goes to output_dir)
+        cache: PresentationCache to take the opened presentation from when given a path; the whole
+            file is then parsed once and later slides of it render without reading it again
+
+    Returns:
+        The slide's HTML
+
+    Raises:
+        IndexError: index is not a slide of the presentation
+    """
+    entry = None
+    if isinstance(prs_or_path, str) and cache is not None:
+        entry = cache.checkout(prs_or_path)
+        total = len(entry.prs.slides)
+        if not 1 <= index <= total:
+            cache.checkin(entry)
+            raise IndexError(f"Slide {index} out of range (1-{total})")
+        extractor, slide = entry.extractor, entry.prs.slides[index - 1]
+    elif isinstance(prs_or_path, str):
+        total = slide_count(prs_or_path)
+        if not 1 <= index <= total:
+            raise IndexError(f"Slide {index} out of range (1-{total})")
+        prs, _, total = open_presentation(prs_or_path, [index])
+        name = os.path.splitext(os.path.basename(prs_or_path))[0]
+        source, slide = prs_or_path, prs.slides[0]
+    else:
+        prs, total = prs_or_path, len(prs_or_path.slides)
+        if not 1 <= index <= total:
+            raise IndexError(f"Slide {index} out of range (1-{total})")
+        name, source, slide = "presentation", None, prs.slides[index - 1]
+    if entry is None:
+        extractor = DeckExtractor(prs, name, source=source)
+    extractor.deck.num_slides = total
+    slide_ir = extractor.extract_slide(index, slide)
+    media_dir = None
+    if output_dir:
+        media_dir = os.path.join(output_dir, "media")
+        os.makedirs(media_dir, exist_ok=True)
+    buf = io.StringIO()
+    generate_slide_html(extractor.deck, slide_ir, slide_nav(index, total), None, compact, sink=buf, cull=cull,
+                        media_dir=media_dir, svg_shapes=svg_shapes)
+    if entry is not None:
+        cache.checkin(entry)
+    return buf.getvalue()
+
+
 def main():
     """Command line interface."""
     import argparse
 
     parser = argparse.ArgumentParser(description='Convert PPTX files to HTML (one slide per HTML).')
-    parser.add_argument('input', help='Input PPTX file or directory')
-    parser.add_argument('--output', '-o', help='Output directory')
+    parser.add_argument('input', nargs='?', help='Input PPTX file or directory')
+    parser.add_argument('--output', '-o', help='Output directory, or s3://bucket/prefix to upload to an S3-compatible store '
+                                               '(requires boto3; set AWS_ENDPOINT_URL for a local or non-AWS endpoint)')
+    parser.add_argument('--jobs-file', help='Run the jobs of a JSONL manifest ("-" for stdin), one '
+                                            '{"input", "output", "options", "id"} object per line.')
+    parser.add_argument('--results', help='Append one JSON result line per job to this file and skip jobs it already '
+                                           'records (default: write results to stdout).')
+    parser.add_argument('--retry-failed', action='store_true', help='With --results, run jobs that failed before again.')
+    parser.add_argument('--workers', type=int, help='Worker processes for --jobs-file (default: run jobs in this process).')
+    parser.add_argument('--scan', action='store_true', help='Only print a pre-flight report (counts, sizes, predicted cost) as JSON.')
+    parser.add_argument('--max-uncompressed-size', type=int, help='Reject files whose parts inflate to more than this many bytes.')
+    parser.add_argument('--max-ratio', type=float, help='Reject files with a part compressed more than this ratio (zip bombs).')
+    parser.add_argument('--max-parts', type=int, help='Reject files with more zip entries than this.')
+    parser.add_argument('--slides', help='Only convert these slides of a single file, e.g. 3-7,12 (the index page is left as is).')
+    parser.add_argument('--text-only', action='store_true',
+                        help='Only extract titles, paragraphs, tables and notes into one document per deck (no media or layout).')
+    parser.add_argument('--text-format', choices=('html', 'json'), default='html',
+                        help='Format of --text-only documents (default: html).')
+    parser.add_argument('--no-prefetch', action='store_true',
+                        help="Do not hint browsers to fetch the next slide's html and largest media ahead.")
+    parser.add_argument('--keyboard-nav', action='store_true',
+                        help='Let arrow and page keys swap in the neighbouring slide without a page load.')
     parser.add_argument('--compact', action='store_true', help='Write compact HTML (no line breaks, useful for minimal output).')
+    parser.add_argument('--no-cull', action='store_true', help='Keep shapes that are off the slide, empty or fully covered.')
+    parser.add_argument('--svg-shapes', action='store_true',
+                        help='Draw lines and auto shapes as inline SVG; layout shapes go to one shared SVG per layout.')
+    parser.add_argument('--slide-cache-dir',
+                        help='Directory caching extracted and rendered slides, reused by any deck containing the same slide.')
+    parser.add_argument('--slide-cache-size', type=int, default=DEFAULT_SLIDE_CACHE_SIZE // 1024 ** 2,
+                        help='Size cap of the slide cache in MB (default: 512).')
+    parser.add_argument('--font-dir', help='Directory of font files to subset into WOFF2 web fonts (requires fontTools).')
+    parser.add_argument('--font-cache-dir', help='Directory caching font subsets between runs.')
+    parser.add_argument('--search-index', action='store_true', help='Also write a full-text search index (JSON) and search.js.')
+    parser.add_argument('--ir-cache-dir', help='Directory caching the parsed deck IR between runs.')
+    parser.add_argument('--hashed-assets', action='store_true', help='Give media and css content-hashed names and write asset-manifest.json.')
+    parser.add_argument('--precompress', help='Also write precompressed siblings of html/css/json outputs, e.g. gzip,br (br requires brotli).')
+    parser.add_argument('--precompress-ratio', type=float, default=DEFAULT_MAX_RATIO,
+                        help='Drop a compressed variant larger than this fraction of the original (default: 0.9).')
+    parser.add_argument('--template-cache', action='store_true',
+                        help='Reuse resolved masters, layouts and their media across decks sharing a template.')
+    parser.add_argument('--template-cache-dir', help='Directory persisting the template cache between runs.')
+    parser.add_argument('--presentation-cache', action='store_true',
+                        help='Keep opened presentations in memory, so jobs converting the same file again skip parsing it.')
+    parser.add_argument('--sprites', action='store_true',
+                        help='Pack small decoration images and pictures into one sprite atlas per deck (requires Pillow).')
+    parser.add_argument('--sprite-max-size', type=int, default=SPRITE_MAX_SIZE,
+                        help='Largest width/height in pixels of an image packed into the atlas (default: 128).')
+    parser.add_argument('--deck-timeout', type=float,
+                        help='Abandon a deck after this many seconds; with --workers, a stuck worker is killed and replaced.')
+    parser.add_argument('--deck-cpu-timeout', type=float, help='Abandon a deck after this many seconds of CPU time.')
+    parser.add_argument('--write-workers', type=int, default=0,
+                        help='Threads writing output files while rendering continues (default: write synchronously).')
 
     args = parser.parse_args()
+    if not args.input and not args.jobs_file:
+        parser.error('an input file or directory, or --jobs-file, is required')
+
+    limits = {key: value for key, value in (("max_uncompressed_size", args.max_uncompressed_size),
+                                            ("max_ratio", args.max_ratio), ("max_parts", args.max_parts))
+              if value is not None}
+    if args.scan:
+        import json
+        paths = [args.input]
+        if os.path.isdir(args.input):
+            paths = [os.path.join(args.input, f) for f in sorted(os.listdir(args.input)) if f.endswith('.pptx')]
+        for path in paths:
+            try:
+                print(json.dumps(scan(path, **limits), ensure_ascii=False))
+            except PPTXLimitError as e:
+                print(json.dumps({"path": path, "violations": e.violations, "ok": False}, ensure_ascii=False))
+        return 0
+
+    options = dict(compact=args.compact, cull=not args.no_cull,
+                   font_dir=args.font_dir, font_cache_dir=args.font_cache_dir,
+                   search_index=args.search_index, ir_cache_dir=args.ir_cache_dir,
+                   hashed_assets=args.hashed_assets, precompress=args.precompress,
+                   precompress_ratio=args.precompress_ratio, template_cache=args.template_cache,
+                   template_cache_dir=args.template_cache_dir, presentation_cache=args.presentation_cache,
+                   limits=limits or None,
+                   svg_shapes=args.svg_shapes, slide_cache_dir=args.slide_cache_dir,
+                   slide_cache_size=args.slide_cache_size * 1024 ** 2, write_workers=args.write_workers,
+                   sprites=args.sprites, sprite_max_size=args.sprite_max_size,
+                   deck_timeout=args.deck_timeout, deck_cpu_timeout=args.deck_cpu_timeout,
+                   mode="text" if args.text_only else "html", text_format=args.text_format,
+                   prefetch=not args.no_prefetch, keyboard_nav=args.keyboard_nav)
+
+    if args.jobs_file:
+        # command line options are the defaults each job's "options" override
+        manifest = sys.stdin if args.jobs_file == '-' else open(args.jobs_file, 'r', encoding='utf-8')
+        skip = None
+        out = sys.stdout
+        if args.results:
+            skip = load_done(args.results, retry_failed=args.retry_failed)
+            out = open_results(args.results)
+        try:
+            counts = run_jobs(iter_jobs(manifest), out, workers=args.workers, defaults=options, skip=skip)
+        finally:
+            if manifest is not sys.stdin:
+                manifest.close()
+            if out is not sys.stdout:
+                out.close()
+        print(f"Jobs: {counts['ok']} converted, {counts['error']} failed, {counts['skipped']} skipped", file=sys.stderr)
+        return 1 if counts['error'] else 0
 
-    converter = PPTXToHTMLConverter(compact=args.compact)
+    converter = PPTXToHTMLConverter(**options)
 
     input_path = args.input
     if os.path.isfile(input_path) and input_path.endswith('.pptx'):
         # Convert single file
-        result = converter.convert_file(input_path, args.output)
+        result = converter.convert_file(input_path, args.output, slides=args.slides)
         print(f"Converted {os.path.basename(input_path)} to HTML")
         print(f"Output directory: {result['output_dir']}")
         print(f"Generated {len(result['generated_files'])} files")
+        if result['culled_shapes']:
+            print(f"Skipped {result['culled_shapes']} invisible shapes")
     elif os.path.isdir(input_path):
         # Convert directory
         result = converter.convert_directory(input_path, args.output)
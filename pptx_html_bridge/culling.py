@@ -0,0 +1,116 @@
+import math
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+# Raster formats without an alpha channel; PNG/GIF/TIFF may be transparent
+OPAQUE_IMAGE_EXTS = ('jpg', 'jpeg', 'bmp')
+GRID_CELLS = 8
+
+
+class BoxIndex:
+    """Uniform grid over the slide canvas holding the boxes of opaque elements.
+
+    Any box that contains another box also contains its top-left corner, so a
+    containment query only has to look at the single grid cell of that corner."""
+
+    def __init__(self, width, height, cells=GRID_CELLS):
+        self.cells = cells
+        self.cell_w = max(1, width) / cells
+        self.cell_h = max(1, height) / cells
+        self.grid = [[] for _ in range(cells * cells)]
+
+    def _cell(self, x, y):
+        cx = min(self.cells - 1, max(0, int(x / self.cell_w)))
+        cy = min(self.cells - 1, max(0, int(y / self.cell_h)))
+        return cx, cy
+
+    def insert(self, box):
+        x0, y0 = self._cell(box[0], box[1])
+        x1, y1 = self._cell(box[2], box[3])
+        for cy in range(y0, y1 + 1):
+            row = cy * self.cells
+            for cx in range(x0, x1 + 1):
+                self.grid[row + cx].append(box)
+
+    def covers(self, box):
+        """Return True if any inserted box fully contains box."""
+        cx, cy = self._cell(box[0], box[1])
+        for other in self.grid[cy * self.cells + cx]:
+            if other[0] <= box[0] and other[1] <= box[1] and other[2] >= box[2] and other[3] >= box[3]:
+                return True
+        return False
+
+
+def _bounds(left, top, width, height, rotation):
+    """Return the (x0, y0, x1, y1) area an element may paint.
+    Shapes are rotated about their top-left corner, so rotated ones get the
+    conservative square reachable from that corner."""
+    if rotation:
+        r = math.hypot(width, height)
+        return (left - r, top - r, left + r, top + r)
+    return (left, top, left + width, top + height)
+
+
+def is_painted_auto_shape(shape):
+    """True if generate_slide_html renders this auto shape as a filled box rather than a text frame."""
+    return shape.shape_type == MSO_SHAPE_TYPE.AUTO_SHAPE and not (hasattr(shape, 'text_frame') and shape.text_frame)
+
+
+def shape_is_opaque(shape, width, height, rotation):
+    """True if a slide shape paints every pixel of its box in the generated html."""
+    try:
+        if rotation:
+            return False
+        if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
+            image = shape.image
+            if image.ext not in OPAQUE_IMAGE_EXTS:
+                return False
+            # images use object-fit: contain, so a differing aspect ratio leaves gaps
+            iw, ih = image.size
+            return bool(iw and ih and height) and abs(iw / ih - width / height) < 0.01
+        if is_painted_auto_shape(shape):
+            if shape.auto_shape_type != 1:  # MSO_SHAPE.RECTANGLE
+                return False
+            fill = shape.fill
+            if fill.type != 1:  # MSO_FILL.SOLID
+                return False
+            return fill._xPr.find('.//{http://schemas.openxmlformats.org/drawingml/2006/main}alpha') is None
+    except Exception:
+        pass
+    return False
+
+
+def cull_slide_elements(layer_images, layer_shapes, shapes, slide_width_px, slide_height_px):
+    """Drop elements that can never be visible on the slide.
+
+    All three lists hold ShapeIR. An element is dropped when it lies entirely off
+    the canvas, has no area, or its on-canvas part is fully covered by an opaque
+    element higher in the z-order (layer images < layer shapes < slide shapes,
+    then document order). Returns (layer_images, layer_shapes, shapes, dropped_count)."""
+    elements = []
+    for layer, items in enumerate((layer_images, layer_shapes, shapes)):
+        for item in items:
+            elements.append((layer, item))
+
+    index = BoxIndex(slide_width_px, slide_height_px)
+    kept = [[], [], []]
+    dropped = 0
+    # Walk from the top of the z-order down so every occluder is indexed before what it hides
+    for layer, item in reversed(elements):
+        if item.left is not None:
+            x0, y0, x1, y1 = _bounds(item.left, item.top, item.width, item.height, item.rotation)
+            # lines and text frames still paint with a zero-extent box
+            may_be_thin = item.kind in ('line', 'text')
+            empty = (x1 <= x0 and y1 <= y0) if may_be_thin else (x1 <= x0 or y1 <= y0)
+            clipped = (max(x0, 0), max(y0, 0), min(x1, slide_width_px), min(y1, slide_height_px))
+            off_canvas = clipped[0] > clipped[2] or clipped[1] > clipped[3] or (
+                not may_be_thin and (clipped[0] == clipped[2] or clipped[1] == clipped[3]))
+            if empty or off_canvas or index.covers(clipped):
+                dropped += 1
+                continue
+            if item.opaque:
+                index.insert(clipped)
+        kept[layer].append(item)
+
+    for layer_items in kept:
+        layer_items.reverse()
+    return kept[0], kept[1], kept[2], dropped
@@ -0,0 +1,356 @@
+import ast
+import os
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.enum.shapes import PP_PLACEHOLDER
+from .converters import emu_to_px, emu_to_pt, color_to_hex
+from .themes import get_background_style, get_theme_fonts
+from .fonts import get_effective_font, get_layout_placeholder_defaults
+from .tables import extract_table
+from .charts import extract_chart
+from .groups import flatten_shapes
+from .culling import shape_is_opaque
+from .layout_processors import extract_layer
+from .slicing import slice_package
+from .vectors import vector_geometry
+from .watchdog import checkpoint
+from .ir import DeckIR, SlideIR, ShapeIR, ParagraphIR, RunIR, MediaRef
+
+ALIGN_MAP = {0: "left", 1: "center", 2: "right", 3: "justify"}
+VIDEO_EXTS = ('mp4', 'avi', 'mov', 'wmv')
+
+
+def _rgb_hex(rgb):
+    return f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}"
+
+
+def _run_color(run, layout_defaults):
+    """Resolve a run's text color: direct RGB, theme color, layout default, then raw color object."""
+    text_color = None
+    # First try: direct RGB color
+    if run.font.color and hasattr(run.font.color, 'rgb'):
+        try:
+            rgb = run.font.color.rgb
+            if rgb:  # Only if rgb is not None/empty
+                text_color = _rgb_hex(rgb)
+        except Exception:
+            pass
+    # Second try: theme/scheme color
+    if text_color is None and run.font.color and hasattr(run.font.color, 'theme_color'):
+        try:
+            theme_color = run.font.color.theme_color
+            if theme_color is not None:
+                # Try to get RGB from theme color
+                try:
+                    rgb = run.font.color.rgb
+                    if rgb:
+                        text_color = _rgb_hex(rgb)
+                except Exception:
+                    pass
+        except Exception:
+            pass
+    # Third try: layout defaults
+    if text_color is None and layout_defaults and layout_defaults.get('color'):
+        text_color = layout_defaults.get('color')
+    # Fourth try: check for solid fill color in run properties
+    if text_color is None:
+        try:
+            if hasattr(run.font.color, '_color') and run.font.color._color:
+                color_obj = run.font.color._color
+                if hasattr(color_obj, 'rgb') and color_obj.rgb:
+                    text_color = _rgb_hex(color_obj.rgb)
+        except Exception:
+            pass
+    return text_color
+
+
+class DeckExtractor:
+    """Build the IR of a deck from an opened python-pptx Presentation, one slide at a time.
+
+    Layout layers and placeholder defaults are resolved once per layout and shared
+    by every slide that uses it; with templates (a TemplateCache) they are also shared
+    with other decks built from the same template."""
+
+    def __init__(self, prs, name, source=None, templates=None):
+        self.prs = prs
+        self.templates = templates
+        if templates is not None:
+            theme_major_font, theme_minor_font = templates.theme_fonts(prs)
+        else:
+            try:
+                theme_major_font, theme_minor_font = get_theme_fonts(prs)
+            except Exception:
+                theme_major_font, theme_minor_font = None, None
+        self.deck = DeckIR(
+            name, source=source, width=emu_to_px(prs.slide_width), height=emu_to_px(prs.slide_height),
+            theme_major_font=theme_major_font, theme_minor_font=theme_minor_font, num_slides=len(prs.slides)
+        )
+        self.deck.attach_package(prs.part.package)
+        # Map layouts to index for unique naming
+        self.layout_index_map = {id(layout): idx for idx, layout in enumerate(prs.slide_layouts, start=1)}
+        self._placeholder_defaults = {}
+        self._layer_keys = {}
+        self._scheme_cache = {}
+
+    def renew(self, name, source=None):
+        """Start a new DeckIR for another conversion of the same presentation, keeping the
+        theme fonts, layout layers and placeholder defaults already resolved."""
+        deck = self.deck
+        self.deck = DeckIR(
+            name, source=source, width=deck.width, height=deck.height, theme_major_font=deck.theme_major_font,
+            theme_minor_font=deck.theme_minor_font, num_slides=len(self.prs.slides), layers=dict(deck.layers)
+        )
+        self.deck.attach_package(self.prs.part.package)
+        return self.deck
+
+    def placeholder_defaults(self, layout):
+        """Extract layout placeholder defaults, once per layout."""
+        key = id(layout)
+        if key not in self._placeholder_defaults and self.templates is not None:
+            self.layer(layout)
+        if key not in self._placeholder_defaults:
+            try:
+                self._placeholder_defaults[key] = get_layout_placeholder_defaults(layout, self.prs)
+            except Exception:
+                self._placeholder_defaults[key] = {}
+        return self._placeholder_defaults[key]
+
+    def layer(self, layout):
+        """Return the key of the layout's decoration layer, extracting it on first use."""
+        if self.templates is not None:
+            key = self._layer_keys.get(id(layout))
+            if key is None:
+                key, layer, defaults = self.templates.template(
+                    self.prs, layout, self.deck.width, self.deck.height, self.deck.media_blob
+                )
+                self._layer_keys[id(layout)] = key
+                self.deck.layers[key] = layer
+                self._placeholder_defaults[id(layout)] = defaults
+            return key
+        key = self.layout_index_map.get(id(layout), 0)
+        if key not in self.deck.layers:
+            self.deck.layers[key] = extract_layer(layout, key, self.deck.width, self.deck.height)
+        return key
+
+    def _background(self, slide, number):
+        """Return (background_css, background_media) for a slide."""
+        bg_info = get_background_style(slide, self.prs)
+        if not bg_info.startswith("picture:"):
+            return bg_info, None
+        # picture backgrounds come back as "picture:<bytes literal>,<ext>"
+        try:
+            blob_repr, bg_ext = bg_info[len("picture:"):].rsplit(',', 1)
+            data = ast.literal_eval(blob_repr)
+            return "background-color: #ffffff;", MediaRef(f"slide{number}_bg", bg_ext, size=len(data), data=data)
+        except Exception:
+            return "background-color: #ffffff;", None
+
+    def extract_slide(self, number, slide):
+        """Return the SlideIR of slide number (1-based)."""
+        checkpoint('extract', number)
+        layout = slide.slide_layout
+        background_css, background_media = self._background(slide, number)
+        slide_ir = SlideIR(number, layer=self.layer(layout), background_css=background_css,
+                           background_media=background_media)
+        layout_defaults = self.placeholder_defaults(layout)
+        img_count = 0
+        # group children are placed in z-order with absolute positions
+        for shape, left, top, width, height, rot in flatten_shapes(slide.shapes):
+            checkpoint()
+            left_px = emu_to_px(left or 0)
+            top_px = emu_to_px(top or 0)
+            width_px = emu_to_px(width or 0)
+            height_px = emu_to_px(height or 0)
+            positioned = left is not None and top is not None and width is not None and height is not None
+            shape_ir = self._extract_shape(shape, number, img_count, layout_defaults, top_px)
+            if shape_ir is None:
+                continue
+            if shape_ir.kind in ('picture', 'video'):
+                img_count += 1
+            if positioned:
+                shape_ir.left, shape_ir.top, shape_ir.width, shape_ir.height = left_px, top_px, width_px, height_px
+            else:
+                # shapes without a position of their own are kept at the origin and never culled
+                shape_ir.left, shape_ir.top, shape_ir.width, shape_ir.height = None, None, None, None
+            shape_ir.rotation = rot
+            shape_ir.opaque = positioned and shape_is_opaque(shape, width_px, height_px, rot)
+            slide_ir.shapes.append(shape_ir)
+        try:
+            if slide.has_notes_slide:
+                slide_ir.notes = slide.notes_slide.notes_text_frame.text
+        except Exception:
+            pass
+        return slide_ir
+
+    def _extract_shape(self, shape, number, img_count, layout_defaults, top_px):
+        shape_type = shape.shape_type
+        if shape_type == MSO_SHAPE_TYPE.PICTURE:
+            image = shape.image
+            return ShapeIR('picture', media=MediaRef(f"slide{number}_img{img_count}", image.ext,
+                                                     part=str(shape.part.related_part(shape._element.blip_rId).partname),
+                                                     size=len(image.blob)))
+        if shape_type == MSO_SHAPE_TYPE.TABLE:
+            return ShapeIR('table', table=extract_table(shape.table._tbl, self.prs))
+        if getattr(shape, 'has_chart', False):
+            try:
+                chart = extract_chart(shape.chart_part, self.prs, self._scheme_cache)
+            except Exception:
+                return None
+            return ShapeIR('chart', chart=chart) if chart is not None else None
+        if shape_type == MSO_SHAPE_TYPE.MEDIA:
+            return self._extract_video(shape, number, img_count)
+        if hasattr(shape, "text_frame") and shape.text_frame:
+            shape_ir = ShapeIR('text', paragraphs=self._extract_paragraphs(shape, layout_defaults, top_px))
+            if shape_type == MSO_SHAPE_TYPE.AUTO_SHAPE:
+                # the html backend draws only the text; the svg backend also draws the outline
+                try:
+                    self._vector_style(shape, shape_ir)
+                    if shape_ir.fill_color is None and shape_ir.stroke_width is None:
+                        shape_ir.geometry = None
+                except Exception:
+                    pass
+            return shape_ir
+        if shape_type == MSO_SHAPE_TYPE.LINE:
+            try:
+                shape_ir = ShapeIR('line', stroke_color='#000', stroke_width=2)
+                self._vector_style(shape, shape_ir)
+                return shape_ir
+            except Exception:
+                return None
+        if shape_type == MSO_SHAPE_TYPE.AUTO_SHAPE:
+            try:
+                shape_ir = ShapeIR('auto-shape', fill_color='transparent')
+                self._vector_style(shape, shape_ir)
+                return shape_ir
+            except Exception:
+                return None
+        return None
+
+    def _vector_style(self, shape, shape_ir):
+        """Set the fill, stroke and preset geometry of a line/auto shape on its ShapeIR."""
+        if shape_ir.kind != 'line' and shape.fill and hasattr(shape.fill, 'fore_color') and hasattr(shape.fill.fore_color, 'rgb'):
+            shape_ir.fill_color = color_to_hex(shape.fill.fore_color)
+        if hasattr(shape, 'line') and shape.line is not None:
+            if hasattr(shape.line, 'color') and hasattr(shape.line.color, 'rgb'):
+                shape_ir.stroke_color = color_to_hex(shape.line.color)
+            if shape.line.width:
+                wpt = emu_to_pt(shape.line.width)
+                if wpt:
+                    shape_ir.stroke_width = max(1, int(wpt / 1.333))
+        shape_ir.geometry, shape_ir.adjustments, shape_ir.flip, shape_ir.dash = vector_geometry(shape)
+
+    def _extract_video(self, shape, number, img_count):
+        try:
+            # Find video relationship
+            video_rel = None
+            for rel in shape.part.rels.values():
+                if 'video' in rel.reltype or 'media' in rel.reltype:
+                    video_rel = rel
+                    break
+            if not (video_rel and video_rel.target_part and hasattr(video_rel.target_part, 'blob')):
+                return None
+            target = video_rel.target_part
+            # Determine file extension from content type
+            ext = 'mp4'  # default
+            content_type = getattr(target, 'content_type', '') or ''
+            for candidate in VIDEO_EXTS:
+                if candidate in content_type:
+                    ext = candidate
+                    break
+            media = MediaRef(f"slide{number}_video{img_count}", ext, kind='video', part=str(target.partname),
+                             size=len(target.blob))
+            poster = None
+            if shape.poster_frame:
+                poster_image = shape.poster_frame
+                poster = MediaRef(f"slide{number}_poster{img_count}", poster_image.ext, size=len(poster_image.blob),
+                                  data=poster_image.blob)
+            return ShapeIR('video', media=media, poster=poster)
+        except Exception:
+            # Fallback: just show a placeholder
+            return ShapeIR('video-placeholder')
+
+    def _extract_paragraphs(self, shape, layout_defaults, top_px):
+        slide_height_px = self.deck.height
+        paragraphs = []
+        for paragraph in shape.text_frame.paragraphs:
+            try:
+                align = None
+                # Get paragraph level properties
+                if paragraph.alignment:
+                    align = ALIGN_MAP.get(paragraph.alignment, 'left')
+                # indentation for bullet/levels
+                level = 0
+                try:
+                    level = getattr(paragraph, 'level', 0) or 0
+                except Exception:
+                    pass
+                runs = []
+                for run in paragraph.runs:
+                    # detect title placeholder heuristics for default size
+                    try:
+                        default_is_title = False
+                        if getattr(shape, 'is_placeholder', False):
+                            ph = shape.placeholder
+                            if ph is not None and getattr(ph, 'placeholder_format', None) is not None:
+                                ptype = getattr(ph.placeholder_format, 'type', None)
+                                if ptype in (PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE):
+                                    default_is_title = True
+                        # also use spatial heuristic: top near top and text short
+                        if not default_is_title:
+                            if top_px is not None and top_px < (slide_height_px * 0.18) and len(run.text.strip()) < 25:
+                                default_is_title = True
+                    except Exception:
+                        default_is_title = False
+                    # get effective font family and size based on layout fallback
+                    run_defaults = None
+                    try:
+                        run_defaults = layout_defaults.get(getattr(shape.placeholder_format, 'type', None), None)
+                    except Exception:
+                        run_defaults = None
+                    ff, fsize = get_effective_font(run, paragraph, shape, self.deck.theme_minor_font,
+                                                   layout_default=run_defaults, default_is_title=default_is_title)
+                    runs.append(RunIR(
+                        run.text, font_family=ff, font_size=fsize, font_name=run.font.name,
+                        bold=bool(run.font.bold or (run_defaults and run_defaults.get('bold'))),
+                        italic=bool(run.font.italic or (run_defaults and run_defaults.get('italic'))),
+                        underline=bool(run.font.underline or (run_defaults and run_defaults.get('underline'))),
+                        color=_run_color(run, run_defaults)
+                    ))
+                paragraphs.append(ParagraphIR(runs, align=align, level=level))
+            except Exception:
+                # Fallback: just use the text
+                paragraphs.append(ParagraphIR(fallback_text=paragraph.text))
+        return paragraphs
+
+
+def open_presentation(pptx_path, slides=None):
+    """Open a PPTX file, optionally sliced down to some slides (see parse_slide_ranges).
+    Returns (Presentation, slide numbers of prs.slides, total slide count of the file)."""
+    from pptx import Presentation
+    if slides is None:
+        prs = Presentation(pptx_path)
+        total = len(prs.slides)
+        return prs, list(range(1, total + 1)), total
+    package, total, numbers = slice_package(pptx_path, slides)
+    return Presentation(package), numbers, total
+
+
+def extract_deck(prs, name, source=None, slides=None, templates=None):
+    """Return the DeckIR of a presentation; slides optionally limits extraction to these 1-based numbers."""
+    extractor = DeckExtractor(prs, name, source=source, templates=templates)
+    wanted = set(slides) if slides is not None else None
+    for number, slide in enumerate(prs.slides, 1):
+        if wanted is None or number in wanted:
+            extractor.deck.slides.append(extractor.extract_slide(number, slide))
+    return extractor.deck
+
+
+def open_deck(pptx_path, slides=None, templates=None):
+    """Open a PPTX file and return its DeckIR.
+    With slides (e.g. [5] or "3-7,12") only those slides and the parts they use are read."""
+    name = os.path.splitext(os.path.basename(pptx_path))[0]
+    prs, numbers, total = open_presentation(pptx_path, slides)
+    extractor = DeckExtractor(prs, name, source=pptx_path, templates=templates)
+    extractor.deck.num_slides = total
+    for number, slide in zip(numbers, prs.slides):
+        extractor.deck.slides.append(extractor.extract_slide(number, slide))
+    return extractor.deck
@@ -0,0 +1,96 @@
+import math
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from .watchdog import checkpoint
+
+_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+
+# Affine transforms are (a, b, c, d, e, f): x' = a*x + b*y + c, y' = d*x + e*y + f
+IDENTITY = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0)
+
+
+def _compose(outer, inner):
+    """Return the transform applying inner first, then outer."""
+    a1, b1, c1, d1, e1, f1 = outer
+    a2, b2, c2, d2, e2, f2 = inner
+    return (a1 * a2 + b1 * d2, a1 * b2 + b1 * e2, a1 * c2 + b1 * f2 + c1,
+            d1 * a2 + e1 * d2, d1 * b2 + e1 * e2, d1 * c2 + e1 * f2 + f1)
+
+
+def group_transform(group):
+    """Return (transform, rotation) mapping a group's child coordinates to its parent's.
+
+    Children are laid out in the chOff/chExt space, which is scaled onto the
+    group's off/ext box and then rotated about the box center."""
+    xfrm = group._element.grpSpPr.find(_A + 'xfrm')
+    if xfrm is None:
+        return IDENTITY, 0.0
+
+    def pair(tag, x_attr, y_attr):
+        el = xfrm.find(_A + tag)
+        if el is None:
+            return 0, 0
+        return int(el.get(x_attr, 0)), int(el.get(y_attr, 0))
+
+    off_x, off_y = pair('off', 'x', 'y')
+    ext_x, ext_y = pair('ext', 'cx', 'cy')
+    ch_off_x, ch_off_y = pair('chOff', 'x', 'y')
+    ch_ext_x, ch_ext_y = pair('chExt', 'cx', 'cy')
+    sx = ext_x / ch_ext_x if ch_ext_x else 1.0
+    sy = ext_y / ch_ext_y if ch_ext_y else 1.0
+    scale = (sx, 0.0, off_x - ch_off_x * sx, 0.0, sy, off_y - ch_off_y * sy)
+
+    rotation = int(xfrm.get('rot', 0)) / 60000.0
+    if not rotation:
+        return scale, 0.0
+    cx = off_x + ext_x / 2.0
+    cy = off_y + ext_y / 2.0
+    cos_r = math.cos(math.radians(rotation))
+    sin_r = math.sin(math.radians(rotation))
+    rotate = (cos_r, -sin_r, cx - cos_r * cx + sin_r * cy, sin_r, cos_r, cy - sin_r * cx - cos_r * cy)
+    return _compose(rotate, scale), rotation
+
+
+def _place(shape, transform, rotation):
+    """Return (shape, left, top, width, height, rotation) in slide EMU for a shape under transform."""
+    left, top, width, height = shape.left, shape.top, shape.width, shape.height
+    own_rotation = getattr(shape, 'rotation', 0) or 0
+    if transform is IDENTITY:
+        return shape, left, top, width, height, own_rotation
+    a, b, c, d, e, f = transform
+    # Map the center so rotated groups keep children in place, then scale the extents
+    mx = left + width / 2.0
+    my = top + height / 2.0
+    cx = a * mx + b * my + c
+    cy = d * mx + e * my + f
+    w = width * math.hypot(a, d)
+    h = height * math.hypot(b, e)
+    return shape, int(cx - w / 2.0), int(cy - h / 2.0), int(w), int(h), (own_rotation + rotation) % 360
+
+
+def flatten_shapes(shapes):
+    """Return the slide's shapes in z-order with group shapes replaced by their children.
+
+    Each entry is (shape, left, top, width, height, rotation) with the position in
+    slide EMU. Groups are walked iteratively and each group's transform is composed
+    once, so the cost stays linear in the number of shapes however deep groups nest."""
+    placed = []
+    stack = [(iter(shapes), IDENTITY, 0.0)]
+    while stack:
+        shapes_iter, transform, rotation = stack[-1]
+        shape = next(shapes_iter, None)
+        if shape is None:
+            stack.pop()
+            continue
+        checkpoint()
+        try:
+            if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+                child_transform, child_rotation = group_transform(shape)
+                if transform is not IDENTITY:
+                    child_transform = _compose(transform, child_transform)
+                stack.append((iter(shape.shapes), child_transform, rotation + child_rotation))
+                continue
+            placed.append(_place(shape, transform, rotation))
+        except Exception:
+            # keep shapes whose geometry cannot be read; renderers cope with missing positions
+            placed.append((shape, None, None, None, None, 0))
+    return placed
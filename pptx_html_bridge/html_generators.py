@@ -1,11 +1,98 @@
+import io
 import os
-from pptx.enum.shapes import MSO_SHAPE_TYPE
-from pptx.enum.shapes import PP_PLACEHOLDER
-from .converters import emu_to_px, emu_to_pt, color_to_hex, pt_to_px
-from .fonts import get_effective_font
+from html import escape
+from .converters import pt_to_px
+from .tables import render_table_html
+from .charts import render_chart_svg
+from .culling import cull_slide_elements
+from .vectors import VECTOR_KINDS, render_vector_svg
+from .sinks import LocalSink
+from .watchdog import checkpoint
+
+# Where media go when no output sink is given: plain writes, as the converter always did
+_direct = LocalSink(atomic=False)
+# Media of the next slide fetched ahead, largest first
+PREFETCH_MEDIA = 2
+
+# Arrow/page keys swap in the neighbouring slide without a page load; its html is
+# usually in the http cache already through the prefetch hints
+NAV_JS = """(function () {
+  function link(rel) {
+    return document.querySelector('.nav a[rel="' + rel + '"]');
+  }
+  function show(url, push) {
+    fetch(url).then(function (response) {
+      if (!response.ok) throw new Error(response.status);
+      return response.text();
+    }).then(function (text) {
+      var doc = new DOMParser().parseFromString(text, 'text/html');
+      document.head.replaceWith(document.adoptNode(doc.head));
+      document.body.replaceWith(document.adoptNode(doc.body));
+      if (push) history.pushState(null, '', url);
+      window.scrollTo(0, 0);
+    }).catch(function () {
+      location.href = url;
+    });
+  }
+  document.addEventListener('keydown', function (event) {
+    if (event.altKey || event.ctrlKey || event.metaKey || event.shiftKey) return;
+    if (event.target.closest && event.target.closest('input, textarea, select, video, [contenteditable]')) return;
+    var rel = {ArrowRight: 'next', PageDown: 'next', ' ': 'next', ArrowLeft: 'prev', PageUp: 'prev'}[event.key];
+    var a = rel && link(rel);
+    if (!a) return;
+    event.preventDefault();
+    show(a.href, true);
+  });
+  window.addEventListener('popstate', function () {
+    show(location.href, false);
+  });
+})();
+"""
+
+class HTMLWriter:
+    """Stream html lines straight to an output sink.
+
+    The sink may be a text stream (file, StringIO) or a binary one (zip member,
+    socket file, BytesIO); binary sinks receive utf-8 encoded fragments. Compact
+    and pretty layout are decided as each line is emitted, so nothing is buffered here."""
+
+    def __init__(self, sink, compact=False, binary=None):
+        if binary is None:
+            binary = not isinstance(sink, io.TextIOBase)
+        if binary:
+            sink_write = sink.write
+            self._write = lambda text: sink_write(text.encode('utf-8'))
+        else:
+            self._write = sink.write
+        self.compact = compact
+        self._started = False
+
+    def add(self, line, indent=0):
+        """Start a new line; indentation is dropped in compact mode."""
+        write = self._write
+        if self.compact:
+            write(line.lstrip())
+            return
+        if self._started:
+            write('\n')
+        else:
+            self._started = True
+        if indent:
+            write('    ' * indent)
+        write(line)
+
+    def write(self, fragment):
+        """Append a raw html fragment to the current line."""
+        self._write(fragment)
+
+    def text(self, text):
+        """Append escaped text to the current line."""
+        self._write(escape(text))
+
 
 def html_builder():
-    """Create a simple html line builder for pretty printing."""
+    """Create a simple html line builder for pretty printing.
+    Kept for callers that want the whole document as one string; the generators stream through HTMLWriter."""
     lines = []
     def add(line, indent=0):
         lines.append(('    ' * indent) + line)
@@ -15,9 +102,30 @@ def html_builder():
         return '\n'.join(lines)
     return add, to_str
 
-def generate_index_html(filename_base, num_slides, html_dir, compact):
-    """Generate index.html for the presentation slides."""
-    add_idx, to_str_idx = html_builder()
+def write_html(path, render, output=None):
+    """Write the html that render(sink) streams to path and return render's result.
+    With output (an OutputSink) the document is streamed into the file object of
+    output.open(path); otherwise straight into the file."""
+    if output is None:
+        with open(path, 'w', encoding='utf-8') as f:
+            return render(f)
+    with output.open(path) as raw:
+        f = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+        try:
+            result = render(f)
+        finally:
+            # detach flushes the text layer and leaves raw to the with block to commit or discard
+            f.detach()
+    return result
+
+def generate_index_html(filename_base, num_slides, html_dir, compact, sink=None, output=None):
+    """Generate index.html for the presentation slides.
+    When sink is given the html is streamed into it instead of html_dir;
+    output is the OutputSink storing the file (default: written directly)."""
+    if sink is None:
+        return write_html(os.path.join(html_dir, f"{filename_base}_index.html"),
+                          lambda f: generate_index_html(filename_base, num_slides, html_dir, compact, sink=f), output)
+    add_idx = HTMLWriter(sink, compact).add
     add_idx('<!DOCTYPE html>')
     add_idx('<html lang="zh-CN">')
     add_idx('<head>', 1)
@@ -32,12 +140,15 @@ def generate_index_html(filename_base, num_slides, html_dir, compact):
     add_idx('</ul>', 2)
     add_idx('</body>', 1)
     add_idx('</html>')
-    with open(os.path.join(html_dir, f"{filename_base}_index.html"), 'w', encoding='utf-8') as f:
-        f.write(to_str_idx(compact=compact))
 
-def generate_main_html(source_dir, html_dir, compact):
-    """Generate main.html entry page."""
-    main_add, main_to_str = html_builder()
+def generate_main_html(source_dir, html_dir, compact, sink=None, output=None):
+    """Generate main.html entry page.
+    When sink is given the html is streamed into it instead of html_dir;
+    output is the OutputSink storing the file (default: written directly)."""
+    if sink is None:
+        return write_html(os.path.join(html_dir, 'main.html'),
+                          lambda f: generate_main_html(source_dir, html_dir, compact, sink=f), output)
+    main_add = HTMLWriter(sink, compact).add
     main_add('<!DOCTYPE html>')
     main_add('<html lang="zh-CN">')
     main_add('<head>', 1)
@@ -67,25 +178,255 @@ def generate_main_html(source_dir, html_dir, compact):
     main_add('</div>', 2)
     main_add('</body>', 1)
     main_add('</html>')
-    with open(os.path.join(html_dir, 'main.html'), 'w', encoding='utf-8') as f:
-        f.write(main_to_str(compact=compact))
-
-def generate_slide_html(i, num_slides, theme_minor_font, slide_width_px, slide_height_px, background_style, nav, layout_images_filtered, layout_shapes, slide, prs, layout_placeholder_defaults, html_dir, compact):
-    """Generate HTML for a single slide."""
-    add, to_str = html_builder()
-    # Prepare fallback font-family: theme minor font -> Chinese fallback -> Arial -> sans-serif
-    default_font_stack = []
+
+def default_font_stack(theme_minor_font):
+    """Return the body font stack: theme minor font -> Chinese fallback -> Arial -> sans-serif."""
+    stack = []
     if theme_minor_font:
-        default_font_stack.append(theme_minor_font)
+        stack.append(theme_minor_font)
     # Add common Chinese fonts and system fonts for better fidelity
-    default_font_stack.extend(["微软雅黑", "Microsoft YaHei", "Helvetica", "Arial", "sans-serif"])
-    default_font_family = ', '.join([f'"{f}"' for f in default_font_stack])
+    stack.extend(["微软雅黑", "Microsoft YaHei", "Helvetica", "Arial", "sans-serif"])
+    return stack
+
+
+def write_media(deck, ref, media_dir, overwrite=True, assets=None, output=None):
+    """Write a MediaRef's bytes into media_dir and return the file name to reference it by.
+    With assets (an AssetManifest) the file is published under a content-hashed name;
+    with neither, nothing is written. output is the OutputSink storing the file."""
+    output = output or _direct
+    if assets is not None:
+        logical = f"media/{ref.filename}"
+        published = assets.get(logical)
+        if published is None:
+            data = deck.media_blob(ref)
+            if data is None:
+                return ref.filename
+            published = assets.publish(logical, data)
+        return published[len("media/"):]
+    if media_dir is None:
+        return ref.filename
+    path = os.path.join(media_dir, ref.filename)
+    if not overwrite and output.exists(path):
+        return ref.filename
+    data = deck.media_blob(ref)
+    if data is not None:
+        output.write(path, data)
+    return ref.filename
+
+
+def layer_svg_name(layer):
+    """File name of the svg holding a layout layer's vector shapes."""
+    if isinstance(layer.key, str):
+        return f"tpl{layer.key[:12]}_layer.svg"
+    return f"layout{layer.key}_layer.svg"
+
+
+def write_layer_svg(deck, layer, media_dir, cull=True, assets=None, output=None):
+    """Write a layer's lines and auto shapes as one standalone svg (once per output) and return its file name.
+    Slides reference it instead of repeating the shapes; only off-slide and empty shapes are culled,
+    since the file is shared by every slide using the layer."""
+    output = output or _direct
+    filename = layer_svg_name(layer)
+    logical = f"media/{filename}"
+    if assets is not None and assets.get(logical) is not None:
+        return assets.get(logical)[len("media/"):]
+    path = os.path.join(media_dir, filename) if media_dir is not None else None
+    if assets is None and (path is None or output.exists(path)):
+        return filename
+    shapes = layer.shapes
+    if cull:
+        _, shapes, _, _ = cull_slide_elements([], shapes, [], deck.width, deck.height)
+    data = render_vector_svg(shapes, deck.width, deck.height, css_class=None, standalone=True).encode('utf-8')
+    if assets is not None:
+        return assets.publish(logical, data)[len("media/"):]
+    output.write(path, data)
+    return filename
+
+
+def slide_background_style(slide_ir, layer, media_name=None):
+    """Return the css background declarations of a slide; a full-slide layout image wins.
+    media_name is the file name the background image was written under."""
+    media = None
+    if layer is not None and layer.background is not None:
+        media = layer.background
+    elif slide_ir.background_media is not None:
+        media = slide_ir.background_media
+    if media is None:
+        return slide_ir.background_css
+    return f"background-image: url('../media/{media_name or media.filename}'); background-size: cover; background-repeat: no-repeat; background-position: center;"
+
+
+def _run_style(run):
+    run_style = ""
+    fsize = run.font_size
+    if fsize:
+        fsize_px = pt_to_px(fsize) or int(fsize)
+        run_style += f"font-size: {fsize_px}px; "
+        # approximate line-height based on font size
+        try:
+            line_h_px = int(float(fsize) * 1.15)
+            run_style += f"line-height: {line_h_px}px; "
+        except Exception:
+            pass
+    if run.font_family:
+        run_style += f"font-family: {run.font_family}; "
+    if run.bold:
+        run_style += "font-weight: bold; "
+    if run.italic:
+        run_style += "font-style: italic; "
+    if run.underline:
+        run_style += "text-decoration: underline; "
+    if run.color:
+        run_style += f"color: {run.color}; "
+    else:
+        # Last resort: default to white for visibility on dark backgrounds
+        run_style += "color: #ffffff; "
+    if run.font_name:
+        run_style += f"font-family: {run.font_name}; "
+    return run_style
+
+
+def slide_nav(i, num_slides):
+    """Navigation links to the previous/next slide (relative paths within the slides directory)."""
+    prev_link = f'<a href="slide{i-1}.html" rel="prev">上一页</a>' if i > 1 else ''
+    next_link = f'<a href="slide{i+1}.html" rel="next">下一页</a>' if i < num_slides else ''
+    return f'<div class="nav">{prev_link} {next_link}</div>'
+
+
+def next_slide_media(deck, slide_ir, next_ir, sprites=None, limit=PREFETCH_MEDIA):
+    """The largest images next_ir shows that slide_ir does not already load: its background,
+    pictures, video posters and, when its layout differs, the layout's images. Sprites are skipped."""
+    refs = [next_ir.background_media] if next_ir.background_media is not None else []
+    for shape in next_ir.shapes:
+        if shape.kind == 'picture' and shape.media is not None:
+            refs.append(shape.media)
+        elif shape.poster is not None:
+            refs.append(shape.poster)
+    layer = deck.layers.get(next_ir.layer)
+    if layer is not None and next_ir.layer != slide_ir.layer:
+        refs.extend(image.media for image in layer.images)
+        if layer.background is not None:
+            refs.append(layer.background)
+    seen = set()
+    unique = []
+    for ref in refs:
+        if ref.filename not in seen and (sprites is None or sprites.lookup(ref) is None):
+            seen.add(ref.filename)
+            unique.append(ref)
+    unique.sort(key=lambda ref: ref.size or 0, reverse=True)
+    return unique[:limit]
+
+
+def slide_hints(i, num_slides, media_names=(), prefetch=True, keyboard_nav=False):
+    """Head lines of slide i: with prefetch, hints fetching the next slide's html and media_names
+    (its largest media) ahead of navigation; with keyboard_nav, the navigation script."""
+    lines = []
+    if prefetch and i < num_slides:
+        lines.append(f'<link rel="prefetch" href="slide{i+1}.html">')
+        lines.extend(f'<link rel="prefetch" href="../media/{name}" as="image">' for name in media_names)
+    if keyboard_nav:
+        lines.append('<script src="nav.js" defer></script>')
+    return lines
+
+
+def insert_head_lines(html, lines, compact=False):
+    """Insert lines at the end of a rendered page's head, laid out as generate_slide_html emits head lines."""
+    if not lines:
+        return html
+    if compact:
+        marker, block = '</head>', ''.join(lines)
+    else:
+        marker, block = '\n    </head>', ''.join(f"\n{'    ' * 2}{line}" for line in lines)
+    at = html.find(marker)
+    return html[:at] + block + html[at:] if at >= 0 else html
+
+
+def write_nav_js(slides_dir, output=None):
+    """Write the keyboard navigation script next to the slides, through output (an OutputSink) if given."""
+    path = os.path.join(slides_dir, "nav.js")
+    (output or _direct).write(path, NAV_JS.encode('utf-8'))
+    return path
+
+
+def generate_slide_html(deck, slide_ir, nav, html_dir, compact, sink=None, cull=True, font_css=None, assets=None,
+                        media_dir=None, svg_shapes=False, media_log=None, output=None, sprites=None, head=None):
+    """Render a SlideIR to HTML and write the media it references.
+    The html is streamed shape by shape into sink, or into slide{n}.html under html_dir.
+    With cull, shapes that can never be visible are skipped; returns the number skipped.
+    font_css is the href of the @font-face stylesheet to link, if any; with assets (an
+    AssetManifest) media is written under content-hashed names. Media goes to media_dir,
+    by default the media directory next to html_dir; with no html_dir it is not written.
+    With svg_shapes, runs of lines and auto shapes are drawn into one inline svg each and the
+    layout layer's shapes come from a shared svg file (see write_layer_svg).
+    media_log, a list, receives every MediaRef the slide references.
+    output is the OutputSink storing the html and media (default: written directly).
+    With sprites (a SpriteAtlas), images packed into the atlas are drawn from it instead of their own files.
+    head lists extra lines for the end of the head (see slide_hints). The largest image gets
+    fetchpriority="high", as it is the one that decides when the slide looks loaded."""
+    i = slide_ir.number
+    if sink is None:
+        return write_html(os.path.join(html_dir, f"slide{i}.html"),
+                          lambda f: generate_slide_html(deck, slide_ir, nav, html_dir, compact, sink=f, cull=cull,
+                                                        font_css=font_css, assets=assets, media_dir=media_dir,
+                                                        svg_shapes=svg_shapes, media_log=media_log, output=output,
+                                                        sprites=sprites, head=head),
+                          output)
+    slide_width_px = deck.width
+    slide_height_px = deck.height
+    layer = deck.layers.get(slide_ir.layer)
+    layer_images = layer.images if layer is not None else []
+    layer_shapes = layer.shapes if layer is not None else []
+    shapes = slide_ir.shapes
+    culled = 0
+    if cull:
+        layer_images, kept_layer_shapes, shapes, culled = cull_slide_elements(
+            layer_images, layer_shapes, shapes, slide_width_px, slide_height_px
+        )
+        if svg_shapes:
+            # the shared layer svg keeps shapes only this slide covers
+            culled -= len(layer_shapes) - len(kept_layer_shapes)
+        else:
+            layer_shapes = kept_layer_shapes
+    # Save media next to the slides directory
+    if media_dir is None and html_dir is not None:
+        media_dir = os.path.join(os.path.dirname(html_dir), "media")
+
+    def media(ref, overwrite=True):
+        if media_log is not None:
+            media_log.append(ref)
+        return write_media(deck, ref, media_dir, overwrite=overwrite, assets=assets, output=output)
+    background_name = None
+    if layer is not None and layer.background is not None:
+        background_name = media(layer.background, overwrite=False)
+    elif slide_ir.background_media is not None:
+        background_name = media(slide_ir.background_media)
+    background_style = slide_background_style(slide_ir, layer, background_name)
+
+    def sprite(ref):
+        return sprites.lookup(ref) if sprites is not None else None
+    uses_sprites = sprites is not None and (
+        any(sprite(image.media) for image in layer_images)
+        or any(sprite(shape.media) for shape in shapes if shape.kind == 'picture' and shape.media is not None))
+    images = [image for image in layer_images if not sprite(image.media)]
+    images += [shape for shape in shapes if shape.kind == 'picture' and not sprite(shape.media)]
+    hero = max(images, key=lambda image: (image.width or 0) * (image.height or 0), default=None)
+
+    def priority(image):
+        return ' fetchpriority="high"' if image is hero else ''
+
+    out = HTMLWriter(sink, compact)
+    add = out.add
+    default_font_family = ', '.join([f'"{f}"' for f in default_font_stack(deck.theme_minor_font)])
     # top part
     add('<!DOCTYPE html>')
     add('<html lang="zh-CN">')
     add('<head>', 1)
     add('<meta charset="UTF-8">', 2)
     add(f'<title>Slide {i}</title>', 2)
+    if font_css:
+        add(f'<link rel="stylesheet" href="{font_css}">', 2)
+    if uses_sprites:
+        add(f'<link rel="stylesheet" href="{sprites.css_href}">', 2)
     add('<style>', 2)
     add(f'body {{ font-family: {default_font_family}; padding: 20px; }}', 3)
     add(f'.slide {{ position: relative; width: {slide_width_px}px; height: {slide_height_px}px; {background_style} border: 1px solid #ccc; margin: 0 auto; box-sizing: border-box; overflow: hidden; }}', 3)
@@ -93,298 +434,135 @@ def generate_slide_html(i, num_slides, theme_minor_font, slide_width_px, slide_h
     add('.layout-image { position: absolute; z-index: 0; }', 3)
     add('.layout-shape { position: absolute; z-index: 1; box-sizing: border-box; }', 3)
     add('.shape img { display: block; object-fit: contain; }', 3)
+    if svg_shapes:
+        add('.vector, .layout-vector { left: 0; top: 0; pointer-events: none; overflow: visible; }', 3)
+        add('.layout-vector { position: absolute; z-index: 1; }', 3)
     add('* { -webkit-font-smoothing: antialiased; text-rendering: optimizeLegibility; }', 3)
     add('p { line-height: 1.15; margin: 0; }', 3)
     add('table { border-collapse: collapse; }', 3)
     add('td, th { border: 1px solid #000; padding: 4px; }', 3)
     add('.nav { text-align: center; margin-bottom: 20px; }', 3)
     add('</style>', 2)
+    for line in head or ():
+        add(line, 2)
     add('</head>', 1)
     add('<body>', 1)
     add(nav, 2)
     add('<div class="slide">', 2)
     add('<!-- layout/master images -->', 3)
     # Append layout images (non-full-slide)
-    for lfname, lleft, ltop, lw, lh in layout_images_filtered:
-        lstyle = f"left: {lleft}px; top: {ltop}px; width: {lw}px; height: {lh}px;"
-        add(f'<div class="shape layout-image" style="{lstyle}"><img src="{lfname}" style="width: 100%; height: 100%;" alt="Background Image"></div>', 3)
+    for image in layer_images:
+        lstyle = f"left: {image.left}px; top: {image.top}px; width: {image.width}px; height: {image.height}px;"
+        sprite_class = sprite(image.media)
+        if sprite_class:
+            add(f'<div class="shape layout-image" style="{lstyle}"><div class="sprite {sprite_class}" role="img" aria-label="Background Image" style="width: 100%; height: 100%;"></div></div>', 3)
+            continue
+        image_name = media(image.media, overwrite=False)
+        add(f'<div class="shape layout-image" style="{lstyle}"><img src="../media/{image_name}"{priority(image)} style="width: 100%; height: 100%;" alt="Background Image"></div>', 3)
     # render layout shapes (lines / auto shapes)
-    for lshape in layout_shapes:
-        try:
-            stype = lshape.get('type')
-            sleft = lshape.get('left')
-            stop = lshape.get('top')
-            sw = lshape.get('width')
-            sh = lshape.get('height')
-            srot = lshape.get('rotation', 0)
-            if stype == MSO_SHAPE_TYPE.LINE:
-                stroke_width = lshape.get('stroke_width', 2)
-                stroke_color = lshape.get('stroke_color', '#000') or '#000'
-                dash_style = lshape.get('dash_style') if lshape.get('dash_style', None) else 'solid'
-                sstyle = f"left: {sleft}px; top: {stop}px; width: {sw}px; height: {max(1, stroke_width)}px; transform-origin: left top; transform: rotate({srot}deg);"
-                # use border-top for dashed style; if dashed, set border-top style else fill
-                css_border = f"border-top: {stroke_width}px {dash_style} {stroke_color};"
-                add(f'<div class="shape layout-shape line" style="{sstyle} {css_border}"></div>', 3)
-            elif stype == MSO_SHAPE_TYPE.AUTO_SHAPE:
-                fill_color = lshape.get('fill_color', 'transparent') or 'transparent'
-                stroke_color = lshape.get('stroke_color')
-                stroke_width = lshape.get('stroke_width')
-                border_style = ''
-                if stroke_color and stroke_width:
-                    border_style = f"border: {stroke_width}px solid {stroke_color};"
-                sstyle = f"left: {sleft}px; top: {stop}px; width: {sw}px; height: {sh}px; background-color: {fill_color}; {border_style}; transform-origin: left top; transform: rotate({srot}deg);"
-                add(f'<div class="shape layout-shape auto-shape" style="{sstyle}"></div>', 3)
-        except Exception:
-            pass
-    
-    img_count = 0
-    for shape in slide.shapes:
-        left_px = emu_to_px(shape.left)
-        top_px = emu_to_px(shape.top)
-        width_px = emu_to_px(shape.width)
-        height_px = emu_to_px(shape.height)
+    if svg_shapes and layer_shapes:
+        layer_name = write_layer_svg(deck, layer, media_dir, cull=cull, assets=assets, output=output)
+        add(f'<img class="layout-vector" src="../media/{layer_name}" width="{slide_width_px}" height="{slide_height_px}" alt="">', 3)
+        layer_shapes = []
+    for lshape in layer_shapes:
+        sleft, stop, sw, sh, srot = lshape.left, lshape.top, lshape.width, lshape.height, lshape.rotation
+        if lshape.kind == 'line':
+            stroke_width = lshape.stroke_width if lshape.stroke_width is not None else 2
+            stroke_color = lshape.stroke_color or '#000'
+            dash_style = lshape.dash_style or 'solid'
+            sstyle = f"left: {sleft}px; top: {stop}px; width: {sw}px; height: {max(1, stroke_width)}px; transform-origin: left top; transform: rotate({srot}deg);"
+            # use border-top for dashed style; if dashed, set border-top style else fill
+            css_border = f"border-top: {stroke_width}px {dash_style} {stroke_color};"
+            add(f'<div class="shape layout-shape line" style="{sstyle} {css_border}"></div>', 3)
+        elif lshape.kind == 'auto-shape':
+            fill_color = lshape.fill_color or 'transparent'
+            border_style = ''
+            if lshape.stroke_color and lshape.stroke_width:
+                border_style = f"border: {lshape.stroke_width}px solid {lshape.stroke_color};"
+            sstyle = f"left: {sleft}px; top: {stop}px; width: {sw}px; height: {sh}px; background-color: {fill_color}; {border_style}; transform-origin: left top; transform: rotate({srot}deg);"
+            add(f'<div class="shape layout-shape auto-shape" style="{sstyle}"></div>', 3)
+
+    # cell style classes are interned per slide and shared between its tables
+    table_styles = {}
+    vectors = []
+    for shape in shapes:
+        checkpoint()
+        if svg_shapes:
+            if shape.kind in VECTOR_KINDS or (shape.kind == 'text' and shape.geometry is not None):
+                # consecutive lines/auto shapes share one svg; anything else in between keeps its z-order
+                vectors.append(shape)
+                if shape.kind != 'text' or not shape.text.strip():
+                    continue
+            if vectors:
+                add(render_vector_svg(vectors, slide_width_px, slide_height_px, css_class='shape vector'), 3)
+                vectors = []
+        left_px = shape.left or 0
+        top_px = shape.top or 0
+        width_px = shape.width or 0
+        height_px = shape.height or 0
+        rot = shape.rotation
         shape_style = f"left: {left_px}px; top: {top_px}px; width: {width_px}px; height: {height_px}px;"
-        
-        if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-            # Handle images
-            image = shape.image
-            image_bytes = image.blob
-            ext = image.ext
-            img_filename = f"slide{i}_img{img_count}.{ext}"
-            # Save image to media directory (passed as html_dir parameter)
-            media_dir = os.path.join(os.path.dirname(html_dir), "media")
-            with open(os.path.join(media_dir, img_filename), 'wb') as f:
-                f.write(image_bytes)
-            add(f'<div class="shape" style="{shape_style}"><img src="../media/{img_filename}" style="width: 100%; height: 100%;" alt="Image"></div>', 3)
-            img_count += 1
-        elif shape.shape_type == MSO_SHAPE_TYPE.TABLE:
-            # Handle tables
-            table = shape.table
-            table_html = "<table>"
-            for row in table.rows:
-                table_html += "<tr>"
-                for cell in row.cells:
-                    table_html += f"<td>{cell.text.replace(chr(13), '<br>')}</td>"
-                table_html += "</tr>"
-            table_html += "</table>"
-            add(f'<div class="shape" style="{shape_style}">{table_html}</div>', 3)
-        elif shape.shape_type == MSO_SHAPE_TYPE.MEDIA:
-            # Handle videos
-            try:
-                # Find video relationship
-                video_rel = None
-                for rel in shape.part.rels.values():
-                    if 'video' in rel.reltype or 'media' in rel.reltype:
-                        video_rel = rel
-                        break
-                
-                if video_rel and video_rel.target_part and hasattr(video_rel.target_part, 'blob'):
-                    # Extract video file
-                    video_bytes = video_rel.target_part.blob
-                    # Determine file extension from content type or filename
-                    ext = 'mp4'  # default
-                    if hasattr(video_rel.target_part, 'content_type'):
-                        if 'mp4' in video_rel.target_part.content_type:
-                            ext = 'mp4'
-                        elif 'avi' in video_rel.target_part.content_type:
-                            ext = 'avi'
-                        elif 'mov' in video_rel.target_part.content_type:
-                            ext = 'mov'
-                        elif 'wmv' in video_rel.target_part.content_type:
-                            ext = 'wmv'
-                    
-                    video_filename = f"slide{i}_video{img_count}.{ext}"
-                    # Save video to media directory
-                    media_dir = os.path.join(os.path.dirname(html_dir), "media")
-                    with open(os.path.join(media_dir, video_filename), 'wb') as f:
-                        f.write(video_bytes)
-                    
-                    # Generate video HTML with poster frame if available
-                    poster_attr = ""
-                    if shape.poster_frame:
-                        poster_bytes = shape.poster_frame.blob
-                        poster_ext = shape.poster_frame.ext
-                        poster_filename = f"slide{i}_poster{img_count}.{poster_ext}"
-                        with open(os.path.join(media_dir, poster_filename), 'wb') as f:
-                            f.write(poster_bytes)
-                        poster_attr = f' poster="../media/{poster_filename}"'
-                    
-                    video_html = f'<video controls style="width: 100%; height: 100%;"{poster_attr}><source src="../media/{video_filename}" type="video/{ext}">Your browser does not support the video tag.</video>'
-                    add(f'<div class="shape" style="{shape_style}">{video_html}</div>', 3)
-                    img_count += 1
-            except Exception as e:
-                # Fallback: just show a placeholder
-                add(f'<div class="shape" style="{shape_style}"><div style="width: 100%; height: 100%; background: #f0f0f0; display: flex; align-items: center; justify-content: center; border: 1px solid #ccc;">[Video]</div></div>', 3)
-        elif hasattr(shape, "text_frame") and shape.text_frame:
-            # Handle text shapes with full styling
-            text_html = ""
-            try:
-                for paragraph in shape.text_frame.paragraphs:
-                    para_style = ""
-                    # Get paragraph level properties
-                    if paragraph.alignment:
-                        align_map = {0: "left", 1: "center", 2: "right", 3: "justify"}
-                        para_style += f"text-align: {align_map.get(paragraph.alignment, 'left')}; "
-                    # indentation for bullet/levels
-                    try:
-                        level = getattr(paragraph, 'level', 0) or 0
-                        if level and level > 0:
-                            para_style += f"margin-left: {level * 28}px; "
-                    except Exception:
-                        pass
-                    
-                    para_html = f'<p style="{para_style}">'
-                    for run in paragraph.runs:
-                        run_style = ""
-                        # detect title placeholder heuristics for default size
-                        try:
-                            default_is_title = False
-                            if getattr(shape, 'is_placeholder', False):
-                                ph = shape.placeholder
-                                if ph is not None and getattr(ph, 'placeholder_format', None) is not None:
-                                    ptype = getattr(ph.placeholder_format, 'type', None)
-                                    if ptype in (PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE):
-                                        default_is_title = True
-                            # also use spatial heuristic: top near top and text short
-                            if not default_is_title:
-                                if top_px is not None and top_px < (slide_height_px * 0.18) and len(run.text.strip()) < 25:
-                                    default_is_title = True
-                        except Exception:
-                            default_is_title = False
-                        # get effective font family and size based on layout fallback
-                        layout_defaults = None
-                        try:
-                            lid = id(shape.slide.slide_layout)
-                            layout_defaults = layout_placeholder_defaults.get(lid, {}).get(getattr(shape.placeholder_format, 'type', None), None)
-                        except Exception:
-                            layout_defaults = None
-                        ff, fsize = get_effective_font(run, paragraph, shape, theme_minor_font, layout_default=layout_defaults, default_is_title=default_is_title)
-                        if fsize:
-                            fsize_px = pt_to_px(fsize) or int(fsize)
-                            run_style += f"font-size: {fsize_px}px; "
-                            # approximate line-height based on font size
-                            try:
-                                line_h_px = int(float(fsize) * 1.15)
-                                run_style += f"line-height: {line_h_px}px; "
-                            except Exception:
-                                pass
-                        if ff:
-                            run_style += f"font-family: {ff}; "
-                        if run.font.bold:
-                            run_style += "font-weight: bold; "
-                        elif layout_defaults and layout_defaults.get('bold'):
-                            run_style += "font-weight: bold; "
-                        if run.font.italic:
-                            run_style += "font-style: italic; "
-                        elif layout_defaults and layout_defaults.get('italic'):
-                            run_style += "font-style: italic; "
-                        if run.font.underline:
-                            run_style += "text-decoration: underline; "
-                        elif layout_defaults and layout_defaults.get('underline'):
-                            run_style += "text-decoration: underline; "
-                        # Extract text color with better fallback logic
-                        text_color = None
-                        
-                        # First try: direct RGB color
-                        if run.font.color and hasattr(run.font.color, 'rgb'):
-                            try:
-                                rgb = run.font.color.rgb
-                                if rgb:  # Only if rgb is not None/empty
-                                    text_color = f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}"
-                            except:
-                                pass
-                        
-                        # Second try: theme/scheme color
-                        if text_color is None and run.font.color and hasattr(run.font.color, 'theme_color'):
-                            try:
-                                theme_color = run.font.color.theme_color
-                                if theme_color is not None:
-                                    # Try to get RGB from theme color
-                                    try:
-                                        rgb = run.font.color.rgb
-                                        if rgb:
-                                            text_color = f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}"
-                                    except:
-                                        pass
-                            except Exception:
-                                pass
-                        
-                        # Third try: layout defaults
-                        if text_color is None and layout_defaults and layout_defaults.get('color'):
-                            text_color = layout_defaults.get('color')
-                        
-                        # Fourth try: check for solid fill color in run properties
-                        if text_color is None:
-                            try:
-                                # Check if run has color information through other means
-                                if hasattr(run.font.color, '_color') and run.font.color._color:
-                                    color_obj = run.font.color._color
-                                    if hasattr(color_obj, 'rgb') and color_obj.rgb:
-                                        rgb = color_obj.rgb
-                                        text_color = f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}"
-                            except Exception:
-                                pass
-                        
-                        # Apply the color if found
-                        if text_color:
-                            run_style += f"color: {text_color}; "
-                        else:
-                            # Last resort: default to white for visibility on dark backgrounds
-                            run_style += "color: #ffffff; "
-                        if run.font.name:
-                            run_style += f"font-family: {run.font.name}; "
-                        para_html += f'<span style="{run_style}">{run.text}</span>'
-                    para_html += '</p>'
-                    text_html += para_html
-            except Exception as e:
-                # Fallback: just use the text
-                text_html = f'<p>{shape.text}</p>'
-            
-            add(f'<div class="shape" style="{shape_style}">{text_html}</div>', 3)
-        elif shape.shape_type == MSO_SHAPE_TYPE.LINE:
+        kind = shape.kind
+
+        if kind == 'picture':
+            sprite_class = sprite(shape.media)
+            if sprite_class:
+                add(f'<div class="shape" style="{shape_style}"><div class="sprite {sprite_class}" role="img" aria-label="Image" style="width: 100%; height: 100%;"></div></div>', 3)
+                continue
+            image_name = media(shape.media)
+            add(f'<div class="shape" style="{shape_style}"><img src="../media/{image_name}"{priority(shape)} style="width: 100%; height: 100%;" alt="Image"></div>', 3)
+        elif kind == 'table':
+            add(f'<div class="shape" style="{shape_style}">', 3)
+            _, css_rules = render_table_html(shape.table, table_styles, write=out.write)
+            out.write('</div>')
+            if css_rules:
+                # style elements apply document-wide, so the rules can follow the streamed table
+                add(f'<style>{" ".join(css_rules)}</style>', 3)
+        elif kind == 'chart':
+            add(f'<div class="shape" style="{shape_style}">{render_chart_svg(shape.chart, width_px, height_px)}</div>', 3)
+        elif kind == 'video':
+            video_name = media(shape.media)
+            # Generate video HTML with poster frame if available
+            poster_attr = ""
+            if shape.poster is not None:
+                poster_attr = f' poster="../media/{media(shape.poster)}"'
+            video_html = f'<video controls style="width: 100%; height: 100%;"{poster_attr}><source src="../media/{video_name}" type="video/{shape.media.ext}">Your browser does not support the video tag.</video>'
+            add(f'<div class="shape" style="{shape_style}">{video_html}</div>', 3)
+        elif kind == 'video-placeholder':
+            add(f'<div class="shape" style="{shape_style}"><div style="width: 100%; height: 100%; background: #f0f0f0; display: flex; align-items: center; justify-content: center; border: 1px solid #ccc;">[Video]</div></div>', 3)
+        elif kind == 'text':
+            # paragraphs are streamed as soon as they are complete
+            add(f'<div class="shape" style="{shape_style}">', 3)
+            for paragraph in shape.paragraphs:
+                if paragraph.fallback_text is not None:
+                    out.write(f'<p>{escape(paragraph.fallback_text)}</p>')
+                    continue
+                para_style = ""
+                if paragraph.align:
+                    para_style += f"text-align: {paragraph.align}; "
+                # indentation for bullet/levels
+                if paragraph.level and paragraph.level > 0:
+                    para_style += f"margin-left: {paragraph.level * 28}px; "
+                para_html = f'<p style="{para_style}">'
+                for run in paragraph.runs:
+                    para_html += f'<span style="{_run_style(run)}">{escape(run.text)}</span>'
+                para_html += '</p>'
+                out.write(para_html)
+            out.write('</div>')
+        elif kind == 'line':
             # draw a simple line as a thin rectangle with stroke color
-            try:
-                stroke_color = '#000'
-                stroke_width = 2
-                if hasattr(shape, 'line') and shape.line is not None:
-                    if hasattr(shape.line, 'color') and hasattr(shape.line.color, 'rgb'):
-                        stroke_color = color_to_hex(shape.line.color)
-                    if shape.line.width:
-                        wpt = emu_to_pt(shape.line.width)
-                        if wpt:
-                            stroke_width = max(1, int(wpt / 1.333))
-                rot = getattr(shape, 'rotation', 0) or 0
-                sstyle = f"left: {left_px}px; top: {top_px}px; width: {width_px}px; height: {max(1, stroke_width)}px; background-color: {stroke_color}; transform-origin: left top; transform: rotate({rot}deg);"
-                add(f'<div class="shape line" style="{sstyle}"></div>', 3)
-            except Exception:
-                pass
-        elif shape.shape_type == MSO_SHAPE_TYPE.AUTO_SHAPE:
-            try:
-                fill_color = 'transparent'
-                stroke_color = None
-                stroke_width = None
-                if shape.fill and hasattr(shape.fill, 'fore_color') and hasattr(shape.fill.fore_color, 'rgb'):
-                    fill_color = color_to_hex(shape.fill.fore_color)
-                if hasattr(shape, 'line') and shape.line is not None:
-                    if hasattr(shape.line, 'color') and hasattr(shape.line.color, 'rgb'):
-                        stroke_color = color_to_hex(shape.line.color)
-                    if shape.line.width:
-                        wpt = emu_to_pt(shape.line.width)
-                        if wpt:
-                            stroke_width = max(1, int(wpt / 1.333))
-                border_style = ''
-                if stroke_color and stroke_width:
-                    border_style = f"border: {stroke_width}px solid {stroke_color};"
-                rot = getattr(shape, 'rotation', 0) or 0
-                sstyle = f"left: {left_px}px; top: {top_px}px; width: {width_px}px; height: {height_px}px; background-color: {fill_color}; {border_style}; transform-origin: left top; transform: rotate({rot}deg);"
-                add(f'<div class="shape auto-shape" style="{sstyle}"></div>', 3)
-            except Exception:
-                pass
-    
+            sstyle = f"left: {left_px}px; top: {top_px}px; width: {width_px}px; height: {max(1, shape.stroke_width)}px; background-color: {shape.stroke_color}; transform-origin: left top; transform: rotate({rot}deg);"
+            add(f'<div class="shape line" style="{sstyle}"></div>', 3)
+        elif kind == 'auto-shape':
+            border_style = ''
+            if shape.stroke_color and shape.stroke_width:
+                border_style = f"border: {shape.stroke_width}px solid {shape.stroke_color};"
+            sstyle = f"left: {left_px}px; top: {top_px}px; width: {width_px}px; height: {height_px}px; background-color: {shape.fill_color}; {border_style}; transform-origin: left top; transform: rotate({rot}deg);"
+            add(f'<div class="shape auto-shape" style="{sstyle}"></div>', 3)
+    if vectors:
+        add(render_vector_svg(vectors, slide_width_px, slide_height_px, css_class='shape vector'), 3)
+
     add('</div>', 2)
     add('</body>', 1)
     add('</html>')
-
-    slide_filename = os.path.join(html_dir, f"slide{i}.html")
-    with open(slide_filename, 'w', encoding='utf-8') as f:
-        f.write(to_str(compact=compact))
\ No newline at end of file
+    return culled
@@ -0,0 +1,1004 @@
+"""
+HTML to PPTX.
+
+Slide pages in the markup generate_slide_html writes (absolutely positioned .shape divs
+holding text spans, tables and images) are read back into the IR, and PPTXWriter writes
+them as slides of a template package straight into a zip stream. A template is read once
+per process (TemplatePackage.shared): its masters, layouts and theme are copied verbatim
+into every deck. Image parts are stored once per deck per content hash.
+"""
+
+import base64
+import copy
+import hashlib
+import math
+import os
+import posixpath
+import re
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from functools import partial
+from html import escape
+from typing import Optional, Dict, Any, Iterator
+from lxml import etree
+from .ir import SlideIR, ShapeIR, ParagraphIR, RunIR, CellIR, TableIR, MediaRef
+from .slicing import P_NS, R_NS, PR_NS, RT_OFFICE_DOCUMENT, RT_SLIDE, _read_rels, _rels_name, slice_package
+from .sinks import OutputSink, LocalSink
+from .jobs import iter_jobs, job_key, load_done, lost_job_result, open_results
+from .watchdog import checkpoint, run_watched
+
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+CT_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+RT_SLIDE_LAYOUT = R_NS + '/slideLayout'
+RT_IMAGE = R_NS + '/image'
+CT_SLIDE = 'application/vnd.openxmlformats-officedocument.presentationml.slide+xml'
+# 914400 EMU per inch, 96 px per inch
+EMU_PER_PX = 9525
+# Cell padding and border width of the html tables (see generate_slide_html)
+CELL_MARGIN_PX = 4
+CELL_BORDER_EMU = 12700
+# Paragraph indentation per outline level in the html
+LEVEL_INDENT_PX = 28
+# Formats stored without compression, since deflating them gains nothing
+STORED_EXTS = ('png', 'jpg', 'jpeg', 'gif', 'mp4', 'mov', 'wmv', 'avi')
+IMAGE_TYPES = {'png': 'image/png', 'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'gif': 'image/gif',
+               'bmp': 'image/bmp', 'tif': 'image/tiff', 'tiff': 'image/tiff', 'emf': 'image/x-emf',
+               'wmf': 'image/x-wmf'}
+
+# Images read from disk are kept in memory up to this total, so a shared one is read once
+MEDIA_CACHE_BYTES = 64 * 1024 ** 2
+
+_P = '{%s}' % P_NS
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def default_template():
+    """Path of the blank template python-pptx ships with."""
+    import pptx
+    return os.path.join(os.path.dirname(pptx.__file__), 'templates', 'default.pptx')
+
+
+class TemplatePackage:
+    """A template PPTX read once: every part except its slides, its slide size and its layouts.
+
+    The parts are kept as bytes and copied into each deck built on the template; only
+    presentation.xml, its relationships and the content types are rewritten per deck."""
+
+    def __init__(self, path=None):
+        self.path = path or default_template()
+        # the slides of the template and everything only they use are left out
+        buf, _, _ = slice_package(self.path, [])
+        with zipfile.ZipFile(buf) as zf:
+            names = set(zf.namelist())
+            _, root_targets = _read_rels(zf, names, '')
+            self.presentation = next(name for rel, name in root_targets if rel.get('Type') == RT_OFFICE_DOCUMENT)
+            self.parts = {name: zf.read(name) for name in zf.namelist()}
+            self.pres_rels, pres_targets = _read_rels(zf, names, self.presentation)
+            self.layouts = []
+            for rel, target in pres_targets:
+                _, master_targets = _read_rels(zf, names, target)
+                for master_rel, layout in master_targets:
+                    if master_rel.get('Type') == RT_SLIDE_LAYOUT and layout in names:
+                        self.layouts.append((layout, self._layout_info(zf.read(layout))))
+        self.pres_xml = etree.fromstring(self.parts.pop(self.presentation))
+        self.content_types = etree.fromstring(self.parts.pop('[Content_Types].xml'))
+        self.parts.pop(_rels_name(self.presentation), None)
+        # overrides of the slides that were left out would name parts that do not exist
+        for override in list(self.content_types.iter('{%s}Override' % CT_NS)):
+            if override.get('PartName', '').lstrip('/') not in self.parts and \
+                    override.get('PartName', '').lstrip('/') != self.presentation:
+                self.content_types.remove(override)
+        sld_sz = self.pres_xml.find(_P + 'sldSz')
+        self.width = int(sld_sz.get('cx')) if sld_sz is not None else 9144000
+        self.height = int(sld_sz.get('cy')) if sld_sz is not None else 6858000
+
+    @staticmethod
+    def _layout_info(data):
+        root = etree.fromstring(data)
+        c_sld = root.find(_P + 'cSld')
+        name = c_sld.get('name', '') if c_sld is not None else ''
+        placeholders = sum(1 for _ in root.iter(_P + 'ph'))
+        return name, placeholders
+
+    @classmethod
+    def shared(cls, path=None):
+        """Return the process-wide TemplatePackage of path (default: the python-pptx blank
+        template), read again only when the file changes."""
+        path = path or default_template()
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        with _shared_lock:
+            template = _shared.get(key)
+        if template is None:
+            template = cls(path)
+            with _shared_lock:
+                for stale in [k for k in _shared if k[0] == key[0]]:
+                    del _shared[stale]
+                _shared[key] = template
+        return template
+
+    def layout(self, layout=None):
+        """Part name of a slide layout, chosen by name or 0-based index; by default the
+        layout named Blank, or else the one with the fewest placeholders."""
+        if not self.layouts:
+            raise ValueError(f"Template has no slide layouts: {self.path}")
+        if isinstance(layout, int):
+            return self.layouts[layout][0]
+        if layout is not None:
+            for partname, (name, _) in self.layouts:
+                if name == layout:
+                    return partname
+            raise ValueError(f"Template has no slide layout named {layout}")
+        for partname, (name, _) in self.layouts:
+            if name.lower() == 'blank':
+                return partname
+        return min(self.layouts, key=lambda item: item[1][1])[0]
+
+
+# --- reading slide html ---
+
+_STYLE_RULE = re.compile(r'\.([\w-]+)\s*\{([^}]*)\}')
+_ROTATE = re.compile(r'rotate\(\s*(-?[\d.]+)deg\s*\)')
+_URL = re.compile(r'url\(\s*[\'"]?([^\'")]+)[\'"]?\s*\)')
+_HEX = re.compile(r'#([0-9a-fA-F]{3}|[0-9a-fA-F]{6})\b')
+_RGB = re.compile(r'rgba?\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)')
+
+
+def parse_style(style):
+    """Css declarations into a dict; later declarations of a property win."""
+    decls = {}
+    for decl in (style or '').split(';'):
+        name, sep, value = decl.partition(':')
+        if sep:
+            decls[name.strip().lower()] = value.strip()
+    return decls
+
+
+def _px(value, default=None):
+    if not value:
+        return default
+    m = re.match(r'\s*(-?[\d.]+)', value)
+    return float(m.group(1)) if m else default
+
+
+def parse_color(value):
+    """'#rrggbb' of a css color (#rgb, #rrggbb or rgb()), or None."""
+    if not value:
+        return None
+    m = _HEX.search(value)
+    if m:
+        hex_digits = m.group(1)
+        if len(hex_digits) == 3:
+            hex_digits = ''.join(c * 2 for c in hex_digits)
+        return f"#{hex_digits.lower()}"
+    m = _RGB.search(value)
+    if m:
+        return "#" + ''.join(f"{min(int(c), 255):02x}" for c in m.groups())
+    return None
+
+
+def _font_family(value):
+    if not value:
+        return None
+    return value.split(',')[0].strip().strip('"\'') or None
+
+
+class _FileCache:
+    """Least recently used file contents, bounded by their total size."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def read(self, path):
+        st = os.stat(path)
+        # keyed by mtime and size, so a changed file is read again
+        key = (path, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) <= self.max_bytes // 4:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = data
+                    self._bytes += len(data)
+                while self._bytes > self.max_bytes:
+                    self._bytes -= len(self._entries.popitem(last=False)[1])
+        return data
+
+
+_files = _FileCache(MEDIA_CACHE_BYTES)
+
+
+def sniff_image(data):
+    """Image format of data from its leading bytes (a key of IMAGE_TYPES), or None."""
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if data.startswith((b'GIF87a', b'GIF89a')):
+        return 'gif'
+    if data.startswith(b'BM'):
+        return 'bmp'
+    if data.startswith((b'II*\x00', b'MM\x00*')):
+        return 'tiff'
+    if data.startswith(b'\x01\x00\x00\x00') and data[40:44] == b' EMF':
+        return 'emf'
+    if data.startswith((b'\xd7\xcd\xc6\x9a', b'\x01\x00\x09\x00', b'\x02\x00\x09\x00')):
+        return 'wmf'
+    return None
+
+
+def load_media(src, base_dir=None, root=None):
+    """Return (bytes, ext) of an image src: a data: URL or a relative path, resolved against
+    base_dir. Paths that are absolute or lead outside root (default: base_dir) are refused, as
+    is anything whose bytes are not an image format of IMAGE_TYPES; both raise ValueError.
+    Files up to a quarter of MEDIA_CACHE_BYTES are cached in memory, so an image shared
+    by many pages is read once."""
+    if src.startswith('data:'):
+        header, _, payload = src[len('data:'):].partition(',')
+        data = base64.b64decode(payload) if ';base64' in header else payload.encode('utf-8')
+    else:
+        if re.match(r'^[a-z][a-z0-9+.-]*:', src, re.I):
+            raise ValueError(f"Only relative image paths are read: {src}")
+        relative = src.split('?')[0].split('#')[0]
+        if os.path.isabs(relative) or relative.startswith(('/', '\\')):
+            raise ValueError(f"Absolute image paths are not read: {src}")
+        base_dir = os.path.realpath(base_dir or '.')
+        root = os.path.realpath(root) if root else base_dir
+        path = os.path.realpath(os.path.join(base_dir, relative))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"Image path leads outside {root}: {src}")
+        data = _files.read(path)
+    ext = sniff_image(data)
+    if ext is None:
+        raise ValueError(f"Not a supported image: {src[:80]}")
+    return data, ext
+
+
+def _media_ref(src, base_dir, root, name):
+    data, ext = load_media(src, base_dir, root)
+    return MediaRef(name, ext, size=len(data), data=data)
+
+
+def _text_lines(el):
+    """Text of an element with <br> as newlines."""
+    chunks = [el.text or '']
+    for child in el:
+        if isinstance(child.tag, str) and child.tag.lower() == 'br':
+            chunks.append('\n')
+        else:
+            chunks.append(_text_lines(child))
+        chunks.append(child.tail or '')
+    return ''.join(chunks)
+
+
+def _paragraph(p):
+    decls = parse_style(p.get('style'))
+    align = decls.get('text-align')
+    level = int(round(_px(decls.get('margin-left'), 0) / LEVEL_INDENT_PX))
+    runs = []
+    if p.text and p.text.strip():
+        runs.append(RunIR(p.text))
+    for child in p:
+        if not isinstance(child.tag, str):
+            continue
+        if child.tag.lower() == 'br':
+            runs.append(RunIR('\n'))
+        else:
+            run_decls = parse_style(child.get('style'))
+            size_px = _px(run_decls.get('font-size'))
+            decoration = run_decls.get('text-decoration', '')
+            runs.append(RunIR(
+                _text_lines(child),
+                font_family=_font_family(run_decls.get('font-family')),
+                font_size=size_px * 0.75 if size_px else None,
+                bold=run_decls.get('font-weight') in ('bold', '600', '700', '800', '900'),
+                italic=run_decls.get('font-style') == 'italic',
+                underline='underline' in decoration,
+                color=parse_color(run_decls.get('color')),
+            ))
+        if child.tail and child.tail.strip():
+            runs.append(RunIR(child.tail))
+    return ParagraphIR(runs=runs, align=align, level=level)
+
+
+def _table(table_el, class_rules):
+    table = TableIR()
+    for col in table_el.iter('col'):
+        width = _px(parse_style(col.get('style')).get('width'))
+        if width is not None:
+            table.col_widths.append(width)
+    for tr in table_el.iter('tr'):
+        checkpoint()
+        cells = []
+        for td in tr:
+            if not isinstance(td.tag, str) or td.tag.lower() not in ('td', 'th'):
+                continue
+            styles = [class_rules.get(cls, '') for cls in (td.get('class') or '').split()]
+            styles.append(td.get('style') or '')
+            cells.append(CellIR(text=_text_lines(td), colspan=int(td.get('colspan') or 1),
+                                rowspan=int(td.get('rowspan') or 1), style=' '.join(s for s in styles if s)))
+        table.rows.append((_px(parse_style(tr.get('style')).get('height')), cells))
+    return table
+
+
+def _geometry(decls):
+    left = _px(decls.get('left'), 0)
+    top = _px(decls.get('top'), 0)
+    width = _px(decls.get('width'), 0)
+    height = _px(decls.get('height'), 0)
+    m = _ROTATE.search(decls.get('transform', ''))
+    return left, top, width, height, float(m.group(1)) if m else 0
+
+
+def parse_slide_html(html, base_dir=None, number=1, root=None):
+    """Read a slide page into a SlideIR; returns (SlideIR, (width, height) of the page in px
+    or None, number of elements skipped).
+
+    Shapes are the .shape children of the .slide div, positioned by their left/top/width/
+    height styles: text (p and span styles), tables, images (files relative to base_dir
+    within root, or data: URLs; see load_media), lines and auto shapes. Layout layer
+    elements are left to the template; charts, svg drawings, videos, sprites and images
+    that cannot be read are skipped."""
+    from lxml import html as lxml_html
+    if isinstance(html, bytes):
+        html = html.decode('utf-8')
+    doc = lxml_html.document_fromstring(html)
+    class_rules = {}
+    for style in doc.iter('style'):
+        for cls, decls in _STYLE_RULE.findall(style.text or ''):
+            class_rules[cls] = decls
+    slide_el = next((el for el in doc.iter('div') if 'slide' in (el.get('class') or '').split()), None)
+    if slide_el is None:
+        raise ValueError("No .slide element in the page")
+    slide_decls = parse_style(class_rules.get('slide', ''))
+    slide_decls.update(parse_style(slide_el.get('style')))
+    slide_ir = SlideIR(number)
+    slide_ir.background_css = f"background-color: {parse_color(slide_decls.get('background-color')) or '#ffffff'};"
+    width, height = _px(slide_decls.get('width')), _px(slide_decls.get('height'))
+    skipped = 0
+    bg = _URL.search(slide_decls.get('background-image', ''))
+    if bg:
+        try:
+            slide_ir.background_media = _media_ref(bg.group(1), base_dir, root, f"slide{number}_bg")
+        except (OSError, ValueError):
+            skipped += 1
+    images = 0
+    for el in slide_el:
+        if not isinstance(el.tag, str):
+            continue
+        classes = (el.get('class') or '').split()
+        if 'shape' not in classes or any(cls.startswith('layout-') for cls in classes):
+            continue
+        checkpoint()
+        decls = parse_style(el.get('style'))
+        left, top, w, h, rot = _geometry(decls)
+        shape = None
+        if 'line' in classes:
+            border = decls.get('border-top', '')
+            stroke_width = _px(border) if border else h
+            dash = next((d for d in ('dashed', 'dotted') if d in border), None)
+            shape = ShapeIR('line', stroke_color=parse_color(border or decls.get('background-color')) or '#000000',
+                            stroke_width=stroke_width or 1, dash_style=dash)
+        elif 'auto-shape' in classes:
+            border = decls.get('border', '')
+            shape = ShapeIR('auto-shape', fill_color=parse_color(decls.get('background-color')),
+                            stroke_color=parse_color(border), stroke_width=_px(border) if border else None)
+        elif 'vector' in classes:
+            skipped += 1
+            continue
+        else:
+            img = next(el.iter('img'), None)
+            table_el = next(el.iter('table'), None)
+            paragraphs = [p for p in el.iter('p')]
+            if img is not None and img.get('src'):
+                try:
+                    media = _media_ref(img.get('src'), base_dir, root, f"slide{number}_img{images}")
+                except (OSError, ValueError):
+                    skipped += 1
+                    continue
+                images += 1
+                shape = ShapeIR('picture', media=media)
+            elif table_el is not None:
+                shape = ShapeIR('table', table=_table(table_el, class_rules))
+            elif paragraphs:
+                shape = ShapeIR('text', paragraphs=[_paragraph(p) for p in paragraphs])
+            else:
+                skipped += 1
+                continue
+        shape.left, shape.top, shape.width, shape.height, shape.rotation = left, top, w, h, rot
+        slide_ir.shapes.append(shape)
+    return slide_ir, (width, height) if width and height else None, skipped
+
+
+# --- writing slides ---
+
+_SLIDE_OPEN = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<p:sld xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+    'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"><p:cSld>'
+)
+_SP_TREE_OPEN = (
+    '<p:spTree><p:nvGrpSpPr><p:cNvPr id="1" name=""/><p:cNvGrpSpPr/><p:nvPr/></p:nvGrpSpPr>'
+    '<p:grpSpPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="0" cy="0"/><a:chOff x="0" y="0"/>'
+    '<a:chExt cx="0" cy="0"/></a:xfrm></p:grpSpPr>'
+)
+_SLIDE_CLOSE = '</p:spTree></p:cSld><p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sld>'
+_ALGN = {'left': 'l', 'center': 'ctr', 'right': 'r', 'justify': 'just'}
+_ANCHOR = {'top': 't', 'middle': 'ctr', 'bottom': 'b'}
+_DASH = {'dashed': 'dash', 'dotted': 'sysDot'}
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xml_text(text):
+    return escape(_XML_INVALID.sub('', text), quote=False)
+
+
+def _srgb(color):
+    return f'<a:solidFill><a:srgbClr val="{color.lstrip("#").upper()}"/></a:solidFill>'
+
+
+class _Scale:
+    """Pixel to EMU conversion from the page size onto the template's slide size."""
+
+    def __init__(self, sx=1.0, sy=1.0):
+        self.sx = sx
+        self.sy = sy
+
+    def x(self, px):
+        return int(round((px or 0) * EMU_PER_PX * self.sx))
+
+    def y(self, px):
+        return int(round((px or 0) * EMU_PER_PX * self.sy))
+
+    def font(self, pt):
+        return int(round(pt * self.sy * 100))
+
+
+def _rpr(run, scale, tag='a:rPr'):
+    attrs = ' lang="zh-CN" altLang="en-US"'
+    if run.font_size:
+        attrs += f' sz="{max(100, min(400000, scale.font(run.font_size)))}"'
+    if run.bold:
+        attrs += ' b="1"'
+    if run.italic:
+        attrs += ' i="1"'
+    if run.underline:
+        attrs += ' u="sng"'
+    inner = _srgb(run.color) if run.color else ''
+    family = run.font_name or run.font_family
+    if family:
+        face = escape(family)
+        inner += f'<a:latin typeface="{face}"/><a:ea typeface="{face}"/><a:cs typeface="{face}"/>'
+    return f'<{tag}{attrs}>{inner}</{tag}>' if inner else f'<{tag}{attrs}/>'
+
+
+def _paragraph_xml(paragraph, scale):
+    ppr = ''
+    if paragraph.align in _ALGN:
+        ppr += f' algn="{_ALGN[paragraph.align]}"'
+    if paragraph.level:
+        ppr += f' lvl="{min(paragraph.level, 8)}" marL="{scale.x(paragraph.level * LEVEL_INDENT_PX)}"'
+    parts = [f'<a:p><a:pPr{ppr}/>' if ppr else '<a:p>']
+    runs = paragraph.runs if paragraph.fallback_text is None else [RunIR(paragraph.fallback_text)]
+    for run in runs:
+        rpr = _rpr(run, scale)
+        for k, line in enumerate(run.text.replace('\x0b', '\n').split('\n')):
+            if k:
+                parts.append(f'<a:br>{rpr}</a:br>')
+            if line:
+                parts.append(f'<a:r>{rpr}<a:t>{_xml_text(line)}</a:t></a:r>')
+    parts.append('</a:p>')
+    return ''.join(parts)
+
+
+def _xfrm(shape, scale, tag='a:xfrm'):
+    """Offset, extent and rotation of a shape; css rotates about the top-left corner,
+    PowerPoint about the center, so rotated boxes are moved accordingly."""
+    left, top, width, height = shape.left or 0, shape.top or 0, shape.width or 0, shape.height or 0
+    rot = ''
+    if shape.rotation:
+        theta = math.radians(shape.rotation)
+        cx = left + (width / 2) * math.cos(theta) - (height / 2) * math.sin(theta)
+        cy = top + (width / 2) * math.sin(theta) + (height / 2) * math.cos(theta)
+        left, top = cx - width / 2, cy - height / 2
+        rot = f' rot="{int(round(shape.rotation * 60000)) % 21600000}"'
+    return (f'<{tag}{rot}><a:off x="{scale.x(left)}" y="{scale.y(top)}"/>'
+            f'<a:ext cx="{scale.x(width)}" cy="{scale.y(height)}"/></{tag}>')
+
+
+def _text_xml(shape, shape_id, scale):
+    paragraphs = ''.join(_paragraph_xml(p, scale) for p in shape.paragraphs) or '<a:p/>'
+    return (f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="TextBox {shape_id}"/><p:cNvSpPr txBox="1"/>'
+            f'<p:nvPr/></p:nvSpPr><p:spPr>{_xfrm(shape, scale)}<a:prstGeom prst="rect"><a:avLst/></a:prstGeom>'
+            f'<a:noFill/></p:spPr><p:txBody><a:bodyPr wrap="square" lIns="0" tIns="0" rIns="0" bIns="0" rtlCol="0">'
+            f'<a:noAutofit/></a:bodyPr><a:lstStyle/>{paragraphs}</p:txBody></p:sp>')
+
+
+def _auto_shape_xml(shape, shape_id, scale):
+    fill = _srgb(shape.fill_color) if shape.fill_color else '<a:noFill/>'
+    if shape.stroke_color and shape.stroke_width:
+        line = f'<a:ln w="{scale.x(shape.stroke_width)}">{_srgb(shape.stroke_color)}</a:ln>'
+    else:
+        line = '<a:ln><a:noFill/></a:ln>'
+    return (f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="Rectangle {shape_id}"/><p:cNvSpPr/><p:nvPr/>'
+            f'</p:nvSpPr><p:spPr>{_xfrm(shape, scale)}<a:prstGeom prst="rect"><a:avLst/></a:prstGeom>'
+            f'{fill}{line}</p:spPr></p:sp>')
+
+
+def _line_xml(shape, shape_id, scale):
+    theta = math.radians(shape.rotation or 0)
+    x1, y1 = shape.left or 0, shape.top or 0
+    x2, y2 = x1 + (shape.width or 0) * math.cos(theta), y1 + (shape.width or 0) * math.sin(theta)
+    flip = (' flipH="1"' if x2 < x1 else '') + (' flipV="1"' if y2 < y1 else '')
+    dash = f'<a:prstDash val="{_DASH[shape.dash_style]}"/>' if shape.dash_style in _DASH else ''
+    return (f'<p:cxnSp><p:nvCxnSpPr><p:cNvPr id="{shape_id}" name="Line {shape_id}"/><p:cNvCxnSpPr/><p:nvPr/>'
+            f'</p:nvCxnSpPr><p:spPr><a:xfrm{flip}><a:off x="{scale.x(min(x1, x2))}" y="{scale.y(min(y1, y2))}"/>'
+            f'<a:ext cx="{scale.x(abs(x2 - x1))}" cy="{scale.y(abs(y2 - y1))}"/></a:xfrm>'
+            f'<a:prstGeom prst="line"><a:avLst/></a:prstGeom><a:ln w="{scale.x(shape.stroke_width or 1)}">'
+            f'{_srgb(shape.stroke_color or "#000000")}{dash}</a:ln></p:spPr></p:cxnSp>')
+
+
+def _picture_xml(shape, shape_id, rid, scale):
+    return (f'<p:pic><p:nvPicPr><p:cNvPr id="{shape_id}" name="Picture {shape_id}"/><p:cNvPicPr>'
+            f'<a:picLocks noChangeAspect="1"/></p:cNvPicPr><p:nvPr/></p:nvPicPr><p:blipFill>'
+            f'<a:blip r:embed="{rid}"/><a:stretch><a:fillRect/></a:stretch></p:blipFill>'
+            f'<p:spPr>{_xfrm(shape, scale)}<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></p:spPr></p:pic>')
+
+
+def _table_grid(table):
+    """Place the cells of a TableIR on its grid: {(row, col): (CellIR or None, covered_by_h, covered_by_v)}
+    and the number of columns."""
+    grid = {}
+    ncols = 0
+    for r, (_, cells) in enumerate(table.rows):
+        c = 0
+        for cell in cells:
+            while (r, c) in grid:
+                c += 1
+            for dr in range(cell.rowspan):
+                for dc in range(cell.colspan):
+                    grid[(r + dr, c + dc)] = (cell if dr == dc == 0 else None, dc > 0, dr > 0)
+            c += cell.colspan
+            ncols = max(ncols, c)
+    return grid, max(ncols, len(table.col_widths))
+
+
+def _cell_fragments(style, scale):
+    """(pPr, rPr, endParaRPr, tcPr) xml of a cell's css."""
+    decls = parse_style(style)
+    size_px = _px(decls.get('font-size'))
+    run_style = RunIR('', font_size=size_px * 0.75 if size_px else None,
+                      bold=decls.get('font-weight') in ('bold', '600', '700', '800', '900'),
+                      italic=decls.get('font-style') == 'italic',
+                      underline='underline' in decls.get('text-decoration', ''),
+                      color=parse_color(decls.get('color')))
+    ppr = f'<a:pPr algn="{_ALGN[decls["text-align"]]}"/>' if decls.get('text-align') in _ALGN else ''
+    anchor = f' anchor="{_ANCHOR[decls["vertical-align"]]}"' if decls.get('vertical-align') in _ANCHOR else ''
+    border = ''.join(f'<a:{side} w="{CELL_BORDER_EMU}">{_srgb("#000000")}</a:{side}>'
+                     for side in ('lnL', 'lnR', 'lnT', 'lnB'))
+    fill = parse_color(decls.get('background-color'))
+    margin = scale.x(CELL_MARGIN_PX)
+    tc_pr = (f'<a:tcPr marL="{margin}" marR="{margin}" marT="{margin}" marB="{margin}"{anchor}>'
+             f'{border}{_srgb(fill) if fill else ""}</a:tcPr>')
+    return ppr, _rpr(run_style, scale), _rpr(run_style, scale, 'a:endParaRPr'), tc_pr
+
+
+def _table_xml(shape, shape_id, scale):
+    table = shape.table
+    grid, ncols = _table_grid(table)
+    nrows = len(table.rows)
+    widths = list(table.col_widths[:ncols])
+    rest = max(0, (shape.width or 0) - sum(widths))
+    missing = ncols - len(widths)
+    widths += [rest / missing if missing else 0] * missing
+    default_height = (shape.height or 0) / nrows if nrows else 0
+    # cells share a handful of class styles, so their xml is built once per style
+    styles = {}
+    parts = [f'<p:graphicFrame><p:nvGraphicFramePr><p:cNvPr id="{shape_id}" name="Table {shape_id}"/>'
+             f'<p:cNvGraphicFramePr><a:graphicFrameLocks noGrp="1"/></p:cNvGraphicFramePr><p:nvPr/>'
+             f'</p:nvGraphicFramePr>{_xfrm(shape, scale, tag="p:xfrm")}<a:graphic>'
+             f'<a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/table"><a:tbl><a:tblPr/>'
+             '<a:tblGrid>']
+    parts.extend(f'<a:gridCol w="{scale.x(w)}"/>' for w in widths)
+    parts.append('</a:tblGrid>')
+    for r, (height, _) in enumerate(table.rows):
+        checkpoint()
+        parts.append(f'<a:tr h="{scale.y(height if height is not None else default_height)}">')
+        for c in range(ncols):
+            cell, h_merge, v_merge = grid.get((r, c), (CellIR(), False, False))
+            attrs = ''
+            if cell is not None and cell.colspan > 1:
+                attrs += f' gridSpan="{cell.colspan}"'
+            if cell is not None and cell.rowspan > 1:
+                attrs += f' rowSpan="{cell.rowspan}"'
+            if h_merge:
+                attrs += ' hMerge="1"'
+            if v_merge:
+                attrs += ' vMerge="1"'
+            style = cell.style if cell is not None else ''
+            fragments = styles.get(style)
+            if fragments is None:
+                fragments = styles[style] = _cell_fragments(style, scale)
+            ppr, rpr, end_rpr, tc_pr = fragments
+            lines = (cell.text if cell is not None else '').replace('\x0b', '\n').split('\n')
+            paragraphs = ''.join(
+                f'<a:p>{ppr}<a:r>{rpr}<a:t>{_xml_text(line)}</a:t></a:r></a:p>' if line
+                else f'<a:p>{ppr}{end_rpr}</a:p>'
+                for line in lines
+            )
+            parts.append(f'<a:tc{attrs}><a:txBody><a:bodyPr/><a:lstStyle/>{paragraphs}</a:txBody>{tc_pr}</a:tc>')
+        parts.append('</a:tr>')
+    parts.append('</a:tbl></a:graphicData></a:graphic></p:graphicFrame>')
+    return ''.join(parts)
+
+
+def _rels_xml(rels):
+    items = ''.join(f'<Relationship Id="{rid}" Type="{rtype}" Target="{escape(target)}"/>'
+                    for rid, rtype, target in rels)
+    return ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="{PR_NS}">{items}</Relationships>').encode('utf-8')
+
+
+def _xml_bytes(root):
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+class PPTXWriter:
+    """Write slides onto a TemplatePackage as a PPTX zip, streaming each slide out as it is added.
+
+    fileobj may be unseekable (a pipe or socket file). The template's parts are written
+    first; presentation.xml, its relationships and the content types are written on close(),
+    once the slides are known. Image parts are named by content, so an image used on many
+    slides is stored once."""
+
+    def __init__(self, template, fileobj, layout=None, backgrounds=True, compresslevel=None):
+        self.template = template
+        self.layout = template.layout(layout)
+        self.backgrounds = backgrounds
+        self._zip = zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+        self._slides = []
+        self._media = {}
+        self.skipped = 0
+        for name, data in template.parts.items():
+            self._write(name, data)
+
+    def _write(self, name, data):
+        ext = name.rsplit('.', 1)[-1].lower()
+        self._zip.writestr(name, data, zipfile.ZIP_STORED if ext in STORED_EXTS else zipfile.ZIP_DEFLATED)
+
+    def _media_part(self, ref):
+        """Part name of a MediaRef's bytes, written on first use."""
+        digest = hashlib.sha1(ref.data).hexdigest()
+        partname = self._media.get(digest)
+        if partname is None:
+            partname = f"ppt/media/image-{digest[:16]}.{ref.ext}"
+            self._media[digest] = partname
+            self._write(partname, ref.data)
+        return partname
+
+    def add_slide(self, slide_ir, page_size=None):
+        """Write a SlideIR as the next slide. page_size is the (width, height) in px the
+        shapes are positioned in (default: the template's slide size); they are scaled onto it."""
+        number = len(self._slides) + 1
+        checkpoint('write', number)
+        if page_size:
+            scale = _Scale(self.template.width / (page_size[0] * EMU_PER_PX),
+                           self.template.height / (page_size[1] * EMU_PER_PX))
+        else:
+            scale = _Scale()
+        partname = f"ppt/slides/slide{number}.xml"
+        rels = [('rId1', RT_SLIDE_LAYOUT, posixpath.relpath(self.layout, 'ppt/slides'))]
+        targets = {}
+
+        def image_rid(ref):
+            target = posixpath.relpath(self._media_part(ref), 'ppt/slides')
+            if target not in targets:
+                targets[target] = f"rId{len(rels) + 1}"
+                rels.append((targets[target], RT_IMAGE, target))
+            return targets[target]
+
+        parts = [_SLIDE_OPEN]
+        if self.backgrounds:
+            parts.append(self._background_xml(slide_ir, image_rid))
+        parts.append(_SP_TREE_OPEN)
+        shape_id = 1
+        for shape in slide_ir.shapes:
+            checkpoint()
+            shape_id += 1
+            kind = shape.kind
+            if kind == 'text':
+                parts.append(_text_xml(shape, shape_id, scale))
+            elif kind == 'picture' and shape.media is not None and shape.media.data:
+                parts.append(_picture_xml(shape, shape_id, image_rid(shape.media), scale))
+            elif kind == 'table' and shape.table is not None:
+                parts.append(_table_xml(shape, shape_id, scale))
+            elif kind == 'auto-shape':
+                parts.append(_auto_shape_xml(shape, shape_id, scale))
+            elif kind == 'line':
+                parts.append(_line_xml(shape, shape_id, scale))
+            else:
+                self.skipped += 1
+        parts.append(_SLIDE_CLOSE)
+        self._write(partname, ''.join(parts).encode('utf-8'))
+        self._write(posixpath.join('ppt/slides/_rels', f"slide{number}.xml.rels"), _rels_xml(rels))
+        self._slides.append(partname)
+        return number
+
+    @staticmethod
+    def _background_xml(slide_ir, image_rid):
+        """The slide's own background: its image, or a color other than the default white;
+        otherwise the template's background shows."""
+        if slide_ir.background_media is not None and slide_ir.background_media.data:
+            return (f'<p:bg><p:bgPr><a:blipFill dpi="0" rotWithShape="1"><a:blip r:embed="{image_rid(slide_ir.background_media)}"/>'
+                    '<a:srcRect/><a:stretch><a:fillRect/></a:stretch></a:blipFill><a:effectLst/></p:bgPr></p:bg>')
+        color = parse_color(parse_style(slide_ir.background_css).get('background-color'))
+        if color and color != '#ffffff':
+            return f'<p:bg><p:bgPr>{_srgb(color)}<a:effectLst/></p:bgPr></p:bg>'
+        return ''
+
+    def close(self):
+        """Write the presentation parts and finish the zip."""
+        template = self.template
+        pres_xml = copy.deepcopy(template.pres_xml)
+        sld_id_lst = pres_xml.find(_P + 'sldIdLst')
+        if sld_id_lst is None:
+            sld_id_lst = etree.Element(_P + 'sldIdLst')
+            # sldIdLst follows the master id lists and precedes sldSz
+            anchor = None
+            for tag in ('sldMasterIdLst', 'notesMasterIdLst', 'handoutMasterIdLst'):
+                anchor = pres_xml.find(_P + tag) if pres_xml.find(_P + tag) is not None else anchor
+            if anchor is not None:
+                anchor.addnext(sld_id_lst)
+            else:
+                pres_xml.insert(0, sld_id_lst)
+        rels = copy.deepcopy(template.pres_rels) if template.pres_rels is not None else \
+            etree.Element('{%s}Relationships' % PR_NS)
+        used = {rel.get('Id') for rel in rels}
+        next_rid = 1
+        base = posixpath.dirname(template.presentation)
+        for number, partname in enumerate(self._slides):
+            while f"rId{next_rid}" in used:
+                next_rid += 1
+            rid = f"rId{next_rid}"
+            used.add(rid)
+            etree.SubElement(rels, '{%s}Relationship' % PR_NS, Id=rid, Type=RT_SLIDE,
+                             Target=posixpath.relpath(partname, base))
+            sld_id = etree.SubElement(sld_id_lst, _P + 'sldId', id=str(256 + number))
+            sld_id.set('{%s}id' % R_NS, rid)
+        content_types = copy.deepcopy(template.content_types)
+        defaults = {d.get('Extension', '').lower() for d in content_types.iter('{%s}Default' % CT_NS)}
+        for partname in self._media.values():
+            ext = partname.rsplit('.', 1)[-1]
+            if ext.lower() not in defaults:
+                defaults.add(ext.lower())
+                content_type = IMAGE_TYPES.get(ext.lower(), 'application/octet-stream')
+                content_types.insert(0, etree.Element('{%s}Default' % CT_NS, Extension=ext, ContentType=content_type))
+        for partname in self._slides:
+            etree.SubElement(content_types, '{%s}Override' % CT_NS, PartName='/' + partname, ContentType=CT_SLIDE)
+        self._write(template.presentation, _xml_bytes(pres_xml))
+        self._write(_rels_name(template.presentation), _xml_bytes(rels))
+        self._write('[Content_Types].xml', _xml_bytes(content_types))
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self._zip.close()
+        return False
+
+
+def page_root(page):
+    """Directory a page's images must lie in: the deck directory for a page in a converted
+    deck's slides/ folder (its images are in ../media), else the page's own directory."""
+    directory = os.path.dirname(os.path.abspath(page))
+    return os.path.dirname(directory) if os.path.basename(directory) == 'slides' else directory
+
+
+def slide_pages(source):
+    """Slide html files of a source, in slide order: a converted deck directory (its slides/
+    folder), a directory of html pages, a single page or a list of pages."""
+    if isinstance(source, (list, tuple)):
+        return list(source)
+    if os.path.isfile(source):
+        return [source]
+    directory = os.path.join(source, "slides") if os.path.isdir(os.path.join(source, "slides")) else source
+    pages = [f for f in os.listdir(directory) if f.endswith('.html')]
+
+    def order(name):
+        m = re.search(r'(\d+)\.html$', name)
+        return (int(m.group(1)) if m else float('inf'), name)
+    return [os.path.join(directory, f) for f in sorted(pages, key=order)]
+
+
+class HTMLToPPTXConverter:
+    """Build PPTX decks from slide html pages on a template."""
+
+    def __init__(self, template: Optional[str] = None, layout=None, backgrounds: bool = True,
+                 compresslevel: Optional[int] = None, output_sink: Optional[OutputSink] = None):
+        """
+        Initialize the converter.
+
+        Args:
+            template: Template PPTX whose masters, layouts and theme the decks use (default: the
+                python-pptx blank template); its own slides are left out
+            layout: Slide layout of the generated slides, by name or 0-based index (default: Blank,
+                or the layout with the fewest placeholders)
+            backgrounds: Whether a page's background image or non-white color becomes the slide background
+            compresslevel: zlib level of the xml parts (default: zlib's default); images are stored as is
+            output_sink: OutputSink storing decks written to a path (default: atomic writes to the
+                local filesystem)
+        """
+        self.template = template
+        self.layout = layout
+        self.backgrounds = backgrounds
+        self.compresslevel = compresslevel
+        self.output_sink = output_sink
+
+    def convert(self, source, output) -> Dict[str, Any]:
+        """
+        Build one deck.
+
+        Args:
+            source: Slide pages (see slide_pages): a converted deck directory, a directory of
+                html pages, one page or a list of pages
+            output: Path of the PPTX, streamed into output_sink.open(); or a binary file object
+                the zip is streamed into (may be unseekable)
+
+        Returns:
+            Dict with the output, slides_count, media_parts (distinct images stored),
+            skipped_elements and seconds
+        """
+        started = time.perf_counter()
+        template = TemplatePackage.shared(self.template)
+        pages = slide_pages(source)
+        if not pages:
+            raise ValueError(f"No slide pages found in {source}")
+        if isinstance(output, str):
+            sink = self.output_sink if self.output_sink is not None else LocalSink()
+            with sink.open(output) as f:
+                result = self._write(template, pages, f)
+        else:
+            result = self._write(template, pages, output)
+        result["output"] = output if isinstance(output, str) else None
+        result["seconds"] = round(time.perf_counter() - started, 4)
+        return result
+
+    def _write(self, template, pages, fileobj):
+        skipped = 0
+        with PPTXWriter(template, fileobj, self.layout, self.backgrounds, self.compresslevel) as writer:
+            for number, page in enumerate(pages, 1):
+                checkpoint('extract', number)
+                with open(page, 'rb') as f:
+                    slide_ir, page_size, page_skipped = parse_slide_html(f.read(), os.path.dirname(page), number,
+                                                                         page_root(page))
+                skipped += page_skipped
+                writer.add_slide(slide_ir, page_size)
+        return {"slides_count": len(pages), "media_parts": len(writer._media),
+                "skipped_elements": skipped + writer.skipped}
+
+    def convert_batch(self, jobs, workers: Optional[int] = None, skip=None) -> Iterator[Dict[str, Any]]:
+        """
+        Build many decks, yielding one result per job as each finishes.
+
+        Args:
+            jobs: Iterable of {"input": source, "output": path, "id": optional} job dicts, e.g.
+                from jobs.iter_jobs (a malformed manifest line becomes an error result); it is
+                read lazily, so it may be a generator over a long list
+            workers: Number of worker processes (default: in-process); each reads the
+                template once and a worker that dies is replaced
+            skip: job_key()s of jobs not to run, e.g. from jobs.load_done
+
+        Yields:
+            {"line", "id", "input", "output", "status": "ok" or "error", "error", "error_type",
+            "seconds"} plus the convert() result
+        """
+        options = (self.template, self.layout, self.backgrounds, self.compresslevel, self.output_sink)
+        pending = (job for job in jobs if not (skip and job_key(job) in skip))
+        if not workers or workers <= 1:
+            for job in pending:
+                yield build_job(job, options)
+            return
+        yield from run_watched(pending, partial(build_job, options=options), workers, lost=lost_job_result)
+
+
+def build_job(job, options):
+    """Build the deck of one convert_batch job with the converter arguments options; never
+    raises: failures are reported in the result, as jobs.run_job does."""
+    started = time.perf_counter()
+    result = {"line": job.get("line")}
+    if job.get("id") is not None:
+        result["id"] = job["id"]
+    result["input"] = job.get("input")
+    result["output"] = job.get("output")
+    try:
+        if "error" in job:
+            raise ValueError(job["error"])
+        if not job.get("output"):
+            raise ValueError('a job needs an "output"')
+        converted = HTMLToPPTXConverter(*options).convert(job["input"], job["output"])
+        result["status"] = "ok"
+        result["slides_count"] = converted["slides_count"]
+        result["media_parts"] = converted["media_parts"]
+        result["skipped_elements"] = converted["skipped_elements"]
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+        result["error_type"] = type(e).__name__
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def main():
+    """Command line interface."""
+    import argparse
+    import json
+    import sys
+
+    parser = argparse.ArgumentParser(description='Build PPTX decks from slide HTML pages.')
+    parser.add_argument('input', nargs='?', help='Converted deck directory, directory of slide pages or one page')
+    parser.add_argument('--output', '-o', help='Output PPTX file')
+    parser.add_argument('--template', '-t', help='Template PPTX providing masters, layouts and theme.')
+    parser.add_argument('--layout', help='Slide layout name, or 0-based index (default: Blank).')
+    parser.add_argument('--no-backgrounds', action='store_true',
+                        help="Keep the template's backgrounds instead of the pages' background colors and images.")
+    parser.add_argument('--jobs-file', help='JSONL file of {"input": ..., "output": ...} jobs, one deck per line '
+                                            '("-" reads standard input); results are written as JSON lines.')
+    parser.add_argument('--results', help='Append one JSON result line per job to this file and skip jobs it already '
+                                           'records (default: write results to stdout).')
+    parser.add_argument('--retry-failed', action='store_true', help='With --results, run jobs that failed before again.')
+    parser.add_argument('--workers', type=int, default=0, help='Worker processes for --jobs-file.')
+    args = parser.parse_args()
+
+    layout = int(args.layout) if args.layout and args.layout.isdigit() else args.layout
+    converter = HTMLToPPTXConverter(args.template, layout, backgrounds=not args.no_backgrounds)
+    if args.jobs_file:
+        manifest = sys.stdin if args.jobs_file == '-' else open(args.jobs_file, 'r', encoding='utf-8')
+        skip = None
+        out = sys.stdout
+        if args.results:
+            skip = load_done(args.results, retry_failed=args.retry_failed)
+            out = open_results(args.results)
+        counts = {"ok": 0, "error": 0}
+        try:
+            for result in converter.convert_batch(iter_jobs(manifest), args.workers, skip=skip):
+                counts[result["status"]] += 1
+                out.write(json.dumps(result, ensure_ascii=False) + '\n')
+                out.flush()
+        finally:
+            if manifest is not sys.stdin:
+                manifest.close()
+            if out is not sys.stdout:
+                out.close()
+        print(f"Jobs: {counts['ok']} built, {counts['error']} failed", file=sys.stderr)
+        return 1 if counts['error'] else 0
+    if not args.input or not args.output:
+        parser.error('input and --output are required without --jobs-file')
+    try:
+        result = converter.convert(args.input, args.output)
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Built {args.output}: {result['slides_count']} slides, {result['media_parts']} images")
+    if result["skipped_elements"]:
+        print(f"Skipped {result['skipped_elements']} elements (charts, svg, video or unreadable images)")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,298 @@
+"""
+Intermediate representation of a converted deck.
+
+Extraction (python-pptx) produces these objects once; renderers (HTML, text,
+JSON) only read them, so output options can change without re-parsing the PPTX.
+"""
+
+import base64
+import gzip
+import json
+import zipfile
+
+IR_VERSION = 3
+
+
+class MediaRef:
+    """A media file used by the deck: its output name and where its bytes live.
+    part is the package part name (read from the source PPTX on demand); data holds
+    the bytes inline for media that has no part of its own."""
+    __slots__ = ('name', 'ext', 'kind', 'part', 'size', 'data')
+
+    def __init__(self, name, ext, kind='image', part=None, size=None, data=None):
+        self.name = name
+        self.ext = ext
+        self.kind = kind
+        self.part = part
+        self.size = size
+        self.data = data
+
+    @property
+    def filename(self):
+        return f"{self.name}.{self.ext}"
+
+
+class RunIR:
+    """A text run with its effective (resolved) formatting."""
+    __slots__ = ('text', 'font_family', 'font_size', 'font_name', 'bold', 'italic', 'underline', 'color')
+
+    def __init__(self, text, font_family=None, font_size=None, font_name=None, bold=False, italic=False,
+                 underline=False, color=None):
+        self.text = text
+        self.font_family = font_family
+        self.font_size = font_size
+        self.font_name = font_name
+        self.bold = bold
+        self.italic = italic
+        self.underline = underline
+        self.color = color
+
+
+class ParagraphIR:
+    """A paragraph; fallback_text is set instead of runs when its formatting could not be read."""
+    __slots__ = ('runs', 'align', 'level', 'fallback_text')
+
+    def __init__(self, runs=None, align=None, level=0, fallback_text=None):
+        self.runs = runs if runs is not None else []
+        self.align = align
+        self.level = level
+        self.fallback_text = fallback_text
+
+    @property
+    def text(self):
+        if self.fallback_text is not None:
+            return self.fallback_text
+        return ''.join(run.text for run in self.runs)
+
+
+class CellIR:
+    """A table cell; text uses '\\n' between paragraphs and for line breaks."""
+    __slots__ = ('text', 'colspan', 'rowspan', 'style')
+
+    def __init__(self, text='', colspan=1, rowspan=1, style=''):
+        self.text = text
+        self.colspan = colspan
+        self.rowspan = rowspan
+        self.style = style
+
+
+class TableIR:
+    """A table grid; rows is a list of (height_px or None, [CellIR]) with merged-away cells omitted."""
+    __slots__ = ('col_widths', 'rows')
+
+    def __init__(self, col_widths=None, rows=None):
+        self.col_widths = col_widths if col_widths is not None else []
+        self.rows = rows if rows is not None else []
+
+
+class SeriesIR:
+    """A chart series from the chart part's cached values; point_colors overrides colors per data point."""
+    __slots__ = ('name', 'values', 'color', 'point_colors')
+
+    def __init__(self, name=None, values=None, color=None, point_colors=None):
+        self.name = name
+        self.values = values if values is not None else []
+        self.color = color
+        self.point_colors = point_colors if point_colors is not None else {}
+
+
+class ChartIR:
+    """A bar, column, line or pie chart. key identifies the chart part content and resolved colors."""
+    __slots__ = ('kind', 'horizontal', 'grouping', 'title', 'categories', 'series', 'legend', 'key')
+
+    def __init__(self, kind, horizontal=False, grouping='clustered', title=None, categories=None, series=None,
+                 legend=False, key=None):
+        self.kind = kind
+        self.horizontal = horizontal
+        self.grouping = grouping
+        self.title = title
+        self.categories = categories if categories is not None else []
+        self.series = series if series is not None else []
+        self.legend = legend
+        self.key = key
+
+    @property
+    def text(self):
+        parts = [self.title] if self.title else []
+        parts.extend(s.name for s in self.series if s.name)
+        parts.extend(str(c) for c in self.categories)
+        return '\n'.join(parts)
+
+
+class ShapeIR:
+    """A positioned element of a slide or layout layer, with pixel geometry.
+
+    kind is one of 'picture', 'table', 'chart', 'video', 'video-placeholder', 'text',
+    'line' or 'auto-shape'. opaque marks shapes that paint every pixel of their box.
+    Lines and auto shapes carry their preset geometry, its adjust values, flips and prstDash."""
+    __slots__ = ('kind', 'left', 'top', 'width', 'height', 'rotation', 'opaque', 'media', 'poster',
+                 'paragraphs', 'table', 'chart', 'fill_color', 'stroke_color', 'stroke_width', 'dash_style',
+                 'geometry', 'adjustments', 'flip', 'dash')
+
+    def __init__(self, kind, left=None, top=None, width=None, height=None, rotation=0, opaque=False,
+                 media=None, poster=None, paragraphs=None, table=None, chart=None, fill_color=None, stroke_color=None,
+                 stroke_width=None, dash_style=None, geometry=None, adjustments=None, flip=None, dash=None):
+        self.kind = kind
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+        self.rotation = rotation
+        self.opaque = opaque
+        self.media = media
+        self.poster = poster
+        self.paragraphs = paragraphs
+        self.table = table
+        self.chart = chart
+        self.fill_color = fill_color
+        self.stroke_color = stroke_color
+        self.stroke_width = stroke_width
+        self.dash_style = dash_style
+        self.geometry = geometry
+        self.adjustments = adjustments
+        self.flip = flip
+        self.dash = dash
+
+    @property
+    def text(self):
+        if self.paragraphs:
+            return '\n'.join(p.text for p in self.paragraphs)
+        if self.table is not None:
+            return '\n'.join('\t'.join(cell.text for cell in cells) for _, cells in self.table.rows)
+        if self.chart is not None:
+            return self.chart.text
+        return ''
+
+
+class LayerIR:
+    """The decoration layer a slide layout and its master draw under every slide using it.
+    background is a full-slide image promoted to the slide background, if any."""
+    __slots__ = ('key', 'images', 'shapes', 'background')
+
+    def __init__(self, key, images=None, shapes=None, background=None):
+        self.key = key
+        self.images = images if images is not None else []
+        self.shapes = shapes if shapes is not None else []
+        self.background = background
+
+
+class SlideIR:
+    """One slide: its own shapes plus a reference to its layout layer."""
+    __slots__ = ('number', 'layer', 'background_css', 'background_media', 'shapes', 'notes')
+
+    def __init__(self, number, layer=None, background_css="background-color: #ffffff;", background_media=None,
+                 shapes=None, notes=None):
+        self.number = number
+        self.layer = layer
+        self.background_css = background_css
+        self.background_media = background_media
+        self.shapes = shapes if shapes is not None else []
+        self.notes = notes
+
+    def media(self):
+        """Return the media referenced by the slide's own shapes and background."""
+        refs = [self.background_media] if self.background_media is not None else []
+        for shape in self.shapes:
+            if shape.media is not None:
+                refs.append(shape.media)
+            if shape.poster is not None:
+                refs.append(shape.poster)
+        return refs
+
+
+class DeckIR:
+    """A whole deck. source is the PPTX path media parts are read from when no live package is attached."""
+    __slots__ = ('name', 'source', 'width', 'height', 'theme_major_font', 'theme_minor_font', 'num_slides',
+                 'slides', 'layers', '_parts')
+
+    def __init__(self, name, source=None, width=0, height=0, theme_major_font=None, theme_minor_font=None,
+                 num_slides=0, slides=None, layers=None):
+        self.name = name
+        self.source = source
+        self.width = width
+        self.height = height
+        self.theme_major_font = theme_major_font
+        self.theme_minor_font = theme_minor_font
+        self.num_slides = num_slides
+        self.slides = slides if slides is not None else []
+        self.layers = layers if layers is not None else {}
+        self._parts = None
+
+    def attach_package(self, package):
+        """Serve media from an opened python-pptx package instead of re-reading the zip."""
+        self._parts = {str(part.partname): part for part in package.iter_parts()}
+
+    def media_blob(self, ref):
+        """Return the bytes of a MediaRef, or None if they are not available."""
+        if ref.data is not None:
+            return ref.data
+        if ref.part is None:
+            return None
+        if self._parts is not None and ref.part in self._parts:
+            return self._parts[ref.part].blob
+        if self.source is None:
+            return None
+        with zipfile.ZipFile(self.source) as zf:
+            return zf.read(ref.part.lstrip('/'))
+
+
+_IR_CLASSES = {cls.__name__: cls for cls in (MediaRef, RunIR, ParagraphIR, CellIR, TableIR, SeriesIR, ChartIR, ShapeIR, LayerIR, SlideIR, DeckIR)}
+
+
+def ir_to_data(obj):
+    """Convert IR objects to JSON-compatible data, dropping unset and private fields."""
+    if isinstance(obj, list) or isinstance(obj, tuple):
+        return [ir_to_data(item) for item in obj]
+    if isinstance(obj, dict):
+        return {'_m': [[ir_to_data(k), ir_to_data(v)] for k, v in obj.items()]}
+    if isinstance(obj, bytes):
+        return {'_b': base64.b64encode(obj).decode('ascii')}
+    if type(obj).__name__ in _IR_CLASSES:
+        data = {'_t': type(obj).__name__}
+        for slot in obj.__slots__:
+            if slot.startswith('_'):
+                continue
+            value = getattr(obj, slot)
+            if value is None or value == [] or value is False:
+                continue
+            data[slot] = ir_to_data(value)
+        return data
+    return obj
+
+
+def ir_from_data(data):
+    """Rebuild IR objects from ir_to_data output."""
+    if isinstance(data, list):
+        return [ir_from_data(item) for item in data]
+    if isinstance(data, dict):
+        if '_b' in data:
+            return base64.b64decode(data['_b'])
+        if '_m' in data:
+            return {ir_from_data(k): ir_from_data(v) for k, v in data['_m']}
+        cls = _IR_CLASSES[data['_t']]
+        obj = cls.__new__(cls)
+        # start from the constructor defaults, then apply the stored fields
+        cls.__init__(obj, *([None] * (cls.__init__.__code__.co_argcount - len(cls.__init__.__defaults__ or ()) - 1)))
+        for key, value in data.items():
+            if key != '_t':
+                setattr(obj, key, ir_from_data(value))
+        return obj
+    return data
+
+
+def save_deck(deck, path):
+    """Write a deck IR to a JSON cache file (gzip-compressed when path ends with .gz)."""
+    payload = json.dumps({'v': IR_VERSION, 'deck': ir_to_data(deck)}, ensure_ascii=False, separators=(',', ':'))
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        f.write(payload)
+
+
+def load_deck(path):
+    """Read a deck IR written by save_deck."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        payload = json.load(f)
+    if payload.get('v') != IR_VERSION:
+        raise ValueError(f"Unsupported IR cache version: {payload.get('v')}")
+    return ir_from_data(payload['deck'])
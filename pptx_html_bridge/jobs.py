@@ -0,0 +1,198 @@
+"""
+Batch conversion from a JSONL job manifest.
+
+Each manifest line is a job {"input": ..., "output": ..., "options": {...}, "id": ...}
+(only input is required). Jobs are read lazily and one JSON result line is written per
+job as soon as it finishes, so memory stays flat however long the manifest is, and an
+interrupted run resumes by skipping the jobs its results file already records.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from functools import partial
+from .watchdog import ConversionTimeout, run_watched
+
+# Job options passed to convert_file; all others are PPTXToHTMLConverter arguments
+CONVERT_OPTIONS = ('slides',)
+MAX_CONVERTERS = 32
+
+_converters = OrderedDict()
+
+
+def job_key(job):
+    """Identity of a job (or of its result line) for resuming: its id, else its input and output."""
+    key = job.get("id")
+    if key is None:
+        key = [job.get("input"), job.get("output")]
+    return hashlib.sha1(json.dumps(key, ensure_ascii=False).encode('utf-8')).digest()[:12]
+
+
+def iter_jobs(lines):
+    """Parse manifest lines lazily into job dicts, each with its 1-based "line" number.
+    Blank lines and lines starting with # are skipped; a malformed line yields a job
+    holding only "line" and "error"."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict) or not job.get("input"):
+                raise ValueError('a job is a JSON object with an "input"')
+        except ValueError as e:
+            yield {"line": number, "error": f"Invalid job: {e}"}
+            continue
+        job["line"] = number
+        yield job
+
+
+def load_done(results_path, retry_failed=False):
+    """Return the keys of jobs already recorded in a results file (empty if it does not exist).
+    With retry_failed, jobs whose result is an error are run again. A torn last line is ignored."""
+    done = set()
+    if not os.path.exists(results_path):
+        return done
+    with open(results_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(result, dict) and not (retry_failed and result.get("status") != "ok"):
+                done.add(job_key(result))
+    return done
+
+
+def open_results(results_path):
+    """Open a results file for appending. A run killed mid-write leaves a torn last line,
+    so the next result starts on a fresh one."""
+    if os.path.exists(results_path) and os.path.getsize(results_path) > 0:
+        with open(results_path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+    return open(results_path, 'a', encoding='utf-8')
+
+
+def _converter(options):
+    """Converters are kept per option set, so a warm process reuses their caches between jobs."""
+    from .converter import PPTXToHTMLConverter
+    key = json.dumps(options, sort_keys=True)
+    converter = _converters.get(key)
+    if converter is None:
+        converter = _converters[key] = PPTXToHTMLConverter(**options)
+        while len(_converters) > MAX_CONVERTERS:
+            _converters.popitem(last=False)
+    else:
+        _converters.move_to_end(key)
+    return converter
+
+
+def _result(job):
+    result = {"line": job.get("line")}
+    if job.get("id") is not None:
+        result["id"] = job["id"]
+    result["input"] = job.get("input")
+    result["output"] = job.get("output")
+    return result
+
+
+def _options(job, defaults):
+    options = dict(defaults or {})
+    options.update(job.get("options") or {})
+    return options
+
+
+def job_limits(job, defaults=None):
+    """(wall, cpu) time limits of a job in seconds, from its deck_timeout and deck_cpu_timeout options."""
+    try:
+        options = _options(job, defaults)
+    except (TypeError, ValueError):
+        return None, None
+    return options.get("deck_timeout"), options.get("deck_cpu_timeout")
+
+
+def run_job(job, defaults=None):
+    """Run one job in this process and return its result line as a dict; never raises.
+    Job options override defaults (both use PPTXToHTMLConverter argument names).
+    A job that times out also reports the "stage" and "slide" it had reached."""
+    started = time.perf_counter()
+    result = _result(job)
+    try:
+        if "error" in job:
+            raise ValueError(job["error"])
+        options = _options(job, defaults)
+        convert_kwargs = {name: options.pop(name) for name in CONVERT_OPTIONS if name in options}
+        converted = _converter(options).convert_file(job["input"], job.get("output"), **convert_kwargs)
+        result["status"] = "ok"
+        result["output_dir"] = converted["output_dir"]
+        result["slides_count"] = converted["slides_count"]
+        result["generated_files"] = converted["generated_files"]
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+        result["error_type"] = type(e).__name__
+        if isinstance(e, ConversionTimeout):
+            result["stage"] = e.stage
+            result["slide"] = e.slide
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def lost_job_result(job, reason, stage, slide, seconds, defaults=None):
+    """Result line of a job whose worker was killed for overrunning its time limit ("wall" or "cpu") or died."""
+    result = _result(job)
+    result["status"] = "error"
+    if reason == "died":
+        result["error"] = "Worker process died"
+        result["error_type"] = "WorkerDied"
+    else:
+        wall, cpu = job_limits(job, defaults)
+        result["error"] = f"Worker killed: {ConversionTimeout(reason, wall if reason == 'wall' else cpu, stage, slide)}"
+        result["error_type"] = ConversionTimeout.__name__
+    result["stage"] = stage
+    result["slide"] = slide
+    result["seconds"] = round(seconds, 3)
+    return result
+
+
+def run_jobs(jobs, out, workers=None, defaults=None, skip=None):
+    """
+    Run jobs and write each result to out as one JSON line, flushed as soon as the job finishes.
+
+    jobs is any iterable of job dicts (see iter_jobs) and is consumed lazily. Jobs whose
+    job_key is in skip are not run. With workers > 1 jobs run in a process pool with at
+    most two per worker in flight, and results are written in completion order; a worker
+    that overruns a job's deck_timeout/deck_cpu_timeout without reaching a checkpoint, or
+    that dies, is killed and replaced and the job is reported as failed.
+
+    Returns:
+        {"ok": count, "error": count, "skipped": count}
+    """
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+
+    def write(result):
+        counts[result["status"]] += 1
+        out.write(json.dumps(result, ensure_ascii=False) + '\n')
+        out.flush()
+
+    def pending_jobs():
+        for job in jobs:
+            if skip and job_key(job) in skip:
+                counts["skipped"] += 1
+                continue
+            yield job
+
+    if not workers or workers <= 1:
+        for job in pending_jobs():
+            write(run_job(job, defaults))
+        return counts
+
+    for result in run_watched(pending_jobs(), partial(run_job, defaults=defaults), workers,
+                              limits=partial(job_limits, defaults=defaults),
+                              lost=partial(lost_job_result, defaults=defaults)):
+        write(result)
+    return counts
@@ -0,0 +1,206 @@
+"""
+Text-only extraction straight from the package XML.
+
+Reads slide titles, paragraphs with their outline levels, tables and speaker notes with
+lxml, without python-pptx, layouts, masters, themes or font and color resolution. Only
+presentation.xml, the slides, their notes and relationship parts are read; media blobs
+never are.
+"""
+
+import json
+import os
+import zipfile
+from html import escape
+from lxml import etree
+from .slicing import P_NS, RT_OFFICE_DOCUMENT, RT_SLIDE, R_NS, _read_rels, parse_slide_ranges
+from .html_generators import HTMLWriter
+from .watchdog import checkpoint
+
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+RT_NOTES_SLIDE = R_NS + '/notesSlide'
+TITLE_TYPES = ('title', 'ctrTitle')
+
+_P = '{%s}' % P_NS
+_A = '{%s}' % A_NS
+_SP = _P + 'sp'
+_TBL = _A + 'tbl'
+_PH = _P + 'nvSpPr/' + _P + 'nvPr/' + _P + 'ph'
+
+
+def _paragraphs(tx_body):
+    """[{"text", "level"}] of a text body's non-empty paragraphs; line breaks become newlines."""
+    paragraphs = []
+    for p in tx_body.iter(_A + 'p'):
+        text = ''.join((el.text or '') if el.tag == _A + 't' else '\n' for el in p.iter(_A + 't', _A + 'br'))
+        if text.strip():
+            ppr = p.find(_A + 'pPr')
+            level = int(ppr.get('lvl', 0)) if ppr is not None else 0
+            paragraphs.append({"text": text, "level": level})
+    return paragraphs
+
+
+def _table(tbl):
+    """Rows of a table as [{"text", "colspan", "rowspan"}]; cells covered by a merge are left out."""
+    rows = []
+    for tr in tbl.iter(_A + 'tr'):
+        cells = []
+        for tc in tr.iterfind(_A + 'tc'):
+            if tc.get('hMerge') in ('1', 'true') or tc.get('vMerge') in ('1', 'true'):
+                continue
+            tx_body = tc.find(_A + 'txBody')
+            text = '\n'.join(p["text"] for p in _paragraphs(tx_body)) if tx_body is not None else ''
+            cells.append({"text": text, "colspan": int(tc.get('gridSpan', 1)), "rowspan": int(tc.get('rowSpan', 1))})
+        rows.append(cells)
+    return rows
+
+
+def _slide_outline(root, number):
+    """Title and text/table blocks of a slide, in z-order (group children included)."""
+    title = None
+    blocks = []
+    for el in root.iter(_SP, _TBL):
+        checkpoint()
+        if el.tag == _TBL:
+            blocks.append({"type": "table", "rows": _table(el)})
+            continue
+        tx_body = el.find(_P + 'txBody')
+        if tx_body is None:
+            continue
+        paragraphs = _paragraphs(tx_body)
+        if not paragraphs:
+            continue
+        ph = el.find(_PH)
+        if title is None and ph is not None and ph.get('type') in TITLE_TYPES:
+            title = ' '.join(p["text"].replace('\n', ' ').strip() for p in paragraphs)
+            continue
+        blocks.append({"type": "text", "paragraphs": paragraphs})
+    return {"number": number, "title": title, "blocks": blocks, "notes": None}
+
+
+def _notes_text(root):
+    for sp in root.iter(_SP):
+        ph = sp.find(_PH)
+        tx_body = sp.find(_P + 'txBody')
+        if ph is not None and ph.get('type') == 'body' and tx_body is not None:
+            return '\n'.join(p["text"] for p in _paragraphs(tx_body)) or None
+    return None
+
+
+def read_outline(pptx_path, name=None, slides=None, notes=True):
+    """
+    Read the text structure of a PPTX file.
+
+    Args:
+        pptx_path: Path to the PPTX file
+        name: Deck name (default: the file name without extension)
+        slides: Only these slides, as 1-based numbers or a range string like "3-7,12"
+        notes: Whether to read speaker notes
+
+    Returns:
+        {"name", "slides_count", "slides": [{"number", "title", "blocks", "notes"}]} where a
+        block is {"type": "text", "paragraphs": [{"text", "level"}]} or {"type": "table", "rows"}
+    """
+    if name is None:
+        name = os.path.splitext(os.path.basename(pptx_path))[0]
+    outline = {"name": name, "slides_count": 0, "slides": []}
+    parser = etree.XMLParser(resolve_entities=False, huge_tree=True)
+    with zipfile.ZipFile(pptx_path) as zf:
+        names = set(zf.namelist())
+        _, root_targets = _read_rels(zf, names, '')
+        presentation = next(target for rel, target in root_targets if rel.get('Type') == RT_OFFICE_DOCUMENT)
+        _, pres_targets = _read_rels(zf, names, presentation)
+        rid_target = {rel.get('Id'): target for rel, target in pres_targets if rel.get('Type') == RT_SLIDE}
+        pres_xml = etree.fromstring(zf.read(presentation), parser)
+        sld_ids = pres_xml.findall(_P + 'sldIdLst/' + _P + 'sldId')
+        outline["slides_count"] = len(sld_ids)
+        wanted = set(parse_slide_ranges(slides, len(sld_ids))) if slides is not None else None
+        for number, sld_id in enumerate(sld_ids, 1):
+            if wanted is not None and number not in wanted:
+                continue
+            checkpoint('extract', number)
+            partname = rid_target.get(sld_id.get('{%s}id' % R_NS))
+            if partname not in names:
+                continue
+            slide = _slide_outline(etree.fromstring(zf.read(partname), parser), number)
+            if notes:
+                _, targets = _read_rels(zf, names, partname)
+                notes_part = next((t for rel, t in targets if rel.get('Type') == RT_NOTES_SLIDE and t in names), None)
+                if notes_part is not None:
+                    slide["notes"] = _notes_text(etree.fromstring(zf.read(notes_part), parser))
+            outline["slides"].append(slide)
+    return outline
+
+
+def render_outline_json(outline, indent=None):
+    """Render an outline as a JSON string."""
+    return json.dumps(outline, ensure_ascii=False, indent=indent)
+
+
+def _lines(text):
+    return escape(text).replace('\n', '<br>').replace('\x0b', '<br>')
+
+
+def render_outline_html(outline, sink, compact=False):
+    """Stream an outline into sink as one semantic html document: a section per slide with
+    its title as h2, paragraphs as p (outline levels 1+ as list items carrying data-level),
+    tables and an aside holding the notes."""
+    add = HTMLWriter(sink, compact).add
+    add('<!DOCTYPE html>')
+    add('<html lang="zh-CN">')
+    add('<head>', 1)
+    add('<meta charset="UTF-8">', 2)
+    add(f'<title>{escape(outline["name"])}</title>', 2)
+    add('</head>', 1)
+    add('<body>', 1)
+    add('<article>', 2)
+    add(f'<h1>{escape(outline["name"])}</h1>', 3)
+    for slide in outline["slides"]:
+        add(f'<section id="slide-{slide["number"]}" data-slide="{slide["number"]}">', 3)
+        if slide["title"]:
+            add(f'<h2>{_lines(slide["title"])}</h2>', 4)
+        for block in slide["blocks"]:
+            if block["type"] == "table":
+                add('<table>', 4)
+                for cells in block["rows"]:
+                    row = ''
+                    for cell in cells:
+                        attrs = ''
+                        if cell["colspan"] != 1:
+                            attrs += f' colspan="{cell["colspan"]}"'
+                        if cell["rowspan"] != 1:
+                            attrs += f' rowspan="{cell["rowspan"]}"'
+                        row += f'<td{attrs}>{_lines(cell["text"])}</td>'
+                    add(f'<tr>{row}</tr>', 5)
+                add('</table>', 4)
+                continue
+            in_list = False
+            for paragraph in block["paragraphs"]:
+                if paragraph["level"] and not in_list:
+                    add('<ul>', 4)
+                    in_list = True
+                elif not paragraph["level"] and in_list:
+                    add('</ul>', 4)
+                    in_list = False
+                if in_list:
+                    add(f'<li data-level="{paragraph["level"]}">{_lines(paragraph["text"])}</li>', 5)
+                else:
+                    add(f'<p>{_lines(paragraph["text"])}</p>', 4)
+            if in_list:
+                add('</ul>', 4)
+        if slide["notes"]:
+            add(f'<aside class="notes"><p>{_lines(slide["notes"])}</p></aside>', 4)
+        add('</section>', 3)
+    add('</article>', 2)
+    add('</body>', 1)
+    add('</html>')
+
+
+def outline_text(slide):
+    """All text of an outline slide (title, paragraphs, table cells), for search indexing."""
+    parts = [slide["title"] or '']
+    for block in slide["blocks"]:
+        if block["type"] == "table":
+            parts.extend(cell["text"] for cells in block["rows"] for cell in cells)
+        else:
+            parts.extend(paragraph["text"] for paragraph in block["paragraphs"])
+    return ' '.join(parts)
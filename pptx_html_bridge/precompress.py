@@ -0,0 +1,120 @@
+import gzip
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .sinks import OutputSink, LocalSink
+
+ENCODING_SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+# Text artifacts worth compressing; images, video and woff2 are already compressed
+COMPRESSIBLE_EXTS = ('.html', '.htm', '.css', '.js', '.json', '.svg', '.txt', '.xml')
+DEFAULT_MAX_RATIO = 0.9
+
+
+def parse_encodings(value):
+    """Parse 'gzip,br' (or a list) into a tuple of encodings, rejecting unknown ones."""
+    if not value:
+        return ()
+    if isinstance(value, str):
+        value = value.split(',')
+    encodings = []
+    for name in value:
+        name = name.strip().lower()
+        if name == 'brotli':
+            name = 'br'
+        if name not in ENCODING_SUFFIXES:
+            raise ValueError(f"Unsupported precompression encoding: {name} (use gzip, br)")
+        if name not in encodings:
+            encodings.append(name)
+    return tuple(encodings)
+
+
+def _compress(data, encoding):
+    if encoding == 'gzip':
+        # mtime=0 keeps the output identical across runs
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    import brotli
+    return brotli.compress(data, quality=11)
+
+
+class Precompressor:
+    """Write .gz/.br siblings of text artifacts on a background thread pool.
+
+    Files are submitted as soon as they are complete; a compressed variant is kept only
+    if it is at most max_ratio of the original size, otherwise any stale sibling is removed.
+    Variants are written to sink (an OutputSink, by default the local filesystem)."""
+
+    def __init__(self, encodings, max_ratio=DEFAULT_MAX_RATIO, workers=None, sink=None):
+        self.encodings = parse_encodings(encodings)
+        if 'br' in self.encodings:
+            try:
+                import brotli  # noqa: F401
+            except ImportError:
+                raise ImportError("Brotli precompression requires brotli: pip install brotli")
+        self.max_ratio = max_ratio
+        self.sink = sink if sink is not None else LocalSink()
+        self._pool = ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1))
+        self._futures = []
+        self._lock = threading.Lock()
+        self.written = []
+
+    def submit(self, path, data=None):
+        """Queue a finished file for compression; non-text files are ignored.
+        Without data the file is read back from the sink."""
+        if not self.encodings or not path.lower().endswith(COMPRESSIBLE_EXTS):
+            return
+        self._futures.append(self._pool.submit(self._compress_file, path, data))
+
+    def _compress_file(self, path, data):
+        if data is None:
+            data = self.sink.read(path) or b''
+        for encoding in self.encodings:
+            target = path + ENCODING_SUFFIXES[encoding]
+            compressed = _compress(data, encoding)
+            if data and len(compressed) <= len(data) * self.max_ratio:
+                self.sink.write(target, compressed)
+                with self._lock:
+                    self.written.append(target)
+            elif self.sink.exists(target):
+                self.sink.remove(target)
+
+    def close(self):
+        """Wait for queued files, re-raise the first failure and return the written paths."""
+        self._pool.shutdown(wait=True)
+        for future in self._futures:
+            future.result()
+        self._futures = []
+        return sorted(self.written)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class PrecompressingSink(OutputSink):
+    """Pass writes through to the precompressor's sink and queue each one for compression."""
+
+    def __init__(self, precompressor):
+        self.precompressor = precompressor
+        self.sink = precompressor.sink
+
+    def write(self, path, data):
+        self.sink.write(path, data)
+        self.precompressor.submit(path, data)
+
+    def exists(self, path):
+        return self.sink.exists(path)
+
+    def read(self, path):
+        return self.sink.read(path)
+
+    def remove(self, path):
+        self.sink.remove(path)
+
+    def makedirs(self, path):
+        self.sink.makedirs(path)
+
+    def flush(self):
+        self.sink.flush()
@@ -0,0 +1,141 @@
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from .extract import DeckExtractor
+
+DEFAULT_PRESENTATION_CACHE_ENTRIES = 8
+DEFAULT_PRESENTATION_CACHE_BYTES = 1024 ** 3
+# Parsed XML takes several times its serialized size in memory
+XML_OVERHEAD = 8
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def presentation_key(pptx_path):
+    """Cache key of a file: its absolute path, modification time and size."""
+    st = os.stat(pptx_path)
+    return os.path.abspath(pptx_path), st.st_mtime_ns, st.st_size
+
+
+def estimate_bytes(pptx_path):
+    """Rough memory held by an opened presentation: media at their own size, XML parts
+    at XML_OVERHEAD times their uncompressed size."""
+    total = 0
+    with zipfile.ZipFile(pptx_path) as zf:
+        for info in zf.infolist():
+            xml = info.filename.endswith(('.xml', '.rels'))
+            total += info.file_size * XML_OVERHEAD if xml else info.file_size
+    return total
+
+
+class CachedPresentation:
+    """A presentation checked out of a PresentationCache: extractor is a DeckExtractor of
+    the opened package, holding its resolved theme fonts, layout layers and placeholder defaults."""
+
+    def __init__(self, key, extractor, nbytes):
+        self.key = key
+        self.extractor = extractor
+        self.nbytes = nbytes
+
+    @property
+    def prs(self):
+        return self.extractor.prs
+
+
+class PresentationCache:
+    """In-process cache of opened presentations, for services converting the same file repeatedly.
+
+    checkout() returns the cached presentation of an unchanged file, so python-pptx does
+    not parse the package again and layouts resolved by earlier conversions are reused.
+    An entry is used by one conversion at a time: it leaves the cache on checkout (a
+    concurrent request for the same file opens its own copy) and comes back with checkin().
+    Entries beyond max_entries or max_bytes are dropped least recently used first."""
+
+    def __init__(self, max_entries=DEFAULT_PRESENTATION_CACHE_ENTRIES, max_bytes=DEFAULT_PRESENTATION_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def shared(cls, max_entries=None, max_bytes=None):
+        """Return the process-wide cache, updating its limits when given."""
+        global _shared
+        with _shared_lock:
+            if _shared is None:
+                _shared = cls()
+            cache = _shared
+        with cache._lock:
+            if max_entries is not None:
+                cache.max_entries = max_entries
+            if max_bytes is not None:
+                cache.max_bytes = max_bytes
+            cache._evict()
+        return cache
+
+    def __len__(self):
+        return len(self._entries)
+
+    def checkout(self, pptx_path, name=None, templates=None):
+        """Return a CachedPresentation of the whole file, opening it on a miss.
+        Its extractor starts a new DeckIR called name (default: the file name)."""
+        from pptx import Presentation
+        if name is None:
+            name = os.path.splitext(os.path.basename(pptx_path))[0]
+        key = presentation_key(pptx_path)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.nbytes
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is None:
+            extractor = DeckExtractor(Presentation(pptx_path), name, source=pptx_path, templates=templates)
+            return CachedPresentation(key, extractor, estimate_bytes(pptx_path))
+        if entry.extractor.templates is not templates:
+            # layer keys differ with and without a template cache; only the parsed package carries over
+            entry.extractor = DeckExtractor(entry.prs, name, source=pptx_path, templates=templates)
+        else:
+            entry.extractor.renew(name, pptx_path)
+        return entry
+
+    def checkin(self, entry):
+        """Return a checked out presentation once its conversion is done. Entries of an
+        older version of the file are dropped; one larger than max_bytes is not kept."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == entry.key[0] and key != entry.key]:
+                self._bytes -= self._entries.pop(key).nbytes
+            old = self._entries.pop(entry.key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            if entry.nbytes > self.max_bytes:
+                self.evictions += 1
+                return
+            self._entries[entry.key] = entry
+            self._bytes += entry.nbytes
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit, miss and eviction counts and the entries and estimated bytes held."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entries), "bytes": self._bytes}
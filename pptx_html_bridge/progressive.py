@@ -0,0 +1,57 @@
+import io
+import os
+import time
+from .extract import DeckExtractor, open_presentation
+from .html_generators import generate_slide_html, slide_nav, layer_svg_name
+
+
+def slide_media(deck, slide_ir, written, svg_shapes=False):
+    """Media files (relative to the output directory) a rendered slide references: the
+    MediaRefs generate_slide_html logged in written (culled elements are never logged),
+    and with svg_shapes the layout's shared svg."""
+    files = list(dict.fromkeys(f"media/{ref.filename}" for ref in written))
+    layer = deck.layers.get(slide_ir.layer)
+    if svg_shapes and layer is not None and layer.shapes:
+        files.append(f"media/{layer_svg_name(layer)}")
+    return files
+
+
+def render_slide_result(deck, slide_ir, slides_dir, compact, cull, started=None, svg_shapes=False):
+    """Render a SlideIR into slides_dir and describe it as an iter_convert slide event."""
+    started = time.perf_counter() if started is None else started
+    buf = io.StringIO()
+    written = []
+    culled = generate_slide_html(deck, slide_ir, slide_nav(slide_ir.number, deck.num_slides), slides_dir, compact,
+                                 sink=buf, cull=cull, svg_shapes=svg_shapes, media_log=written)
+    html = buf.getvalue()
+    path = os.path.join(slides_dir, f"slide{slide_ir.number}.html")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(html)
+    return {
+        "type": "slide",
+        "number": slide_ir.number,
+        "path": path,
+        "html": html,
+        "media": slide_media(deck, slide_ir, written, svg_shapes),
+        "culled_shapes": culled,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def iter_slide_results(pptx_path, numbers, slides_dir, compact, cull, templates=None, svg_shapes=False):
+    """Extract and render the given slides one at a time, yielding their events.
+    Only the parts these slides use are read."""
+    started = time.perf_counter()
+    prs, kept, total = open_presentation(pptx_path, numbers)
+    name = os.path.splitext(os.path.basename(pptx_path))[0]
+    extractor = DeckExtractor(prs, name, source=pptx_path, templates=templates)
+    extractor.deck.num_slides = total
+    for number, slide in zip(kept, prs.slides):
+        slide_ir = extractor.extract_slide(number, slide)
+        yield render_slide_result(extractor.deck, slide_ir, slides_dir, compact, cull, started, svg_shapes)
+        started = time.perf_counter()
+
+
+def render_slide_chunk(pptx_path, numbers, slides_dir, compact, cull, svg_shapes=False):
+    """Process-pool entry point: render a chunk of slides and return their events."""
+    return list(iter_slide_results(pptx_path, numbers, slides_dir, compact, cull, svg_shapes=svg_shapes))
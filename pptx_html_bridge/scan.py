@@ -0,0 +1,186 @@
+import os
+import re
+import zipfile
+import zlib
+from lxml import etree
+
+P_NS = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+PR_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+RT_OFFICE_DOCUMENT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+
+DEFAULT_LIMITS = {
+    "max_uncompressed_size": 2 * 1024 ** 3,  # bytes
+    "max_ratio": 100.0,  # uncompressed / compressed, per part
+    "max_parts": 10000,
+}
+# presentation.xml and the package rels are read only below this size
+MAX_XML_READ = 16 * 1024 ** 2
+
+# Cost model fitted to conversions of the sample decks (1 to 400 slides, up to 0.7 MB of XML):
+# a fixed cost, a per-slide cost for shape traversal, XML parsing, and copying media out.
+BASE_SECONDS = 0.02
+SECONDS_PER_SLIDE = 0.0063
+SECONDS_PER_XML_MB = 0.15
+SECONDS_PER_MEDIA_MB = 1 / 300
+# python-pptx keeps every part in memory; parsed XML takes several times its size
+BASE_MEMORY_MB = 40
+XML_MEMORY_FACTOR = 8
+
+_SLIDE_RE = re.compile(r'^ppt/slides/slide\d+\.xml$')
+_LAYOUT_RE = re.compile(r'^ppt/slideLayouts/slideLayout\d+\.xml$')
+_MASTER_RE = re.compile(r'^ppt/slideMasters/slideMaster\d+\.xml$')
+_MEDIA_PREFIXES = ('ppt/media/', 'ppt/embeddings/')
+VIDEO_EXTS = ('.mp4', '.m4v', '.mov', '.avi', '.wmv', '.mpg', '.mpeg', '.webm')
+
+
+class PPTXLimitError(ValueError):
+    """Raised by scan(strict=True) when a file exceeds a configured limit."""
+
+    def __init__(self, path, violations):
+        self.path = path
+        self.violations = violations
+        super().__init__(f"{path}: " + "; ".join(violations))
+
+
+def _read_small(zf, name, violations):
+    """Bytes of a part, or None (recorded in violations) when it is larger than MAX_XML_READ."""
+    info = zf.getinfo(name)
+    if info.file_size > MAX_XML_READ:
+        violations.append(f"{name} is {info.file_size} bytes (limit {MAX_XML_READ})")
+        return None
+    return zf.read(name)
+
+
+def _presentation_name(zf, names, violations):
+    """Locate presentation.xml through the package relationships, falling back to the usual name."""
+    if '_rels/.rels' in names:
+        try:
+            data = _read_small(zf, '_rels/.rels', violations)
+            if data is not None:
+                root = etree.fromstring(data)
+                for rel in root.iter('{%s}Relationship' % PR_NS):
+                    if rel.get('Type') == RT_OFFICE_DOCUMENT:
+                        return rel.get('Target').lstrip('/')
+        except (etree.XMLSyntaxError, zipfile.BadZipFile, zlib.error):
+            pass
+    return 'ppt/presentation.xml'
+
+
+def scan(pptx_path, max_uncompressed_size=None, max_ratio=None, max_parts=None, strict=False):
+    """
+    Inspect a PPTX file cheaply, before converting it.
+
+    Only the zip central directory and presentation.xml are read; no part is decompressed
+    otherwise. Limits default to DEFAULT_LIMITS; exceeded ones, an oversized or malformed
+    presentation.xml or package rels and a missing presentation.xml are listed in
+    "violations", and with strict they raise PPTXLimitError instead.
+
+    Returns a dict with slide/layout/master counts, part and media sizes, compression
+    ratios, and the predicted conversion time (seconds) and peak memory (MB).
+    """
+    limits = dict(DEFAULT_LIMITS)
+    for key, value in (("max_uncompressed_size", max_uncompressed_size), ("max_ratio", max_ratio),
+                       ("max_parts", max_parts)):
+        if value is not None:
+            limits[key] = value
+
+    try:
+        zf = zipfile.ZipFile(pptx_path)
+    except zipfile.BadZipFile as e:
+        raise PPTXLimitError(pptx_path, [f"not a zip package: {e}"])
+    with zf:
+        infos = zf.infolist()
+        names = {info.filename for info in infos}
+        uncompressed = sum(info.file_size for info in infos)
+        compressed = sum(info.compress_size for info in infos)
+        xml_size = 0
+        media_size = 0
+        media_count = 0
+        video_size = 0
+        largest_media = None
+        max_part_ratio = 0.0
+        worst_part = None
+        slide_parts = layout_parts = master_parts = 0
+        for info in infos:
+            name = info.filename
+            ratio = info.file_size / info.compress_size if info.compress_size else (1.0 if not info.file_size else float('inf'))
+            if ratio > max_part_ratio:
+                max_part_ratio, worst_part = ratio, name
+            if name.endswith(('.xml', '.rels')):
+                xml_size += info.file_size
+            if name.startswith(_MEDIA_PREFIXES):
+                media_count += 1
+                media_size += info.file_size
+                if largest_media is None or info.file_size > largest_media["size"]:
+                    largest_media = {"name": name, "size": info.file_size}
+                if name.lower().endswith(VIDEO_EXTS):
+                    video_size += info.file_size
+            if _SLIDE_RE.match(name):
+                slide_parts += 1
+            elif _LAYOUT_RE.match(name):
+                layout_parts += 1
+            elif _MASTER_RE.match(name):
+                master_parts += 1
+
+        violations = []
+        if len(infos) > limits["max_parts"]:
+            violations.append(f"{len(infos)} parts (limit {limits['max_parts']})")
+        if uncompressed > limits["max_uncompressed_size"]:
+            violations.append(f"{uncompressed} bytes uncompressed (limit {limits['max_uncompressed_size']})")
+        if max_part_ratio > limits["max_ratio"]:
+            violations.append(f"{worst_part} compression ratio {max_part_ratio:.0f} (limit {limits['max_ratio']:g})")
+
+        slides = slide_parts
+        masters = master_parts
+        width = height = None
+        presentation = _presentation_name(zf, names, violations)
+        root = None
+        if presentation not in names:
+            violations.append(f"missing {presentation}")
+        elif not violations:
+            # presentation.xml is only parsed once the package passed the size checks
+            try:
+                data = _read_small(zf, presentation, violations)
+                root = etree.fromstring(data) if data is not None else None
+            except (etree.XMLSyntaxError, zipfile.BadZipFile, zlib.error) as e:
+                violations.append(f"{presentation} is unreadable: {e}")
+        if root is not None:
+            sld_id_lst = root.find('{%s}sldIdLst' % P_NS)
+            slides = len(sld_id_lst) if sld_id_lst is not None else 0
+            master_lst = root.find('{%s}sldMasterIdLst' % P_NS)
+            masters = len(master_lst) if master_lst is not None else master_parts
+            sld_sz = root.find('{%s}sldSz' % P_NS)
+            if sld_sz is not None:
+                width, height = int(sld_sz.get('cx', 0)), int(sld_sz.get('cy', 0))
+
+    mb = 1024 ** 2
+    predicted_seconds = (BASE_SECONDS + SECONDS_PER_SLIDE * slides + SECONDS_PER_XML_MB * xml_size / mb
+                         + SECONDS_PER_MEDIA_MB * media_size / mb)
+    predicted_memory_mb = BASE_MEMORY_MB + (XML_MEMORY_FACTOR * xml_size + (uncompressed - xml_size)) / mb
+    result = {
+        "path": pptx_path,
+        "file_size": os.path.getsize(pptx_path),
+        "slides": slides,
+        "layouts": layout_parts,
+        "masters": masters,
+        "slide_width": width,
+        "slide_height": height,
+        "parts": len(infos),
+        "uncompressed_size": uncompressed,
+        "compressed_size": compressed,
+        "compression_ratio": uncompressed / compressed if compressed else 1.0,
+        "max_part_ratio": max_part_ratio,
+        "xml_size": xml_size,
+        "media_count": media_count,
+        "media_size": media_size,
+        "video_size": video_size,
+        "largest_media": largest_media,
+        "predicted_seconds": round(predicted_seconds, 3),
+        "predicted_memory_mb": round(predicted_memory_mb, 1),
+        "limits": limits,
+        "violations": violations,
+        "ok": not violations,
+    }
+    if strict and violations:
+        raise PPTXLimitError(pptx_path, violations)
+    return result
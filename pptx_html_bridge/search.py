@@ -0,0 +1,172 @@
+import json
+import os
+import re
+
+SEARCH_INDEX_VERSION = 2
+
+# Han, kana and hangul are written without spaces and are indexed as characters and character bigrams
+CJK_RANGES = '぀-ヿ㐀-䶿一-鿿豈-﫿가-힯'
+TOKEN_RE = re.compile(f'([{CJK_RANGES}]+)|([^\\W_{CJK_RANGES}]+)')
+
+
+def tokenize(text):
+    """Split text into index terms: lower-cased words, and the characters and bigrams of CJK runs
+    (so one-character and odd-length queries match too)."""
+    terms = []
+    for cjk, word in TOKEN_RE.findall(text.lower()):
+        if word:
+            terms.append(word)
+        else:
+            terms.extend(cjk)
+            terms.extend(cjk[k:k + 2] for k in range(len(cjk) - 1))
+    return terms
+
+
+class SearchIndexBuilder:
+    """Inverted index from terms to (deck, slide) postings, built while slides are rendered."""
+
+    def __init__(self):
+        self.decks = []
+        self.postings = {}
+
+    def add_deck(self, name, index_href, slide_href):
+        """Register a deck and return its id; slide_href is a pattern containing {n}."""
+        self.decks.append({"name": name, "index": index_href, "slide": slide_href})
+        return len(self.decks) - 1
+
+    def add(self, deck_id, slide_no, text):
+        for term in set(tokenize(text)):
+            decks = self.postings.get(term)
+            if decks is None:
+                decks = self.postings[term] = {}
+            slides = decks.get(deck_id)
+            if slides is None:
+                decks[deck_id] = [slide_no]
+            elif slides[-1] != slide_no:
+                slides.append(slide_no)
+
+    def add_slide(self, deck_id, slide_ir):
+        """Index the text of a SlideIR's shapes."""
+        self.add(deck_id, slide_ir.number, ' '.join(shape.text for shape in slide_ir.shapes))
+
+    def merge(self, other):
+        """Append another index's decks and postings, renumbering its deck ids."""
+        offset = len(self.decks)
+        self.decks.extend(other.decks)
+        for term, decks in other.postings.items():
+            mine = self.postings.setdefault(term, {})
+            for deck_id, slides in decks.items():
+                mine[deck_id + offset] = list(slides)
+
+    def to_dict(self):
+        # Postings are stored as [deck, slide, slide, ...] groups with delta-coded slide numbers
+        terms = {}
+        for term in sorted(self.postings):
+            groups = []
+            for deck_id, slides in sorted(self.postings[term].items()):
+                prev = 0
+                group = [deck_id]
+                for slide_no in sorted(slides):
+                    group.append(slide_no - prev)
+                    prev = slide_no
+                groups.append(group)
+            terms[term] = groups
+        return {"v": SEARCH_INDEX_VERSION, "decks": self.decks, "terms": terms}
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("v") != SEARCH_INDEX_VERSION:
+            raise ValueError(f"Unsupported search index version: {data.get('v')}")
+        index = cls()
+        index.decks = list(data["decks"])
+        for term, groups in data["terms"].items():
+            decks = index.postings[term] = {}
+            for group in groups:
+                slides = []
+                prev = 0
+                for delta in group[1:]:
+                    prev += delta
+                    slides.append(prev)
+                decks[group[0]] = slides
+        return index
+
+    def write(self, path, output=None):
+        """Write the index as JSON to path, through output (an OutputSink) if given."""
+        if output is not None:
+            output.write(path, json.dumps(self.to_dict(), ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+            return
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path, output=None):
+        """Load an index written by write(), through output (an OutputSink) if given."""
+        if output is not None:
+            return cls.from_dict(json.loads(output.read(path).decode('utf-8')))
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+SEARCH_JS = r"""(function (root) {
+  var CJK = '぀-ヿ㐀-䶿一-鿿豈-﫿가-힯';
+  var TOKEN = new RegExp('([' + CJK + ']+)|([^\\s\\p{P}\\p{S}_' + CJK + ']+)', 'gu');
+
+  function tokenize(text) {
+    var terms = [], m;
+    text = text.toLowerCase();
+    TOKEN.lastIndex = 0;
+    while ((m = TOKEN.exec(text)) !== null) {
+      if (m[2]) { terms.push(m[2]); continue; }
+      var run = Array.from(m[1]);
+      for (var k = 0; k < run.length; k++) {
+        terms.push(run[k]);
+        if (k + 1 < run.length) { terms.push(run[k] + run[k + 1]); }
+      }
+    }
+    return terms;
+  }
+
+  function postings(index, term) {
+    var hits = {}, groups = index.terms[term] || [];
+    groups.forEach(function (group) {
+      var slide = 0;
+      for (var k = 1; k < group.length; k++) {
+        slide += group[k];
+        hits[group[0] + ':' + slide] = true;
+      }
+    });
+    return hits;
+  }
+
+  function search(index, query) {
+    var terms = tokenize(query);
+    if (!terms.length) { return []; }
+    var hits = postings(index, terms[0]);
+    for (var t = 1; t < terms.length; t++) {
+      var next = postings(index, terms[t]);
+      Object.keys(hits).forEach(function (key) { if (!next[key]) { delete hits[key]; } });
+    }
+    return Object.keys(hits).map(function (key) {
+      var parts = key.split(':'), deck = index.decks[+parts[0]], slide = +parts[1];
+      return { deck: deck.name, slide: slide, href: deck.slide.replace('{n}', slide) };
+    }).sort(function (a, b) { return a.deck < b.deck ? -1 : a.deck > b.deck ? 1 : a.slide - b.slide; });
+  }
+
+  function load(url) {
+    return fetch(url).then(function (r) { return r.json(); });
+  }
+
+  root.PPTXSearch = { tokenize: tokenize, search: search, load: load };
+})(this);
+"""
+
+
+def write_search_js(html_dir, output=None):
+    """Write the client-side lookup script next to the search index, through output (an OutputSink) if given."""
+    path = os.path.join(html_dir, "search.js")
+    if output is not None:
+        output.write(path, SEARCH_JS.encode('utf-8'))
+        return path
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(SEARCH_JS)
+    return path
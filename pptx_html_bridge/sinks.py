@@ -0,0 +1,458 @@
+"""
+Output sinks: where converted files are written.
+
+Files are addressed by the paths the converter builds today (e.g. out/deck/slides/slide1.html)
+and written whole with write() or streamed through open(), so a sink can store them on local
+disk, in memory or as objects in an S3-compatible store. WriteBehindSink moves the writes of
+any sink onto a thread pool.
+"""
+
+import io
+import mimetypes
+import os
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Objects at least this large are uploaded in parts
+DEFAULT_MULTIPART_THRESHOLD = 16 * 1024 ** 2
+DEFAULT_PART_SIZE = 8 * 1024 ** 2
+# S3 rejects parts smaller than 5 MB (except the last one)
+MIN_PART_SIZE = 5 * 1024 ** 2
+DEFAULT_WRITE_WORKERS = 8
+
+
+class _BufferedFile(io.BytesIO):
+    """File object of the default OutputSink.open(): collects the data and stores it with
+    the sink's write() on close."""
+
+    def __init__(self, sink, path):
+        super().__init__()
+        self._sink = sink
+        self._path = path
+
+    def close(self):
+        if not self.closed and self._sink is not None:
+            sink, self._sink = self._sink, None
+            # getvalue() shares the buffer instead of copying it
+            sink.write(self._path, self.getvalue())
+        super().close()
+
+    def discard(self):
+        """Close without storing anything."""
+        self._sink = None
+        super().close()
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+        return False
+
+
+class OutputSink:
+    """Interface of an output destination; files are written whole with write() or
+    streamed through open()."""
+
+    def write(self, path, data):
+        """Store data (bytes) under path."""
+        raise NotImplementedError
+
+    def open(self, path):
+        """Return a binary file object for writing path, stored when it is closed; leaving its
+        with block on an exception (or calling discard()) stores nothing. By default the data
+        is collected in memory and stored with write(); sinks that can take a stream override this."""
+        return _BufferedFile(self, path)
+
+    def exists(self, path):
+        """Whether path was written (or already existed)."""
+        return False
+
+    def read(self, path):
+        """Return the bytes stored under path, or None."""
+        return None
+
+    def remove(self, path):
+        """Delete path if it exists."""
+
+    def makedirs(self, path):
+        """Create a directory where the destination has them; a no-op elsewhere."""
+
+    def flush(self):
+        """Wait until every write so far is stored."""
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class _AtomicFile(io.BufferedWriter):
+    """File object of LocalSink.open(): writes a temporary file next to path and renames it
+    over path on close."""
+
+    def __init__(self, path):
+        self._path = path
+        self._tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self._discarded = False
+        super().__init__(io.FileIO(self._tmp_path, 'wb'))
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            super().close()
+            if not self._discarded:
+                os.replace(self._tmp_path, self._path)
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+    def discard(self):
+        """Close and delete the temporary file."""
+        self._discarded = True
+        self.close()
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+        return False
+
+
+class LocalSink(OutputSink):
+    """Write files to the local filesystem.
+
+    With atomic, data goes to a temporary file in the same directory which is then renamed
+    over the target, so readers never see a half-written file."""
+
+    def __init__(self, atomic=True):
+        self.atomic = atomic
+
+    def open(self, path):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        return _AtomicFile(path) if self.atomic else open(path, 'wb')
+
+    def write(self, path, data):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        if not self.atomic:
+            with open(path, 'wb') as f:
+                f.write(data)
+            return
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def remove(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    def makedirs(self, path):
+        os.makedirs(path, exist_ok=True)
+
+
+def _normalize(path):
+    return posixpath.normpath(path.replace(os.sep, '/')).lstrip('/')
+
+
+class MemorySink(OutputSink):
+    """Keep files in a dict of normalized path -> bytes, for tests and in-process serving."""
+
+    def __init__(self):
+        self.files = {}
+        self._lock = threading.Lock()
+
+    def write(self, path, data):
+        with self._lock:
+            self.files[_normalize(path)] = bytes(data)
+
+    def exists(self, path):
+        return _normalize(path) in self.files
+
+    def read(self, path):
+        return self.files.get(_normalize(path))
+
+    def remove(self, path):
+        with self._lock:
+            self.files.pop(_normalize(path), None)
+
+
+class _S3Upload(io.BufferedIOBase):
+    """File object of S3Sink.open(): small files are stored with one put_object; once
+    multipart_threshold bytes have been written the data is uploaded part by part as it
+    comes, so at most about one part is held in memory."""
+
+    def __init__(self, sink, path):
+        super().__init__()
+        self._sink = sink
+        self._path = path
+        self._key = sink.key(path)
+        self._content_type = mimetypes.guess_type(self._key)[0] or 'application/octet-stream'
+        self._buf = bytearray()
+        self._upload_id = None
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError("write to closed file")
+        self._buf += data
+        sink = self._sink
+        if self._upload_id is None and len(self._buf) >= sink.multipart_threshold:
+            self._upload_id = sink.client.create_multipart_upload(Bucket=sink.bucket, Key=self._key,
+                                                                  ContentType=self._content_type)['UploadId']
+        if self._upload_id is not None:
+            try:
+                while len(self._buf) >= sink.part_size:
+                    self._upload_part(bytes(self._buf[:sink.part_size]))
+                    del self._buf[:sink.part_size]
+            except BaseException:
+                self.discard()
+                raise
+        return len(data)
+
+    def _upload_part(self, body):
+        sink = self._sink
+        number = len(self._parts) + 1
+        response = sink.client.upload_part(Bucket=sink.bucket, Key=self._key, UploadId=self._upload_id,
+                                           PartNumber=number, Body=body)
+        self._parts.append({'PartNumber': number, 'ETag': response['ETag']})
+
+    def close(self):
+        if self.closed:
+            return
+        sink = self._sink
+        try:
+            if self._upload_id is None:
+                sink.client.put_object(Bucket=sink.bucket, Key=self._key, Body=bytes(self._buf),
+                                       ContentType=self._content_type)
+            else:
+                try:
+                    if self._buf or not self._parts:
+                        self._upload_part(bytes(self._buf))
+                    sink.client.complete_multipart_upload(Bucket=sink.bucket, Key=self._key, UploadId=self._upload_id,
+                                                          MultipartUpload={'Parts': self._parts})
+                except BaseException:
+                    # an abandoned upload keeps its parts (and their cost) until aborted
+                    sink.client.abort_multipart_upload(Bucket=sink.bucket, Key=self._key, UploadId=self._upload_id)
+                    raise
+            with sink._lock:
+                sink._written.add(self._key)
+        finally:
+            self._buf = bytearray()
+            super().close()
+
+    def discard(self):
+        """Close without storing anything, aborting a started multipart upload."""
+        if self.closed:
+            return
+        if self._upload_id is not None:
+            self._sink.client.abort_multipart_upload(Bucket=self._sink.bucket, Key=self._key, UploadId=self._upload_id)
+        self._buf = bytearray()
+        super().close()
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+        return False
+
+
+class S3Sink(OutputSink):
+    """Upload files as objects of an S3-compatible bucket, keyed by prefix + normalized path.
+
+    client is any object with the boto3 S3 client methods used here (put_object, get_object,
+    head_object, delete_object and the multipart calls), so a local stand-in works too;
+    by default a boto3 client is created for endpoint_url (e.g. a MinIO server). Files of at
+    least multipart_threshold bytes are uploaded in parts of part_size bytes."""
+
+    def __init__(self, bucket, prefix='', client=None, endpoint_url=None,
+                 multipart_threshold=DEFAULT_MULTIPART_THRESHOLD, part_size=DEFAULT_PART_SIZE):
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise ImportError("S3 output requires boto3: pip install boto3")
+            client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.multipart_threshold = multipart_threshold
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self._written = set()
+        self._lock = threading.Lock()
+
+    def open(self, path):
+        return _S3Upload(self, path)
+
+    def key(self, path):
+        """Object key of a path."""
+        key = _normalize(path)
+        if key == '.':
+            key = ''
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def write(self, path, data):
+        key = self.key(path)
+        content_type = mimetypes.guess_type(key)[0] or 'application/octet-stream'
+        if len(data) >= self.multipart_threshold:
+            self._upload_parts(key, data, content_type)
+        else:
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type)
+        with self._lock:
+            self._written.add(key)
+
+    def _upload_parts(self, key, data, content_type):
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key,
+                                                        ContentType=content_type)['UploadId']
+        try:
+            parts = []
+            view = memoryview(data)
+            for number, start in enumerate(range(0, len(data), self.part_size), 1):
+                response = self.client.upload_part(Bucket=self.bucket, Key=key, UploadId=upload_id,
+                                                   PartNumber=number, Body=view[start:start + self.part_size].tobytes())
+                parts.append({'PartNumber': number, 'ETag': response['ETag']})
+            self.client.complete_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id,
+                                                  MultipartUpload={'Parts': parts})
+        except BaseException:
+            # an abandoned upload keeps its parts (and their cost) until aborted
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+    def exists(self, path):
+        key = self.key(path)
+        if key in self._written:
+            return True
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except Exception:
+            return False
+        return True
+
+    def read(self, path):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.key(path))['Body'].read()
+        except Exception:
+            return None
+
+    def remove(self, path):
+        key = self.key(path)
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+        with self._lock:
+            self._written.discard(key)
+
+
+class WriteBehindSink(OutputSink):
+    """Write through another sink on a thread pool, so rendering continues while earlier
+    files are still being written or uploaded.
+
+    At most max_pending files are queued; write() blocks beyond that, which bounds the
+    memory held by pending data. Files being written are visible to exists() and read().
+    flush() waits for the queue and re-raises the first failed write."""
+
+    def __init__(self, sink, workers=DEFAULT_WRITE_WORKERS, max_pending=None):
+        self.sink = sink
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='write-behind')
+        self._slots = threading.BoundedSemaphore(max_pending or workers * 4)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._error = None
+
+    def write(self, path, data):
+        self._slots.acquire()
+        with self._lock:
+            self._pending[path] = data
+        try:
+            self._pool.submit(self._write, path, data)
+        except BaseException:
+            self._done(path, data)
+            raise
+
+    def _write(self, path, data):
+        try:
+            self.sink.write(path, data)
+        except BaseException as e:
+            with self._lock:
+                if self._error is None:
+                    self._error = e
+        finally:
+            self._done(path, data)
+
+    def _done(self, path, data):
+        with self._lock:
+            # a later write of the same path stays pending
+            if self._pending.get(path) is data:
+                del self._pending[path]
+            self._idle.notify_all()
+        self._slots.release()
+
+    def exists(self, path):
+        return path in self._pending or self.sink.exists(path)
+
+    def read(self, path):
+        data = self._pending.get(path)
+        return data if data is not None else self.sink.read(path)
+
+    def remove(self, path):
+        self.flush()
+        self.sink.remove(path)
+
+    def makedirs(self, path):
+        self.sink.makedirs(path)
+
+    def flush(self):
+        with self._lock:
+            while self._pending:
+                self._idle.wait()
+            error, self._error = self._error, None
+        self.sink.flush()
+        if error is not None:
+            raise error
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._pool.shutdown(wait=True)
+            self.sink.close()
+
+
+def parse_output_url(output):
+    """Split an s3://bucket/prefix output location into (bucket, prefix); None for local paths."""
+    if not output or not output.startswith('s3://'):
+        return None
+    bucket, _, prefix = output[len('s3://'):].partition('/')
+    if not bucket:
+        raise ValueError(f"Invalid S3 output location: {output}")
+    return bucket, prefix.strip('/')
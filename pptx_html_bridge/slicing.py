@@ -0,0 +1,157 @@
+import io
+import posixpath
+import re
+import zipfile
+from lxml import etree
+
+P_NS = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PR_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+RT_OFFICE_DOCUMENT = R_NS + '/officeDocument'
+RT_SLIDE = R_NS + '/slide'
+
+
+def parse_slide_ranges(spec, num_slides=None):
+    """Parse '3-7,12' (or an iterable of numbers) into sorted unique 1-based slide numbers.
+    Open ranges ('5-') run to num_slides; numbers beyond num_slides are dropped, but a
+    selection none of whose slides exist raises ValueError, as does a reversed range ('4-2')."""
+    if spec is None:
+        return None
+    if isinstance(spec, int):
+        spec = [spec]
+    numbers = set()
+    # whether the spec named any slide at all, before numbers past the end are dropped
+    requested = False
+    if isinstance(spec, str):
+        for part in spec.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            m = re.fullmatch(r'(\d*)\s*-\s*(\d*)', part)
+            if m:
+                start = int(m.group(1)) if m.group(1) else 1
+                if m.group(2):
+                    end = int(m.group(2))
+                    if start > end:
+                        raise ValueError(f"Reversed slide range: {part}")
+                elif num_slides is not None:
+                    end = num_slides
+                else:
+                    raise ValueError(f"Open slide range needs the slide count: {part}")
+                if start < 1:
+                    raise ValueError("Slide numbers start at 1")
+                if num_slides is not None:
+                    # expand only the slides that exist; a range starting past the end adds none
+                    end = min(end, num_slides)
+                numbers.update(range(start, end + 1))
+            elif part.isdigit():
+                numbers.add(int(part))
+            else:
+                raise ValueError(f"Invalid slide range: {part}")
+            requested = True
+    else:
+        numbers.update(int(n) for n in spec)
+        requested = bool(numbers)
+    if any(n < 1 for n in numbers):
+        raise ValueError("Slide numbers start at 1")
+    if num_slides is not None:
+        numbers = {n for n in numbers if n <= num_slides}
+        if requested and not numbers:
+            raise ValueError(f"No slides selected: {spec} (the deck has {num_slides})")
+    return sorted(numbers)
+
+
+def slide_count(pptx_path):
+    """Number of slides of a PPTX file, read from presentation.xml alone."""
+    with zipfile.ZipFile(pptx_path) as zf:
+        names = set(zf.namelist())
+        _, root_targets = _read_rels(zf, names, '')
+        presentation = next(name for rel, name in root_targets if rel.get('Type') == RT_OFFICE_DOCUMENT)
+        sld_id_lst = etree.fromstring(zf.read(presentation)).find('{%s}sldIdLst' % P_NS)
+        return len(sld_id_lst) if sld_id_lst is not None else 0
+
+
+def _rels_name(partname):
+    directory, name = posixpath.split(partname)
+    return posixpath.join(directory, '_rels', name + '.rels')
+
+
+def _read_rels(zf, names, partname):
+    """Return (rels element or None, [(rel element, target partname)]) for internal relationships."""
+    rels_name = _rels_name(partname)
+    if rels_name not in names:
+        return None, []
+    root = etree.fromstring(zf.read(rels_name))
+    base = posixpath.dirname(partname)
+    targets = []
+    for rel in root.iter('{%s}Relationship' % PR_NS):
+        if rel.get('TargetMode') == 'External':
+            continue
+        target = rel.get('Target')
+        if target.startswith('/'):
+            target_name = target.lstrip('/')
+        else:
+            target_name = posixpath.normpath(posixpath.join(base, target))
+        targets.append((rel, target_name))
+    return root, targets
+
+
+def slice_package(pptx_path, slides):
+    """Build an in-memory PPTX holding only the given slides and the parts they reach.
+    slides is anything parse_slide_ranges accepts.
+
+    Other slides and everything only they use (media, charts, notes) are never read. Part
+    names are kept, so media references stay valid against the original file.
+    Returns (file object, total slide count, kept slide numbers in order)."""
+    with zipfile.ZipFile(pptx_path) as zf:
+        names = set(zf.namelist())
+        _, root_targets = _read_rels(zf, names, '')
+        presentation = next(name for rel, name in root_targets if rel.get('Type') == RT_OFFICE_DOCUMENT)
+        pres_rels, pres_targets = _read_rels(zf, names, presentation)
+        pres_xml = etree.fromstring(zf.read(presentation))
+        rid_target = {rel.get('Id'): name for rel, name in pres_targets}
+        sld_id_lst = pres_xml.find('{%s}sldIdLst' % P_NS)
+        sld_ids = list(sld_id_lst) if sld_id_lst is not None else []
+        total = len(sld_ids)
+        wanted = parse_slide_ranges(slides, total)
+        keep_slides = set()
+        for number, sld_id in enumerate(sld_ids, 1):
+            if number in wanted:
+                keep_slides.add(rid_target.get(sld_id.get('{%s}id' % R_NS)))
+            else:
+                sld_id_lst.remove(sld_id)
+        all_slides = {name for rel, name in pres_targets if rel.get('Type') == RT_SLIDE}
+        dropped_slides = all_slides - keep_slides
+
+        # Walk the relationship graph from the package root, never entering dropped slides
+        kept = set()
+        rewritten = {}
+        stack = ['']
+        while stack:
+            partname = stack.pop()
+            rels_root, targets = (pres_rels, pres_targets) if partname == presentation else _read_rels(zf, names, partname)
+            changed = False
+            for rel, target in targets:
+                if target in dropped_slides:
+                    rel.getparent().remove(rel)
+                    changed = True
+                elif target not in kept and target in names:
+                    kept.add(target)
+                    stack.append(target)
+            if rels_root is not None:
+                rels_name = _rels_name(partname)
+                kept.add(rels_name)
+                if changed:
+                    rewritten[rels_name] = etree.tostring(rels_root, xml_declaration=True, encoding='UTF-8', standalone=True)
+        rewritten[presentation] = etree.tostring(pres_xml, xml_declaration=True, encoding='UTF-8', standalone=True)
+        kept.add('[Content_Types].xml')
+
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w', zipfile.ZIP_STORED) as out:
+            for name in zf.namelist():
+                if name in rewritten:
+                    out.writestr(name, rewritten[name])
+                elif name in kept:
+                    out.writestr(name, zf.read(name))
+    buf.seek(0)
+    return buf, total, wanted
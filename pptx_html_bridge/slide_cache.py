@@ -0,0 +1,185 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from .ir import IR_VERSION, ir_to_data, ir_from_data
+
+DEFAULT_SLIDE_CACHE_SIZE = 512 * 1024 ** 2
+# Eviction trims the cache to this fraction of its cap, so it does not run on every write
+EVICT_TO = 0.8
+TITLE_MARK = '<title>\x00slide\x00</title>'
+NAV_MARK = '\x00nav\x00'
+FONT_CSS_MARK = 'href="\x00fonts\x00"'
+SPRITE_CSS_MARK = 'href="\x00sprites\x00"'
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def slide_content_key(extractor, slide):
+    """Hash of everything a slide's IR is built from, independent of its deck and position.
+
+    Covers the slide XML, the template key of its layout (layout, master, theme, their
+    images and the slide size) and the content of every part the slide relates to.
+    Returns (key, {digest: partname}) where digest names the related parts by content."""
+    h = hashlib.sha256(f"slide|{IR_VERSION}|".encode('ascii'))
+    h.update(extractor.layer(slide.slide_layout).encode('ascii'))
+    h.update(slide.part.blob)
+    parts = {}
+    for rel in sorted(slide.part.rels.values(), key=lambda r: r.rId):
+        h.update(f"|{rel.rId}|{rel.reltype}|".encode('utf-8'))
+        if rel.is_external:
+            h.update(rel.target_ref.encode('utf-8'))
+        elif rel.reltype != RT.SLIDE_LAYOUT:
+            digest = hashlib.sha1(rel.target_part.blob).hexdigest()[:16]
+            h.update(digest.encode('ascii'))
+            parts[digest] = str(rel.target_part.partname)
+    return h.hexdigest(), parts
+
+
+def name_media_by_content(slide_ir, parts):
+    """Rename a slide's own media after their content (slide_<digest>), so the rendered html
+    does not depend on the slide number. parts is the map slide_content_key returned."""
+    digests = {partname: digest for digest, partname in parts.items()}
+    for ref in slide_ir.media():
+        digest = digests.get(ref.part) if ref.data is None else hashlib.sha1(ref.data).hexdigest()[:16]
+        if digest is not None:
+            ref.name = f"slide_{digest}"
+
+
+class SlideCache:
+    """On-disk cache of extracted and rendered slides, shared by every deck that contains the same slide.
+
+    A slide's IR is stored under its slide_content_key, so extraction is skipped for slides
+    seen before; its html is stored per content key and render options, with the slide
+    number, navigation and the deck's stylesheet hrefs left as marks that a hit fills in. Files are evicted least
+    recently used first once the cache grows beyond max_bytes."""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_SLIDE_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def shared(cls, cache_dir, max_bytes=DEFAULT_SLIDE_CACHE_SIZE):
+        """Return the process-wide cache for cache_dir."""
+        key = os.path.abspath(cache_dir)
+        with _shared_lock:
+            cache = _shared.get(key)
+            if cache is None:
+                cache = _shared[key] = cls(cache_dir, max_bytes)
+            cache.max_bytes = max_bytes
+            return cache
+
+    def _read(self, name):
+        path = os.path.join(self.cache_dir, name)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                payload = json.load(f)
+            # a read counts as a use for LRU eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return payload if payload.get('v') == IR_VERSION else None
+
+    def _write(self, name, payload):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(dict(payload, v=IR_VERSION), f, ensure_ascii=False, separators=(',', ':'))
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_size()
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.gz'):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _disk_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        self._size = total
+
+    def extract_slide(self, extractor, number, slide):
+        """Return (SlideIR, content key) of a slide, from the cache when it was extracted before.
+        Media are named by content and resolved against this deck's parts."""
+        key, parts = slide_content_key(extractor, slide)
+        payload = self._read(f"{key}.ir.json.gz")
+        if payload is not None:
+            slide_ir = ir_from_data(payload['slide'])
+            slide_ir.number = number
+            slide_ir.layer = extractor.layer(slide.slide_layout)
+            for ref in slide_ir.media():
+                if ref.data is None:
+                    ref.part = parts.get(ref.name[len("slide_"):], ref.part)
+            return slide_ir, key
+        slide_ir = extractor.extract_slide(number, slide)
+        name_media_by_content(slide_ir, parts)
+        self._write(f"{key}.ir.json.gz", {'slide': ir_to_data(slide_ir)})
+        return slide_ir, key
+
+    def render(self, key, options, deck, slide_ir, nav, render, font_css=None, sprite_css=None):
+        """Return (html, culled, media) of a slide with content key under render options.
+        render(nav) renders it on a miss and returns the same triple; media are the MediaRefs
+        the html references, which the caller writes out again on a hit. font_css and
+        sprite_css are this deck's stylesheet hrefs; options should only say whether they are set."""
+        name = hashlib.sha256(f"{key}|{json.dumps(options, sort_keys=True)}".encode('utf-8')).hexdigest()
+        payload = self._read(f"{name}.html.gz")
+        title = f"<title>Slide {slide_ir.number}</title>"
+        if payload is not None:
+            with self._lock:
+                self.hits += 1
+            refs = list(slide_ir.media())
+            layer = deck.layers.get(slide_ir.layer)
+            if layer is not None:
+                refs.extend(image.media for image in layer.images)
+                if layer.background is not None:
+                    refs.append(layer.background)
+            by_name = {ref.filename: ref for ref in refs}
+            media = [by_name[filename] for filename in payload['media'] if filename in by_name]
+            html = payload['html'].replace(TITLE_MARK, title, 1).replace(NAV_MARK, nav, 1)
+            if font_css:
+                html = html.replace(FONT_CSS_MARK, f'href="{font_css}"', 1)
+            if sprite_css:
+                html = html.replace(SPRITE_CSS_MARK, f'href="{sprite_css}"', 1)
+            return html, payload['culled'], media
+        with self._lock:
+            self.misses += 1
+        html, culled, media = render(nav)
+        template = html.replace(title, TITLE_MARK, 1).replace(nav, NAV_MARK, 1)
+        if font_css:
+            template = template.replace(f'href="{font_css}"', FONT_CSS_MARK, 1)
+        if sprite_css:
+            template = template.replace(f'href="{sprite_css}"', SPRITE_CSS_MARK, 1)
+        self._write(f"{name}.html.gz", {'html': template, 'culled': culled, 'media': [ref.filename for ref in media]})
+        return html, culled, media
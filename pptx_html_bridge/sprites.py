@@ -0,0 +1,161 @@
+import hashlib
+import io
+import json
+
+# Images whose width and height are both at most this many pixels go into the atlas
+SPRITE_MAX_SIZE = 128
+ATLAS_MAX_WIDTH = 1024
+# Transparent gap around each sprite, so scaled sprites do not bleed into their neighbours
+SPRITE_PADDING = 2
+ATLAS_FORMATS = ('PNG', 'JPEG', 'GIF', 'BMP')
+
+
+def _require_pillow():
+    try:
+        from PIL import Image  # noqa: F401
+    except ImportError:
+        raise ImportError("Sprite atlases require Pillow: pip install Pillow")
+
+
+def sprite_candidates(deck, slide_irs):
+    """MediaRefs of the layout/master decoration images and slide pictures, each once.
+    Backgrounds are drawn with background-size: cover and are not candidates."""
+    refs = {}
+    for slide_ir in slide_irs:
+        layer = deck.layers.get(slide_ir.layer)
+        if layer is not None:
+            for image in layer.images:
+                refs.setdefault(image.media.filename, image.media)
+        for shape in slide_ir.shapes:
+            if shape.kind == 'picture' and shape.media is not None:
+                refs.setdefault(shape.media.filename, shape.media)
+    return list(refs.values())
+
+
+def pack_shelves(sizes, max_width=ATLAS_MAX_WIDTH, padding=SPRITE_PADDING):
+    """Pack (width, height) boxes into rows, tallest first.
+    Returns ([(x, y)] in input order, atlas width, atlas height)."""
+    order = sorted(range(len(sizes)), key=lambda k: (-sizes[k][1], -sizes[k][0]))
+    area = sum((w + padding) * (h + padding) for w, h in sizes)
+    widest = max((w for w, _ in sizes), default=0) + padding
+    # aim for a roughly square atlas
+    width = min(max(widest, int(area ** 0.5 * 1.2)), max(max_width, widest))
+    positions = [None] * len(sizes)
+    x = y = shelf = 0
+    used = 0
+    for k in order:
+        w, h = sizes[k]
+        if x and x + w + padding > width:
+            x, y, shelf = 0, y + shelf, 0
+        positions[k] = (x, y)
+        x += w + padding
+        shelf = max(shelf, h + padding)
+        used = max(used, x)
+    return positions, used, y + shelf
+
+
+class SpriteAtlas:
+    """Small images of a deck packed into one png, referenced through css background-position classes.
+
+    entries maps a media file name to its sprite class and box in the atlas; sprites are
+    named after their content, so identical images under different names share one sprite."""
+
+    def __init__(self, name):
+        self.name = name
+        self.entries = {}
+        self.sprites = {}
+        self.width = 0
+        self.height = 0
+        self.png = None
+        self.css_href = None
+
+    def __len__(self):
+        return len(self.sprites)
+
+    def lookup(self, ref):
+        """Sprite class of a MediaRef, or None if it is written as its own file."""
+        entry = self.entries.get(ref.filename)
+        return entry["class"] if entry is not None else None
+
+    def css(self, image_url):
+        """Stylesheet with one class per sprite; positions and sizes are percentages, so a
+        sprite fills whatever box it is drawn in."""
+        rules = [f'.sprite {{ background-image: url("{image_url}"); background-repeat: no-repeat; }}']
+        for cls, (x, y, w, h) in self.sprites.items():
+            size = f"{_pct(self.width, w)} {_pct(self.height, h)}"
+            position = f"{_pos(x, self.width, w)} {_pos(y, self.height, h)}"
+            rules.append(f".{cls} {{ background-size: {size}; background-position: {position}; }}")
+        return '\n'.join(rules)
+
+    def map(self, image_file):
+        """The atlas map: image file, atlas size and each media file's sprite class and box."""
+        return {
+            "image": image_file,
+            "width": self.width,
+            "height": self.height,
+            "sprites": {filename: dict(entry) for filename, entry in sorted(self.entries.items())},
+        }
+
+    def map_json(self, image_file):
+        """The atlas map as JSON text."""
+        return json.dumps(self.map(image_file), ensure_ascii=False, indent=2)
+
+
+def _pct(total, part):
+    return f"{round(total / part * 100, 4):g}%"
+
+
+def _pos(offset, total, part):
+    if total == part:
+        return "0%"
+    return f"{round(offset / (total - part) * 100, 4):g}%"
+
+
+def build_sprite_atlas(deck, slide_irs, name, max_size=SPRITE_MAX_SIZE, max_width=ATLAS_MAX_WIDTH):
+    """Pack the deck's small static images into one atlas, or return None when fewer than two qualify.
+
+    Candidates are the decoration images of the layouts/masters the slides use and the
+    slides' pictures. Images larger than max_size in either dimension, animated images and
+    formats Pillow cannot read (svg, emf, wmf) keep their own files."""
+    _require_pillow()
+    from PIL import Image
+
+    images = {}
+    names = {}
+    for ref in sprite_candidates(deck, slide_irs):
+        data = deck.media_blob(ref)
+        if not data:
+            continue
+        digest = hashlib.sha1(data).hexdigest()[:10]
+        cls = f"sprite-{digest}"
+        if cls not in images:
+            try:
+                image = Image.open(io.BytesIO(data))
+                if image.format not in ATLAS_FORMATS or getattr(image, 'is_animated', False):
+                    continue
+                if image.width > max_size or image.height > max_size:
+                    continue
+                image.load()
+            except Exception:
+                continue
+            images[cls] = image
+        names[ref.filename] = cls
+    if len(images) < 2:
+        return None
+
+    classes = sorted(images)
+    positions, width, height = pack_shelves([images[cls].size for cls in classes], max_width)
+    atlas = SpriteAtlas(name)
+    atlas.width, atlas.height = width, height
+    canvas = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    for cls, (x, y) in zip(classes, positions):
+        image = images[cls]
+        canvas.paste(image.convert('RGBA'), (x, y))
+        atlas.sprites[cls] = (x, y, image.width, image.height)
+    for filename, cls in names.items():
+        x, y, w, h = atlas.sprites[cls]
+        atlas.entries[filename] = {"class": cls, "x": x, "y": y, "width": w, "height": h}
+    buf = io.BytesIO()
+    canvas.save(buf, 'PNG', optimize=True)
+    atlas.png = buf.getvalue()
+    return atlas
@@ -0,0 +1,179 @@
+from html import escape
+from .converters import emu_to_px
+from .themes import get_scheme_color
+from .ir import TableIR, CellIR
+from .watchdog import checkpoint
+
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+_A = '{%s}' % A_NS
+
+ALIGN_MAP = {'l': 'left', 'ctr': 'center', 'r': 'right', 'just': 'justify', 'dist': 'justify'}
+ANCHOR_MAP = {'t': 'top', 'ctr': 'middle', 'b': 'bottom'}
+
+
+def _color_of(parent, prs, scheme_cache):
+    """Return a '#rrggbb' color from an a:solidFill child of parent, or None."""
+    if parent is None:
+        return None
+    fill = parent.find(_A + 'solidFill')
+    if fill is None:
+        return None
+    srgb = fill.find(_A + 'srgbClr')
+    if srgb is not None and srgb.get('val'):
+        return f"#{srgb.get('val').lower()}"
+    scheme = fill.find(_A + 'schemeClr')
+    if scheme is not None and scheme.get('val') and prs is not None:
+        val = scheme.get('val')
+        if val not in scheme_cache:
+            scheme_cache[val] = get_scheme_color(prs, val)
+        if scheme_cache[val]:
+            return f"#{scheme_cache[val].lower()}"
+    return None
+
+
+_GRID_COL = _A + 'gridCol'
+_TR = _A + 'tr'
+_TC = _A + 'tc'
+_TC_PR = _A + 'tcPr'
+_P = _A + 'p'
+_P_PR = _A + 'pPr'
+_R_PR = _A + 'rPr'
+_T = _A + 't'
+_BR = _A + 'br'
+
+
+def _run_decls(rPr, prs, scheme_cache):
+    """Return css declarations for the first run properties of a cell."""
+    decls = []
+    sz = rPr.get('sz')
+    if sz:
+        try:
+            decls.append(f"font-size: {int(float(sz) / 100.0 * 96.0 / 72.0)}px;")
+        except ValueError:
+            pass
+    if rPr.get('b') in ('1', 'true'):
+        decls.append("font-weight: bold;")
+    if rPr.get('i') in ('1', 'true'):
+        decls.append("font-style: italic;")
+    if rPr.get('u') not in (None, 'none'):
+        decls.append("text-decoration: underline;")
+    color = _color_of(rPr, prs, scheme_cache)
+    if color:
+        decls.append(f"color: {color};")
+    return decls
+
+
+class _Cell:
+    """Accumulated state of the a:tc element currently being walked."""
+    __slots__ = ('ir', 'skip', 'chunks', 'paragraphs', 'cell_decls', 'para_decls', 'run_decls')
+
+    def __init__(self, tc):
+        self.skip = tc.get('hMerge') in ('1', 'true') or tc.get('vMerge') in ('1', 'true')
+        self.ir = CellIR(colspan=int(tc.get('gridSpan') or 1), rowspan=int(tc.get('rowSpan') or 1))
+        self.chunks = []
+        self.paragraphs = 0
+        self.cell_decls = []
+        self.para_decls = None
+        self.run_decls = None
+
+
+def _close_cell(cell, cells):
+    if cell is None or cell.skip:
+        return
+    cell.ir.text = ''.join(cell.chunks)
+    cell.ir.style = ' '.join(cell.cell_decls + (cell.para_decls or []) + (cell.run_decls or []))
+    cells.append(cell.ir)
+
+
+def extract_table(tbl, prs=None):
+    """Read an a:tbl element into a TableIR in a single pass over its XML.
+    Cells covered by a merge are left out; the origin cell carries colspan/rowspan."""
+    table = TableIR()
+    scheme_cache = {}
+    cells = None
+    cell = None
+
+    # Only the elements we care about are materialized; everything else is skipped in C
+    for el in tbl.iter(_GRID_COL, _TR, _TC, _TC_PR, _P, _P_PR, _R_PR, _T, _BR):
+        tag = el.tag
+        if tag == _T:
+            if el.text and not cell.skip:
+                cell.chunks.append(el.text)
+        elif tag == _R_PR:
+            if cell.run_decls is None:
+                cell.run_decls = _run_decls(el, prs, scheme_cache)
+        elif tag == _P:
+            if cell.paragraphs:
+                cell.chunks.append('\n')
+            cell.paragraphs += 1
+        elif tag == _BR:
+            cell.chunks.append('\n')
+        elif tag == _P_PR:
+            if cell.para_decls is None:
+                algn = el.get('algn')
+                cell.para_decls = [f"text-align: {ALIGN_MAP[algn]};"] if algn in ALIGN_MAP else []
+        elif tag == _TC:
+            _close_cell(cell, cells)
+            cell = _Cell(el)
+        elif tag == _TC_PR:
+            fill = _color_of(el, prs, scheme_cache)
+            if fill:
+                cell.cell_decls.append(f"background-color: {fill};")
+            if el.get('anchor') in ANCHOR_MAP:
+                cell.cell_decls.append(f"vertical-align: {ANCHOR_MAP[el.get('anchor')]};")
+        elif tag == _TR:
+            checkpoint()
+            _close_cell(cell, cells)
+            cell = None
+            cells = []
+            h = el.get('h')
+            table.rows.append((emu_to_px(int(h)) if h else None, cells))
+        elif tag == _GRID_COL:
+            table.col_widths.append(emu_to_px(int(el.get('w', 0))))
+
+    _close_cell(cell, cells)
+    return table
+
+
+def render_table_html(table, style_classes, class_prefix='tc', write=None):
+    """Render a TableIR to HTML.
+
+    style_classes maps a cell's css declarations to an interned class name and is
+    shared between tables of the same slide so identical cell styles share one class.
+    Returns (table_html, css_rules) where css_rules holds only the rules for classes
+    interned by this call. When write is given, each fragment is passed to it as
+    soon as it is ready and table_html is None."""
+    parts = []
+    emit = write or parts.append
+    css_rules = []
+    col_widths = table.col_widths
+    if col_widths:
+        emit(f'<table style="table-layout: fixed; width: {sum(col_widths)}px;"><colgroup>')
+        for w in col_widths:
+            emit(f'<col style="width: {w}px;">')
+        emit('</colgroup>')
+    else:
+        emit('<table>')
+    for height, cells in table.rows:
+        checkpoint()
+        emit(f'<tr style="height: {height}px;">' if height is not None else '<tr>')
+        for cell in cells:
+            attrs = ''
+            if cell.colspan != 1:
+                attrs += f' colspan="{cell.colspan}"'
+            if cell.rowspan != 1:
+                attrs += f' rowspan="{cell.rowspan}"'
+            if cell.style:
+                cls = style_classes.get(cell.style)
+                if cls is None:
+                    cls = f"{class_prefix}{len(style_classes)}"
+                    style_classes[cell.style] = cls
+                    css_rules.append(f".{cls} {{ {cell.style} }}")
+                attrs += f' class="{cls}"'
+            text = escape(cell.text).replace('\n', '<br>').replace('\x0b', '<br>')
+            emit(f'<td{attrs}>{text}</td>')
+        emit('</tr>')
+    emit('</table>')
+    if write:
+        return None, css_rules
+    return ''.join(parts), css_rules
@@ -0,0 +1,138 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from .themes import get_theme_fonts
+from .fonts import get_layout_placeholder_defaults
+from .layout_processors import extract_layer
+from .ir import IR_VERSION, ir_to_data, ir_from_data
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def _theme_parts(prs):
+    return [rel.target_part for rel in prs.part.rels.values()
+            if not rel.is_external and 'theme' in rel.reltype.lower()]
+
+
+def template_key(prs, layout, slide_width_px, slide_height_px):
+    """Hash of everything a layout's decoration layer and placeholder defaults are resolved from:
+    the layout and master XML, their images, the presentation theme and the slide size."""
+    h = hashlib.sha1(f"{IR_VERSION}|{slide_width_px}x{slide_height_px}".encode('ascii'))
+    for part in (layout.part, layout.slide_master.part):
+        h.update(part.blob)
+        for rel in sorted(part.rels.values(), key=lambda r: r.rId):
+            if not rel.is_external and rel.reltype.endswith('/image'):
+                h.update(rel.rId.encode('ascii'))
+                h.update(hashlib.sha1(rel.target_part.blob).digest())
+    for part in _theme_parts(prs):
+        h.update(part.blob)
+    return h.hexdigest()
+
+
+class TemplateCache:
+    """Cache of resolved slide templates shared by every deck built from the same master and layouts.
+
+    An entry holds a layout's decoration layer (with its media bytes inline, so any deck can
+    write them) and its placeholder defaults, keyed by template_key. Entries live in memory
+    (least recently used dropped beyond max_entries) and, with cache_dir, on disk as well."""
+
+    def __init__(self, cache_dir=None, max_entries=256):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._theme_fonts = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def shared(cls, cache_dir=None):
+        """Return the process-wide cache for cache_dir (None for memory only)."""
+        key = os.path.abspath(cache_dir) if cache_dir else None
+        with _shared_lock:
+            cache = _shared.get(key)
+            if cache is None:
+                cache = _shared[key] = cls(cache_dir)
+            return cache
+
+    def theme_fonts(self, prs):
+        """get_theme_fonts, cached by the theme content."""
+        h = hashlib.sha1()
+        for part in _theme_parts(prs):
+            h.update(part.blob)
+        key = h.hexdigest()
+        with self._lock:
+            fonts = self._theme_fonts.get(key)
+        if fonts is None:
+            try:
+                fonts = get_theme_fonts(prs)
+            except Exception:
+                fonts = (None, None)
+            with self._lock:
+                self._theme_fonts[key] = fonts
+        return fonts
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.tpl.json.gz")
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        if self.cache_dir and os.path.exists(self._path(key)):
+            try:
+                with gzip.open(self._path(key), 'rt', encoding='utf-8') as f:
+                    payload = json.load(f)
+                if payload.get('v') == IR_VERSION:
+                    entry = ir_from_data(payload['layer']), ir_from_data(payload['defaults'])
+                    self._put(key, entry)
+                    with self._lock:
+                        self.hits += 1
+                    return entry
+            except Exception:
+                pass
+        return None
+
+    def _put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def template(self, prs, layout, slide_width_px, slide_height_px, media_blob):
+        """Return (key, LayerIR, placeholder_defaults) of a layout, resolving it on a cache miss.
+        media_blob reads a MediaRef's bytes from the deck being extracted."""
+        key = template_key(prs, layout, slide_width_px, slide_height_px)
+        entry = self._get(key)
+        if entry is not None:
+            return key, entry[0], entry[1]
+        with self._lock:
+            self.misses += 1
+        # media names carry the template key so decks sharing it reuse the written files
+        layer = extract_layer(layout, key, slide_width_px, slide_height_px, prefix=f"tpl{key[:12]}_")
+        for ref in [image.media for image in layer.images] + [layer.background]:
+            if ref is not None and ref.data is None:
+                ref.data = media_blob(ref)
+                ref.part = None
+        try:
+            defaults = get_layout_placeholder_defaults(layout, prs)
+        except Exception:
+            defaults = {}
+        entry = (layer, defaults)
+        self._put(key, entry)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            payload = {'v': IR_VERSION, 'layer': ir_to_data(layer), 'defaults': ir_to_data(defaults)}
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self._path(key))
+        return key, layer, defaults
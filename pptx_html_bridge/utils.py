@@ -1,5 +1,29 @@
 from .converters import emu_to_px, emu_to_pt, color_to_hex, pt_to_px, dash_style_to_css
 from .themes import get_background_style, get_scheme_color, get_theme_fonts
 from .fonts import get_effective_font, get_layout_placeholder_defaults
-from .html_generators import html_builder, generate_index_html, generate_main_html, generate_slide_html
-from .layout_processors import collect_layout_elements
\ No newline at end of file
+from .html_generators import HTMLWriter, html_builder, default_font_stack, slide_nav, generate_index_html, generate_main_html, generate_slide_html, write_html, layer_svg_name, write_media, write_layer_svg, next_slide_media, slide_hints, insert_head_lines, write_nav_js
+from .layout_processors import extract_layer
+from .tables import extract_table, render_table_html
+from .charts import extract_chart, render_chart_svg
+from .vectors import render_vector_svg, shape_svg
+from .culling import cull_slide_elements
+from .groups import flatten_shapes
+from .webfonts import GlyphCollector, build_font_faces
+from .search import SearchIndexBuilder, write_search_js
+from .ir import IR_VERSION, DeckIR, SlideIR, save_deck, load_deck
+from .extract import DeckExtractor, extract_deck, open_deck, open_presentation
+from .slicing import parse_slide_ranges, slice_package, slide_count
+from .backends import render_json, render_text
+from .assets import AssetManifest, MANIFEST_NAME
+from .precompress import Precompressor, PrecompressingSink, parse_encodings, DEFAULT_MAX_RATIO
+from .templates import TemplateCache, template_key
+from .progressive import render_slide_result, iter_slide_results, render_slide_chunk
+from .scan import scan, PPTXLimitError, DEFAULT_LIMITS
+from .jobs import iter_jobs, load_done, open_results, run_job, run_jobs, job_limits, lost_job_result
+from .slide_cache import SlideCache, slide_content_key, DEFAULT_SLIDE_CACHE_SIZE
+from .sinks import OutputSink, LocalSink, MemorySink, S3Sink, WriteBehindSink, parse_output_url
+from .sprites import SpriteAtlas, build_sprite_atlas, pack_shelves, SPRITE_MAX_SIZE
+from .watchdog import ConversionTimeout, Deadline, checkpoint, time_limits, run_watched
+from .outline import read_outline, render_outline_html, render_outline_json, outline_text
+from .presentation_cache import PresentationCache, CachedPresentation, presentation_key, DEFAULT_PRESENTATION_CACHE_ENTRIES, DEFAULT_PRESENTATION_CACHE_BYTES
+from .html_to_pptx import HTMLToPPTXConverter, PPTXWriter, TemplatePackage, parse_slide_html, slide_pages
@@ -0,0 +1,200 @@
+import math
+from html import escape
+from .charts import _c
+
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+_A = '{%s}' % A_NS
+
+# prstDash patterns in multiples of the stroke width (ECMA-376 20.1.10.48)
+DASH_PATTERNS = {
+    'dot': (1, 3), 'dash': (4, 3), 'dashDot': (4, 3, 1, 3), 'lgDash': (8, 3), 'lgDashDot': (8, 3, 1, 3),
+    'lgDashDotDot': (8, 3, 1, 3, 1, 3), 'sysDash': (3, 1), 'sysDot': (1, 1), 'sysDashDot': (3, 1, 1, 1),
+    'sysDashDotDot': (3, 1, 1, 1, 1, 1),
+}
+# Presets drawn with the same outline as another one ('pill' is a round rect with semicircular ends)
+GEOMETRY_ALIASES = {
+    'flowChartProcess': 'rect', 'flowChartAlternateProcess': 'roundRect', 'flowChartDecision': 'diamond',
+    'flowChartConnector': 'ellipse', 'flowChartInputOutput': 'parallelogram', 'flowChartTerminator': 'pill',
+    'flowChartPreparation': 'hexagon', 'straightConnector1': 'line', 'bentConnector1': 'line',
+    'curvedConnector1': 'line',
+}
+# Default adjust values of the supported presets (avLst gd names)
+ADJUST_DEFAULTS = {
+    'roundRect': {'adj': 16667}, 'triangle': {'adj': 50000}, 'parallelogram': {'adj': 25000},
+    'trapezoid': {'adj': 25000}, 'hexagon': {'adj': 25000}, 'octagon': {'adj': 29289},
+    'homePlate': {'adj': 50000}, 'chevron': {'adj': 50000}, 'plus': {'adj': 25000},
+    'rightArrow': {'adj1': 50000, 'adj2': 50000}, 'leftArrow': {'adj1': 50000, 'adj2': 50000},
+    'upArrow': {'adj1': 50000, 'adj2': 50000}, 'downArrow': {'adj1': 50000, 'adj2': 50000},
+    'bentConnector3': {'adj1': 50000}, 'star5': {'adj': 19098},
+}
+VECTOR_KINDS = ('line', 'auto-shape')
+
+
+def vector_geometry(shape):
+    """Return (preset, adjustments, flip, dash) of a line/auto shape from its spPr.
+    preset is the prstGeom name (None for custom geometry), adjustments the avLst
+    overrides of its defaults, flip 'h', 'v', 'hv' or None, dash the prstDash value."""
+    sp_pr = shape._element.find('{http://schemas.openxmlformats.org/presentationml/2006/main}spPr')
+    if sp_pr is None:
+        return None, None, None, None
+    preset = None
+    adjustments = None
+    geom = sp_pr.find(_A + 'prstGeom')
+    if geom is not None:
+        preset = geom.get('prst')
+        for gd in geom.iter(_A + 'gd'):
+            fmla = gd.get('fmla', '')
+            if fmla.startswith('val '):
+                try:
+                    adjustments = adjustments or {}
+                    adjustments[gd.get('name')] = int(fmla[4:])
+                except ValueError:
+                    pass
+    flip = None
+    xfrm = sp_pr.find(_A + 'xfrm')
+    if xfrm is not None:
+        flip = ('h' if xfrm.get('flipH') in ('1', 'true') else '') + ('v' if xfrm.get('flipV') in ('1', 'true') else '')
+    dash = None
+    prst_dash = sp_pr.find(_A + 'ln/' + _A + 'prstDash')
+    if prst_dash is not None and prst_dash.get('val') != 'solid':
+        dash = prst_dash.get('val')
+    return preset, adjustments, flip or None, dash
+
+
+def _polygon(w, h, preset, adj):
+    """Outline points of a polygonal preset in the shape's own box, or None."""
+    ss = min(w, h)
+    a = adj.get('adj', 0) / 100000
+    if preset == 'triangle':
+        return [(w * a, 0), (w, h), (0, h)]
+    if preset == 'rtTriangle':
+        return [(0, 0), (w, h), (0, h)]
+    if preset == 'diamond':
+        return [(w / 2, 0), (w, h / 2), (w / 2, h), (0, h / 2)]
+    if preset == 'parallelogram':
+        x = min(ss * a, w)
+        return [(x, 0), (w, 0), (w - x, h), (0, h)]
+    if preset == 'trapezoid':
+        x = min(ss * a, w / 2)
+        return [(0, h), (x, 0), (w - x, 0), (w, h)]
+    if preset == 'pentagon':
+        return [(w / 2, 0), (w, h * 0.382), (w * 0.809, h), (w * 0.191, h), (0, h * 0.382)]
+    if preset == 'hexagon':
+        x = min(ss * a, w / 2)
+        return [(0, h / 2), (x, 0), (w - x, 0), (w, h / 2), (w - x, h), (x, h)]
+    if preset == 'octagon':
+        x = min(ss * a, w / 2, h / 2)
+        return [(0, x), (x, 0), (w - x, 0), (w, x), (w, h - x), (w - x, h), (x, h), (0, h - x)]
+    if preset == 'homePlate':
+        x = w - min(ss * a, w)
+        return [(0, 0), (x, 0), (w, h / 2), (x, h), (0, h)]
+    if preset == 'chevron':
+        x = min(ss * a, w)
+        return [(0, 0), (w - x, 0), (w, h / 2), (w - x, h), (0, h), (x, h / 2)]
+    if preset == 'plus':
+        x = min(ss * a, w / 2, h / 2)
+        return [(x, 0), (w - x, 0), (w - x, x), (w, x), (w, h - x), (w - x, h - x), (w - x, h), (x, h),
+                (x, h - x), (0, h - x), (0, x), (x, x)]
+    if preset in ('rightArrow', 'leftArrow'):
+        dy = h * adj['adj1'] / 200000
+        x = w - min(ss * adj['adj2'] / 100000, w)
+        points = [(0, h / 2 - dy), (x, h / 2 - dy), (x, 0), (w, h / 2), (x, h), (x, h / 2 + dy), (0, h / 2 + dy)]
+        return points if preset == 'rightArrow' else [(w - px, py) for px, py in points]
+    if preset in ('downArrow', 'upArrow'):
+        dx = w * adj['adj1'] / 200000
+        y = h - min(ss * adj['adj2'] / 100000, h)
+        points = [(w / 2 - dx, 0), (w / 2 + dx, 0), (w / 2 + dx, y), (w, y), (w / 2, h), (0, y), (w / 2 - dx, y)]
+        return points if preset == 'downArrow' else [(px, h - py) for px, py in points]
+    if preset == 'star5':
+        inner = adj['adj'] / 50000
+        points = []
+        for k in range(10):
+            r = 1 if k % 2 == 0 else inner
+            angle = -math.pi / 2 + k * math.pi / 5
+            points.append((w / 2 + r * w / 2 * math.cos(angle), h / 2 + r * h / 2 * math.sin(angle)))
+        return points
+    return None
+
+
+def _open_path(w, h, preset, adj):
+    """Path data of connector presets in the shape's own box, or None."""
+    if preset == 'line':
+        return [('M', 0, 0), ('L', w, h)]
+    if preset == 'bentConnector2':
+        return [('M', 0, 0), ('L', w, 0), ('L', w, h)]
+    if preset == 'bentConnector3':
+        x = w * adj['adj1'] / 100000
+        return [('M', 0, 0), ('L', x, 0), ('L', x, h), ('L', w, h)]
+    if preset == 'curvedConnector3':
+        return [('M', 0, 0), ('C', w / 2, 0, w / 2, h, w, h)]
+    return None
+
+
+def _place(values, x, y, w, h, flip):
+    """Map local (x, y) pairs into slide coordinates, mirrored by flip."""
+    placed = []
+    for k in range(0, len(values), 2):
+        px, py = values[k], values[k + 1]
+        if flip and 'h' in flip:
+            px = w - px
+        if flip and 'v' in flip:
+            py = h - py
+        placed.append(f"{_c(x + px)} {_c(y + py)}")
+    return ' '.join(placed)
+
+
+def shape_svg(shape):
+    """Render one line/auto-shape ShapeIR as a single svg primitive in slide coordinates.
+    Unknown presets and custom geometry fall back to the bounding rectangle."""
+    x, y = shape.left or 0, shape.top or 0
+    w, h = shape.width or 0, shape.height or 0
+    preset = shape.geometry or ('line' if shape.kind == 'line' else 'rect')
+    preset = GEOMETRY_ALIASES.get(preset, preset)
+    adj = dict(ADJUST_DEFAULTS.get(preset, {}))
+    adj.update(shape.adjustments or {})
+
+    if shape.kind == 'line':
+        stroke = shape.stroke_color or '#000'
+        stroke_width = shape.stroke_width if shape.stroke_width is not None else 2
+        fill = 'none'
+    else:
+        stroke = shape.stroke_color if shape.stroke_color and shape.stroke_width else None
+        stroke_width = shape.stroke_width or 1
+        fill = shape.fill_color if shape.fill_color and shape.fill_color != 'transparent' else 'none'
+    attrs = ''
+    if stroke:
+        attrs += f' stroke="{escape(stroke)}" stroke-width="{_c(stroke_width)}"'
+        pattern = DASH_PATTERNS.get(shape.dash)
+        if pattern:
+            attrs += f' stroke-dasharray="{" ".join(_c(v * stroke_width) for v in pattern)}"'
+    if shape.rotation:
+        # PowerPoint rotates about the shape center
+        attrs += f' transform="rotate({_c(shape.rotation)} {_c(x + w / 2)} {_c(y + h / 2)})"'
+
+    path = _open_path(w, h, preset, adj)
+    if path is not None:
+        if len(path) == 2:
+            x1, y1, x2, y2 = _place(path[0][1:] + path[1][1:], x, y, w, h, shape.flip).split()
+            return f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}"{attrs}/>'
+        d = ' '.join(f"{cmd} {_place(values, x, y, w, h, shape.flip)}" for cmd, *values in path)
+        return f'<path d="{d}" fill="none"{attrs}/>'
+    attrs = f' fill="{escape(fill)}"' + attrs
+    if preset == 'ellipse':
+        return f'<ellipse cx="{_c(x + w / 2)}" cy="{_c(y + h / 2)}" rx="{_c(w / 2)}" ry="{_c(h / 2)}"{attrs}/>'
+    if preset in ('roundRect', 'pill'):
+        r = min(w, h) / 2 if preset == 'pill' else min(w, h) * adj['adj'] / 100000
+        return f'<rect x="{_c(x)}" y="{_c(y)}" width="{_c(w)}" height="{_c(h)}" rx="{_c(r)}"{attrs}/>'
+    points = _polygon(w, h, preset, adj)
+    if points is not None:
+        values = [v for point in points for v in point]
+        return f'<polygon points="{_place(values, x, y, w, h, shape.flip)}"{attrs}/>'
+    return f'<rect x="{_c(x)}" y="{_c(y)}" width="{_c(w)}" height="{_c(h)}"{attrs}/>'
+
+
+def render_vector_svg(shapes, width, height, css_class='vector', standalone=False):
+    """Render line/auto-shape ShapeIRs into one svg covering the width x height slide.
+    standalone adds the xml namespace for use as a separate .svg file."""
+    ns = ' xmlns="http://www.w3.org/2000/svg"' if standalone else ''
+    cls = f' class="{css_class}"' if css_class else ''
+    body = ''.join(shape_svg(shape) for shape in shapes)
+    return f'<svg{ns}{cls} width="{width}" height="{height}" viewBox="0 0 {width} {height}">{body}</svg>'
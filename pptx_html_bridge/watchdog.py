@@ -0,0 +1,245 @@
+"""
+Per-deck time limits.
+
+A Deadline is installed for the duration of one conversion and checked at cooperative
+checkpoints between stages, slides, shapes and table rows; when its wall-clock or CPU
+budget is spent, the next checkpoint raises ConversionTimeout naming the stage and slide.
+run_watched runs tasks in worker processes and kills and replaces a worker whose task
+overruns its limit without reaching a checkpoint, or that dies.
+"""
+
+import contextvars
+import multiprocessing
+import signal
+import time
+from contextlib import contextmanager
+
+STAGES = ('scan', 'open', 'extract', 'fonts', 'sprites', 'render', 'search', 'index', 'write')
+# A worker still busy this long past its task's limit is killed
+HARD_LIMIT_GRACE = 5.0
+
+_current = contextvars.ContextVar('pptx_html_deadline', default=None)
+# Shared [stage, slide] of the task a pool worker is running, read by the parent after a kill
+_progress = None
+
+
+class ConversionTimeout(TimeoutError):
+    """A conversion ran past its wall-clock ("wall") or CPU ("cpu") limit."""
+
+    def __init__(self, limit, seconds, stage=None, slide=None):
+        self.limit = limit
+        self.seconds = seconds
+        self.stage = stage
+        self.slide = slide
+        where = f" during {stage}" if stage else ""
+        if slide:
+            where += f" of slide {slide}"
+        kind = "CPU time" if limit == "cpu" else "wall-clock time"
+        super().__init__(f"Conversion exceeded its {kind} limit of {seconds:g}s{where}")
+
+
+class Deadline:
+    """Wall-clock and CPU budgets of one conversion, and the stage and slide it has reached."""
+
+    def __init__(self, wall=None, cpu=None):
+        self.wall = wall
+        self.cpu = cpu
+        self.stage = None
+        self.slide = None
+        self._wall_end = time.perf_counter() + wall if wall else None
+        self._cpu_end = time.process_time() + cpu if cpu else None
+
+    def check(self, stage=None, slide=None):
+        """Record progress and raise ConversionTimeout once a budget is spent."""
+        if stage is not None and stage != self.stage:
+            self.stage = stage
+            self.slide = slide
+            _report(stage, slide)
+        elif slide is not None and slide != self.slide:
+            self.slide = slide
+            _report(self.stage, slide)
+        if self._wall_end is not None and time.perf_counter() > self._wall_end:
+            raise ConversionTimeout("wall", self.wall, self.stage, self.slide)
+        if self._cpu_end is not None and time.process_time() > self._cpu_end:
+            raise ConversionTimeout("cpu", self.cpu, self.stage, self.slide)
+
+
+def _report(stage, slide):
+    if _progress is not None:
+        _progress[0] = STAGES.index(stage) + 1 if stage in STAGES else 0
+        _progress[1] = slide or 0
+
+
+def checkpoint(stage=None, slide=None):
+    """Cancellation point: checks the current conversion's Deadline, if any.
+    stage and slide record where the conversion is."""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check(stage, slide)
+
+
+@contextmanager
+def time_limits(wall=None, cpu=None):
+    """Run the enclosed conversion under a Deadline (none when both limits are unset)."""
+    if not wall and not cpu:
+        yield None
+        return
+    deadline = Deadline(wall, cpu)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def _limit_cpu(seconds):
+    """Have the OS stop this process once it has used seconds more CPU time (Unix only)."""
+    try:
+        import resource
+    except ImportError:
+        return
+    hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+    if seconds is None:
+        soft = hard
+    else:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    except (ValueError, OSError):
+        pass
+
+
+def _worker(conn, progress, fn):
+    global _progress
+    _progress = progress
+    while True:
+        try:
+            item = conn.recv()
+        except EOFError:
+            break
+        if item is None:
+            break
+        task_id, task, cpu = item
+        progress[0] = progress[1] = 0
+        # the cooperative CPU limit fires first; this one stops a worker stuck outside checkpoints
+        _limit_cpu(cpu + HARD_LIMIT_GRACE if cpu else None)
+        conn.send((task_id, fn(task)))
+
+
+class _Slot:
+    """One worker process and the task it is running."""
+
+    def __init__(self, ctx, fn):
+        self.progress = ctx.Array('i', 2, lock=False)
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker, args=(child, self.progress, fn), daemon=True)
+        self.process.start()
+        child.close()
+        self.task = None
+        self.task_id = None
+        self.started = None
+        self.kill_at = None
+
+    def start(self, task_id, task, wall, cpu):
+        self.task_id, self.task = task_id, task
+        self.started = time.monotonic()
+        self.kill_at = self.started + wall + HARD_LIMIT_GRACE if wall else None
+        self.conn.send((task_id, task, cpu))
+
+    def where(self):
+        stage, slide = self.progress[0], self.progress[1]
+        return (STAGES[stage - 1] if 0 < stage <= len(STAGES) else None), (slide or None)
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+def run_watched(tasks, fn, workers, limits=None, lost=None):
+    """
+    Run fn(task) for each task in worker processes and yield the results in completion order.
+
+    fn must be picklable (a module-level function or a partial of one) and should not raise;
+    a worker that raises is treated as died. limits(task) returns the task's (wall, cpu) limits
+    in seconds (either may be None). A worker whose task runs HARD_LIMIT_GRACE seconds past
+    its limit is killed and replaced, as is one that dies; lost(task, reason, stage, slide,
+    seconds) then supplies the task's result, where reason is "wall", "cpu" or "died", stage
+    and slide are the last checkpoint the worker passed and seconds is how long the task ran.
+    At most two tasks per worker are taken from tasks at a time, so tasks may be a lazy iterable.
+    """
+    from multiprocessing.connection import wait
+    ctx = multiprocessing.get_context()
+    slots = [_Slot(ctx, fn) for _ in range(workers)]
+    tasks = iter(tasks)
+    backlog = []
+    exhausted = False
+    next_id = 0
+    try:
+        while True:
+            while not exhausted and len(backlog) < workers:
+                try:
+                    backlog.append(next(tasks))
+                except StopIteration:
+                    exhausted = True
+            for slot in slots:
+                if slot.task_id is None and backlog:
+                    task = backlog.pop(0)
+                    wall, cpu = limits(task) if limits else (None, None)
+                    slot.start(next_id, task, wall, cpu)
+                    next_id += 1
+            busy = [slot for slot in slots if slot.task_id is not None]
+            if not busy:
+                break
+            now = time.monotonic()
+            timeout = min((slot.kill_at - now for slot in busy if slot.kill_at is not None), default=None)
+            ready = wait([slot.conn for slot in busy] + [slot.process.sentinel for slot in busy],
+                         timeout=max(timeout, 0) if timeout is not None else None)
+            for k, slot in enumerate(slots):
+                if slot.task_id is None:
+                    continue
+                if slot.conn in ready:
+                    try:
+                        _, result = slot.conn.recv()
+                    except (EOFError, OSError):
+                        # the worker is exiting; let it finish so its exit code is known
+                        slot.process.join(1)
+                    else:
+                        slot.task_id = slot.task = None
+                        yield result
+                        continue
+                overdue = slot.kill_at is not None and time.monotonic() >= slot.kill_at
+                if overdue or not slot.process.is_alive():
+                    exitcode = slot.process.exitcode
+                    stage, slide = slot.where()
+                    slot.kill()
+                    task = slot.task
+                    slots[k] = _Slot(ctx, fn)
+                    if overdue:
+                        reason = "wall"
+                    elif hasattr(signal, 'SIGXCPU') and exitcode == -signal.SIGXCPU:
+                        reason = "cpu"
+                    else:
+                        reason = "died"
+                    yield lost(task, reason, stage, slide, time.monotonic() - slot.started) if lost else None
+    finally:
+        for slot in slots:
+            if slot.task_id is not None:
+                slot.kill()
+            else:
+                slot.stop()
+
@@ -0,0 +1,219 @@
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+from .sinks import LocalSink
+
+FONT_EXTS = ('.ttf', '.otf', '.ttc', '.otc', '.woff', '.woff2')
+# name table records that carry a family name: family, full name, typographic family
+FAMILY_NAME_IDS = (1, 4, 16)
+# in-memory bounds; subsets evicted here are still found in cache_dir when one is given
+SUBSET_CACHE_BYTES = 32 * 1024 ** 2
+FONT_HASH_CACHE_SIZE = 1024
+
+_font_index_cache = {}
+_font_hash_cache = OrderedDict()
+_subset_cache = OrderedDict()
+_subset_bytes = 0
+_lock = threading.Lock()
+
+
+def _require_fonttools():
+    try:
+        from fontTools.ttLib import TTFont  # noqa: F401
+        from fontTools import subset  # noqa: F401
+    except ImportError:
+        raise ImportError("Web-font subsetting requires fontTools and brotli: pip install fonttools brotli")
+
+
+class GlyphCollector:
+    """Collect the exact codepoints rendered with each font family during a conversion."""
+
+    def __init__(self):
+        self.codepoints = {}
+
+    def add(self, family, text):
+        if not family or not text:
+            return
+        chars = self.codepoints.get(family)
+        if chars is None:
+            chars = self.codepoints[family] = set()
+        chars.update(text)
+
+    def add_slide(self, slide_ir, body_families):
+        """Record the text of a SlideIR: runs under their own font, table and chart text under the body font stack."""
+        for shape in slide_ir.shapes:
+            if shape.paragraphs:
+                for paragraph in shape.paragraphs:
+                    for run in paragraph.runs:
+                        self.add(run.font_name or run.font_family, run.text)
+            elif shape.table is not None or shape.chart is not None:
+                text = shape.text
+                for family in body_families:
+                    self.add(family, text)
+
+    def merge(self, other):
+        for family, chars in other.codepoints.items():
+            self.codepoints.setdefault(family, set()).update(chars)
+
+
+def _file_hash(path):
+    """sha256 of a font file, cached on (path, mtime, size)."""
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _lock:
+        digest = _font_hash_cache.get(key)
+        if digest is not None:
+            _font_hash_cache.move_to_end(key)
+            return digest
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _lock:
+        _font_hash_cache[key] = digest
+        while len(_font_hash_cache) > FONT_HASH_CACHE_SIZE:
+            _font_hash_cache.popitem(last=False)
+    return digest
+
+
+def _font_faces_in_file(path):
+    """Yield (font_number, family_names, weight, italic) for each face in a font file."""
+    from fontTools.ttLib import TTFont, TTCollection
+    if path.lower().endswith(('.ttc', '.otc')):
+        collection = TTCollection(path, lazy=True)
+        fonts = list(enumerate(collection.fonts))
+    else:
+        fonts = [(0, TTFont(path, lazy=True))]
+    for number, font in fonts:
+        names = set()
+        for record in font['name'].names:
+            if record.nameID in FAMILY_NAME_IDS:
+                try:
+                    names.add(record.toUnicode().strip())
+                except Exception:
+                    pass
+        weight = 400
+        italic = False
+        if 'OS/2' in font:
+            weight = getattr(font['OS/2'], 'usWeightClass', 400) or 400
+            italic = bool(getattr(font['OS/2'], 'fsSelection', 0) & 1)
+        yield number, names, weight, italic
+
+
+def find_font_files(font_dir):
+    """Map lower-cased family names to [(path, font_number, weight, italic)] for fonts under font_dir.
+    The scan is cached per directory until a file in it changes."""
+    _require_fonttools()
+    entries = []
+    for root, _, files in os.walk(font_dir):
+        for name in sorted(files):
+            if name.lower().endswith(FONT_EXTS):
+                path = os.path.join(root, name)
+                st = os.stat(path)
+                entries.append((path, st.st_mtime_ns, st.st_size))
+    key = (os.path.abspath(font_dir), tuple(entries))
+    with _lock:
+        index = _font_index_cache.get(key)
+    if index is not None:
+        return index
+    index = {}
+    for path, _, _ in entries:
+        try:
+            for number, names, weight, italic in _font_faces_in_file(path):
+                for family in names:
+                    index.setdefault(family.lower(), []).append((path, number, weight, italic))
+        except Exception:
+            pass
+    with _lock:
+        _font_index_cache[key] = index
+    return index
+
+
+def subset_font(path, font_number, codepoints, cache_dir=None):
+    """Return WOFF2 bytes of the font restricted to codepoints.
+    Subsets are cached by (font hash, glyph-set hash) in memory and, with cache_dir, on disk."""
+    _require_fonttools()
+    from fontTools.ttLib import TTFont
+    from fontTools import subset
+
+    glyph_hash = hashlib.sha256(''.join(sorted(codepoints)).encode('utf-8', 'surrogatepass')).hexdigest()
+    key = f"{_file_hash(path)[:24]}-{font_number}-{glyph_hash[:24]}"
+    with _lock:
+        data = _subset_cache.get(key)
+        if data is not None:
+            _subset_cache.move_to_end(key)
+            return data
+    cache_path = os.path.join(cache_dir, key + '.woff2') if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+    else:
+        options = subset.Options()
+        options.flavor = 'woff2'
+        options.layout_features = ['*']
+        options.notdef_outline = True
+        font = TTFont(path, fontNumber=font_number, lazy=False)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=[ord(c) for c in codepoints])
+        subsetter.subset(font)
+        font.flavor = 'woff2'
+        buf = io.BytesIO()
+        font.save(buf)
+        data = buf.getvalue()
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, cache_path)
+    _remember_subset(key, data)
+    return data
+
+
+def _remember_subset(key, data):
+    """Keep a subset in the in-memory LRU, bounded by SUBSET_CACHE_BYTES in total."""
+    global _subset_bytes
+    if len(data) > SUBSET_CACHE_BYTES // 4:
+        return
+    with _lock:
+        if key not in _subset_cache:
+            _subset_cache[key] = data
+            _subset_bytes += len(data)
+        while _subset_bytes > SUBSET_CACHE_BYTES:
+            _subset_bytes -= len(_subset_cache.popitem(last=False)[1])
+
+
+def build_font_faces(collector, font_dir, media_dir, cache_dir=None, output=None):
+    """Subset the fonts found in font_dir to the glyphs in collector and write them to media_dir/fonts.
+
+    Returns (css_text, written_files) where written_files are paths relative to media_dir.
+    Families without a local font file are left to the browser's font stack.
+    Files are stored through output, an OutputSink (default: the local filesystem)."""
+    output = output if output is not None else LocalSink()
+    index = find_font_files(font_dir)
+    rules = []
+    written = []
+    fonts_dir = os.path.join(media_dir, 'fonts')
+    for family in sorted(collector.codepoints):
+        faces = index.get(family.lower())
+        chars = collector.codepoints[family]
+        if not faces or not chars:
+            continue
+        for path, number, weight, italic in faces:
+            data = subset_font(path, number, chars, cache_dir)
+            safe_name = re.sub(r'[^A-Za-z0-9_-]+', '_', os.path.splitext(os.path.basename(path))[0])
+            fname = f"{safe_name}-{number}-{hashlib.sha256(data).hexdigest()[:10]}.woff2"
+            fpath = os.path.join(fonts_dir, fname)
+            if not output.exists(fpath):
+                output.write(fpath, data)
+            written.append(f"fonts/{fname}")
+            family_css = family.replace('\\', '\\\\').replace('"', '\\"')
+            rules.append(
+                f'@font-face {{ font-family: "{family_css}"; src: url("fonts/{fname}") format("woff2"); '
+                f'font-weight: {weight}; font-style: {"italic" if italic else "normal"}; font-display: swap; }}'
+            )
+    return '\n'.join(rules), written
@@ -23,9 +23,16 @@ setup(
         "python-pptx",
         "lxml",
     ],
+    extras_require={
+        "fonts": ["fonttools", "brotli"],
+        "precompress": ["brotli"],
+        "s3": ["boto3"],
+        "sprites": ["Pillow"],
+    },
     entry_points={
         "console_scripts": [
             "pptx-to-html=pptx_html_bridge.converter:main",
+            "html-to-pptx=pptx_html_bridge.html_to_pptx:main",
         ],
     },
 )
\ No newline at end of file